@@ -0,0 +1,86 @@
+import time
+import timeit
+from typing import Callable, Iterator
+
+from events.eventsystem import ES, EventSystem
+from game.core import HexMap, HexSpec, Landscape
+from game.map.coordinates import CC, Corner, CornerPosition
+from game.map.geometry import corner_offsets, hex_circle
+from game.map.terrain import Plains
+
+
+def reference_corners_within_range_off(
+    hex_map: HexMap, center: CC, distance: int, min_distance: int | None = None
+) -> Iterator[Corner]:
+    # The implementation prior to precomputed corner adjacency.
+    for cc in hex_circle(distance, center=center):
+        for position in CornerPosition:
+            corner = Corner(cc, position)
+            if all(
+                cc in hex_map.hexes
+                and cc.distance_to(center) <= distance
+                and (min_distance is None or cc.distance_to(center) >= min_distance)
+                for cc in corner.get_adjacent_positions()
+            ):
+                yield corner
+
+
+def _query_all(
+    query: Callable[[HexMap, CC, int], Iterator[Corner]],
+    hex_map: HexMap,
+    radius: int,
+) -> None:
+    for center in hex_map.hexes:
+        list(query(hex_map, center, radius))
+
+
+def _report(name: str, elapsed: float, number: int, queries: int) -> None:
+    print(f"{name:>12}: {elapsed / (number * queries) * 1e6:.2f} us/query")
+
+
+def main(radius: int = 4, number: int = 200, cold_number: int = 20) -> None:
+    ES.bind(EventSystem())
+    landscape = Landscape({cc: HexSpec(Plains, False) for cc in hex_circle(8)})
+
+    # Checked on a map of its own, so the timed maps start out with empty caches.
+    hex_map = HexMap(landscape)
+    for center in hex_map.hexes:
+        assert list(hex_map.get_corners_within_range_off(center, radius)) == list(
+            reference_corners_within_range_off(hex_map, center, radius)
+        )
+
+    queries = len(hex_map.hexes)
+    print(f"radius {radius} corner queries over {queries} hex map")
+    _report(
+        "reference",
+        timeit.timeit(
+            lambda: _query_all(reference_corners_within_range_off, hex_map, radius),
+            number=number,
+        ),
+        number,
+        queries,
+    )
+
+    # Cold queries are the first of their range on a fresh map, and fill its
+    # cache. Warm ones are repeated queries, answered from it.
+    elapsed = 0.0
+    for _ in range(cold_number):
+        fresh_map = HexMap(landscape)
+        corner_offsets.cache_clear()
+        start = time.perf_counter()
+        _query_all(HexMap.get_corners_within_range_off, fresh_map, radius)
+        elapsed += time.perf_counter() - start
+    _report("cold", elapsed, cold_number, queries)
+    _report(
+        "warm",
+        timeit.timeit(
+            lambda: _query_all(HexMap.get_corners_within_range_off, fresh_map, radius),
+            number=number,
+        ),
+        number,
+        queries,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import random
+import timeit
+from typing import Any, Iterator, Mapping
+
+from events.eventsystem import ES
+from game.core import (
+    GS,
+    Connection,
+    DamageSignature,
+    DeploymentSpec,
+    HexSpec,
+    Landscape,
+    Scenario,
+    UnitBlueprint,
+    UnitStatus,
+    UnitStatusSignature,
+)
+from game.encoding import decode_binary, encode_binary
+from game.events import ApplyStatus, Damage
+from game.map.coordinates import CC
+from game.map.geometry import hex_circle
+from game.map.terrain import Forest, Plains, Water
+from game.statuses import hex_statuses, unit_statuses  # noqa F401
+from game.units import blueprince  # noqa F401
+from game_server.setup import setup_scenario, setup_scenario_units
+
+
+class NullConnection(Connection):
+    def send(self, values: Mapping[str, Any]) -> None: ...
+
+    def wait_for_response(self) -> Iterator[None]:
+        yield None
+
+
+def make_late_game_frame(units_per_player: int = 10) -> dict[str, Any]:
+    """
+    A frame from a test scenario like map, where both players have fielded a large
+    army, and a number of units have been damaged and received statuses.
+    """
+    rng = random.Random(0)
+    landscape = Landscape(
+        {
+            cc: HexSpec(
+                rng.choice([Plains, Plains, Forest, Water]),
+                cc.distance_to(CC(0, 0)) <= 1,
+            )
+            for cc in hex_circle(8)
+        }
+    )
+    blueprints = sorted(
+        (
+            blueprint
+            for blueprint in UnitBlueprint.registry.values()
+            if blueprint.price is not None
+        ),
+        key=lambda blueprint: blueprint.identifier,
+    )
+    ccs = rng.sample(
+        [
+            cc
+            for cc, spec in landscape.terrain_map.items()
+            if spec.terrain_type != Water
+        ],
+        units_per_player * 2,
+    )
+    scenario = Scenario(
+        landscape=landscape,
+        units=[
+            {ccs.pop(): rng.choice(blueprints) for _ in range(units_per_player)}
+            for _ in range(2)
+        ],
+        deployment_spec=DeploymentSpec(0, 0, 0, 0),
+        to_points=100,
+    )
+    gs = setup_scenario(scenario, NullConnection)
+    setup_scenario_units(scenario)
+    gs.round_counter = 8
+    for unit in gs.map.units:
+        ES.resolve(Damage(unit, DamageSignature(1, None)))
+        ES.resolve(
+            ApplyStatus(
+                unit,
+                UnitStatusSignature(
+                    UnitStatus.get(rng.choice(["burn", "poison", "parasite"])),
+                    None,
+                    stacks=2,
+                ),
+            )
+        )
+    gs.update_vision()
+    player = GS.turn_order.original_order[0]
+    return {
+        "message_type": "game_state",
+        "count": 100,
+        "game_state": gs.serialize_for(gs._get_context_for(player), None),
+    }
+
+
+def main(number: int = 200) -> None:
+    frame = make_late_game_frame()
+    assert decode_binary(encode_binary(frame)) == json.loads(json.dumps(frame))
+
+    print(f"game state frame with {len(frame['game_state']['map']['hexes'])} hexes")
+    for name, encode in (("json", json.dumps), ("binary", encode_binary)):
+        size = len(encode(frame))
+        elapsed = timeit.timeit(lambda: encode(frame), number=number)
+        print(f"{name:>8}: {size:>6} bytes, {elapsed / number * 1e3:.2f} ms/encode")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,9 +20,11 @@ import {
   ActionFilter,
   ActionSpace,
   DelayedActivation,
+  HexActions,
   TakeAction,
 } from "./interface.ts";
 import { activateMenu, setDelayedActivation, store } from "../state/store.ts";
+import { requestActionPreviews } from "./previews.ts";
 import { GameObjectDetails } from "../../interfaces/gameObjectDetails.ts";
 import { loadArmy } from "./load.ts";
 
@@ -55,7 +57,10 @@ export const getBaseActions = (
     decision = {
       type: "SelectOptionDecisionPoint",
       explanation: "preview",
-      payload: { options: delayedActivation.options },
+      payload: {
+        options: delayedActivation.options,
+        options_digest: delayedActivation.optionsDigest || "",
+      },
     };
     activeUnitContext = {
       unit: delayedActivation.unit,
@@ -187,6 +192,7 @@ export const getBaseActions = (
                 activateMenu({
                   type: "Tree",
                   optionIndex: idx,
+                  unitId: delayedActivation?.unit.id || null,
                   targetProfile: option.target_profile as Tree,
                   selectedIndexes: [targetIdx],
                 }),
@@ -323,6 +329,8 @@ export const getBaseActionSpace = (
       actionFilter,
     );
 
+    // Units whose action previews still have to be requested, by hex key.
+    const missingPreviews: { [key: string]: string } = {};
     if (!delayedActivation) {
       for (const [idx, option] of decision.payload.options.entries()) {
         if (
@@ -334,19 +342,34 @@ export const getBaseActionSpace = (
             targetIdx,
             unit,
           ] of option.target_profile.values.units.entries()) {
+            const previews = option.values.actions_preview?.[unit.id];
+            if (!previews) {
+              missingPreviews[ccToKey(unitIdMap[unit.id].hex.cc)] = unit.id;
+            }
             actions[ccToKey(unitIdMap[unit.id].hex.cc)] = [
               {
                 type: "generic",
                 description: "activate unit",
-                do: () =>
+                do: () => {
+                  if (!previews) {
+                    requestActionPreviews(
+                      store.getState().gameStateId,
+                      unit.id,
+                    );
+                  }
+                  // Filled in when the previews arrive, if they are missing.
                   store.dispatch(
                     setDelayedActivation({
                       optionIndex: idx,
                       targetIndex: targetIdx,
                       unit: unitIdMap[unit.id].unit,
-                      options: option.values.actions_preview[unit.id],
+                      options: previews || [],
+                      optionsDigest:
+                        option.values.actions_preview_digests?.[unit.id] ||
+                        null,
                     }),
-                  ),
+                  );
+                },
               },
             ];
           }
@@ -354,45 +377,46 @@ export const getBaseActionSpace = (
       }
     }
 
-    return {
-      hexActions: Object.fromEntries(
-        Object.entries(actions).map(([cc, _actions]) => [
-          cc,
-          _actions.filter(
-            (action) =>
-              !(
-                action.sourceOption && action.sourceOption.type == "MoveOption"
-              ),
-          ).length > 1
-            ? {
-                actions: [
-                  ..._actions.filter(
-                    (action) =>
-                      action.sourceOption &&
-                      action.sourceOption.type == "MoveOption",
-                  ),
-                  {
-                    type: "menu",
-                    description: "open menu",
-                    do: () => {
-                      store.dispatch(
-                        activateMenu({
-                          type: "ListMenu",
-                          cc: ccFromKey(cc),
-                        }),
-                      );
-                    },
+    const hexActions: { [key: string]: HexActions } = Object.fromEntries(
+      Object.entries(actions).map(([cc, _actions]) => [
+        cc,
+        _actions.filter(
+          (action) =>
+            !(action.sourceOption && action.sourceOption.type == "MoveOption"),
+        ).length > 1
+          ? {
+              actions: [
+                ..._actions.filter(
+                  (action) =>
+                    action.sourceOption &&
+                    action.sourceOption.type == "MoveOption",
+                ),
+                {
+                  type: "menu",
+                  description: "open menu",
+                  do: () => {
+                    store.dispatch(
+                      activateMenu({
+                        type: "ListMenu",
+                        cc: ccFromKey(cc),
+                      }),
+                    );
                   },
-                ],
-              }
-            : {
-                actions: _actions,
-                highlighted: false,
-              },
-        ]),
-      ),
-      buttonAction: null,
-    };
+                },
+              ],
+            }
+          : {
+              actions: _actions,
+              highlighted: false,
+            },
+      ]),
+    );
+    for (const [cc, unitId] of Object.entries(missingPreviews)) {
+      hexActions[cc].hoverTrigger = () =>
+        requestActionPreviews(store.getState().gameStateId, unitId);
+    }
+
+    return { hexActions, buttonAction: null };
   } else if (decision && decision["type"] == "SelectArmyDecisionPoint") {
     return {
       hexActions: Object.fromEntries(
@@ -39,6 +39,7 @@ export interface DelayedActivation {
   targetIndex: number;
   unit: Unit;
   options: UnitOption[];
+  optionsDigest: string | null;
 }
 
 export type selectionIcon =
@@ -142,6 +143,8 @@ export interface ConeMenu extends BaseMenuData {
 export interface TreeMenu extends BaseMenuData {
   type: "Tree";
   optionIndex: number;
+  // Set if the option is from the action previews of a unit.
+  unitId: string | null;
   targetProfile: Tree;
   selectedIndexes: number[];
 }
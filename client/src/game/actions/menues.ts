@@ -1,4 +1,4 @@
-import { GameState, Hex, TreeNode } from "../../interfaces/gameState.ts";
+import { GameState, Hex } from "../../interfaces/gameState.ts";
 import { getBaseActions, getUnitIdHexMap } from "./actionSpace.ts";
 import {
   ActionSpace,
@@ -37,6 +37,7 @@ import { range } from "../utils/range.ts";
 import { CC, Corner, RC } from "../../interfaces/geometry.ts";
 import { min } from "../utils/min.ts";
 import { loadArmy } from "./load.ts";
+import { getSelectedNode } from "./subtrees.ts";
 import { GameObjectDetails } from "../../interfaces/gameObjectDetails.ts";
 
 // TODO some common logic in this mess
@@ -405,15 +406,34 @@ const getTreeActionSpace = (
     ]),
   );
 
-  let currentNode = menu.targetProfile.values.root_node;
-  for (const idx of menu.selectedIndexes) {
-    const [treeOption, child] = currentNode.options[idx];
+  const state = store.getState();
+  const getNode = (indexes: number[]) =>
+    getSelectedNode(
+      menu.targetProfile.values.root_node,
+      indexes,
+      menu.unitId,
+      menu.optionIndex,
+      state.subtrees,
+      state.gameStateId,
+    );
+
+  for (const [depth, idx] of menu.selectedIndexes.entries()) {
+    const node = getNode(menu.selectedIndexes.slice(0, depth));
+    if (!node) {
+      break;
+    }
+    const [treeOption] = node.options[idx];
     hexActions[
       ccToKey(
         treeOption.type == "unit" ? unitHexes[treeOption.id].cc : treeOption.cc,
       )
     ].highlighted = true;
-    currentNode = child as TreeNode;
+  }
+
+  const currentNode = getNode(menu.selectedIndexes);
+  // Nothing to select until the subtree arrives.
+  if (!currentNode) {
+    return { hexActions, buttonAction: null };
   }
 
   for (const [
@@ -452,12 +472,16 @@ const getTreeDescription = (
   gameObjectDetails: GameObjectDetails,
   menu: TreeMenu,
 ): string => {
-  let currentNode = menu.targetProfile.values.root_node;
-  for (const idx of menu.selectedIndexes) {
-    const [treeOption, child] = currentNode.options[idx];
-    currentNode = child as TreeNode;
-  }
-  return currentNode.label;
+  const state = store.getState();
+  const currentNode = getSelectedNode(
+    menu.targetProfile.values.root_node,
+    menu.selectedIndexes,
+    menu.unitId,
+    menu.optionIndex,
+    state.subtrees,
+    state.gameStateId,
+  );
+  return currentNode ? currentNode.label : "loading";
 };
 
 const getConsecutiveAdjacentHexesActionSpace = (
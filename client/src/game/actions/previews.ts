@@ -0,0 +1,25 @@
+// When the server computes action previews lazily, the previews of a unit are
+// requested once it is first hovered or activated.
+
+let sendRequest: ((message: object) => void) | null = null;
+const requested = new Set<string>();
+
+export const setActionPreviewsRequestSender = (
+  send: (message: object) => void,
+) => {
+  sendRequest = send;
+  requested.clear();
+};
+
+export const requestActionPreviews = (count: number, unitId: string) => {
+  const key = `${count}:${unitId}`;
+  if (!sendRequest || requested.has(key)) {
+    return;
+  }
+  requested.add(key);
+  sendRequest({
+    message_type: "request_action_previews",
+    count,
+    unit_id: unitId,
+  });
+};
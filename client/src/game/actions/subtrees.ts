@@ -0,0 +1,70 @@
+// Lazy trees only carry their first level of options, and the subtrees of
+// selected options are requested from the server as they are needed.
+
+import { TreeNode, TreeNodeHandle } from "../../interfaces/gameState.ts";
+
+let sendRequest: ((message: object) => void) | null = null;
+const requested = new Set<string>();
+
+export const setSubtreeRequestSender = (send: (message: object) => void) => {
+  sendRequest = send;
+  requested.clear();
+};
+
+export const getSubtreeKey = (
+  unitId: string | null,
+  optionIndex: number,
+  path: number[],
+): string => `${unitId}:${optionIndex}:${path.join(",")}`;
+
+export const requestSubtree = (
+  count: number,
+  unitId: string | null,
+  optionIndex: number,
+  path: number[],
+) => {
+  const key = `${count}:${getSubtreeKey(unitId, optionIndex, path)}`;
+  if (!sendRequest || requested.has(key)) {
+    return;
+  }
+  requested.add(key);
+  sendRequest({
+    message_type: "request_subtree",
+    count,
+    option_index: optionIndex,
+    unit_id: unitId,
+    path,
+  });
+};
+
+export const isSubtreeHandle = (
+  child: TreeNode | TreeNodeHandle | null,
+): child is TreeNodeHandle => !!child && "handle" in child;
+
+// Follows the selected indexes from the root node. Returns null if a subtree
+// along the way hasn't arrived yet, in which case it is requested.
+export const getSelectedNode = (
+  rootNode: TreeNode,
+  selectedIndexes: number[],
+  unitId: string | null,
+  optionIndex: number,
+  subtrees: { [key: string]: TreeNode },
+  count: number,
+): TreeNode | null => {
+  let currentNode = rootNode;
+  for (const idx of selectedIndexes) {
+    const child = currentNode.options[idx][1];
+    if (isSubtreeHandle(child)) {
+      const subtree =
+        subtrees[getSubtreeKey(unitId, optionIndex, child.handle)];
+      if (!subtree) {
+        requestSubtree(count, unitId, optionIndex, child.handle);
+        return null;
+      }
+      currentNode = subtree;
+    } else {
+      currentNode = child as TreeNode;
+    }
+  }
+  return currentNode;
+};
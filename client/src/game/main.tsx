@@ -13,39 +13,185 @@ import {
   incrementAdditionalDetailsIndex,
   receivedGameResult,
   receiveGameState,
+  receivedActionPreviews,
+  receivedSubtree,
+  receivedLogs,
   renderedGameState,
   setActionFilter,
   store,
   toggleShowCoordinates,
 } from "./state/store.ts";
-import { Message } from "../interfaces/messages.ts";
+import {
+  GameStateMessage,
+  MapStaticMessage,
+  Message,
+  Viewport,
+} from "../interfaces/messages.ts";
 import { TakeAction } from "./actions/interface.ts";
 import { getBaseActions } from "./actions/actionSpace.ts";
 import { ccToKey } from "../geometry.ts";
 import { MapAnimation } from "./animations/interface.ts";
+import { decodeBinaryFrame } from "./utils/binary.ts";
+import { applyGameStateDelta } from "./utils/delta.ts";
+import { mergeLogs } from "./utils/logs.ts";
+import { resolveDecision, resolveOptions } from "./utils/options.ts";
+import { setActionPreviewsRequestSender } from "./actions/previews.ts";
+import { setSubtreeRequestSender } from "./actions/subtrees.ts";
+import { reportViewport, setViewportSender } from "./viewport.ts";
+import { UnitOption } from "../interfaces/gameState.ts";
 
-const gameConnection = new WebSocket(
-  `ws://${window.location.hostname}:8765/ws`,
-);
-gameConnection.onmessage = (event) => {
-  const result: Message = JSON.parse(event.data);
+let gameConnection: WebSocket;
+// The connection is resumed if it is lost before the game is over.
+let gameOver = false;
+// Hexes in game states only contain their dynamic values, and are merged with
+// the static map by index.
+let staticMap: MapStaticMessage | null = null;
+// Viewport the latest frame was made for, which is sent back when resuming, so
+// deltas are made against the hexes as they were summarized.
+let frameViewport: Viewport | null = null;
+
+const receiveGameStateFrame = (
+  frame: GameStateMessage,
+  hasFullLogs: boolean,
+) => {
+  frameViewport = frame.viewport ?? null;
+  frame = {
+    ...frame,
+    game_state: {
+      ...frame.game_state,
+      decision: resolveDecision(frame.game_state.decision),
+    },
+  };
+  if (staticMap) {
+    const staticHexes = staticMap.hexes;
+    frame = {
+      ...frame,
+      game_state: {
+        ...frame.game_state,
+        map: {
+          ...frame.game_state.map,
+          hexes: frame.game_state.map.hexes.map((hex, idx) => ({
+            ...hex,
+            ...staticHexes[idx],
+          })),
+        },
+      },
+    };
+  }
+  if (!hasFullLogs) {
+    const { logs, missing } = mergeLogs(
+      store.getState().gameState?.logs || [],
+      frame.game_state,
+    );
+    frame = { ...frame, game_state: { ...frame.game_state, logs } };
+    if (missing) {
+      gameConnection.send(
+        JSON.stringify({
+          message_type: "request_logs",
+          start: missing[0],
+          stop: missing[1],
+        }),
+      );
+    }
+  }
+  store.dispatch(receiveGameState(frame));
+};
+
+const onMessage = (event: MessageEvent) => {
+  const result: Message =
+    event.data instanceof ArrayBuffer
+      ? decodeBinaryFrame(event.data)
+      : JSON.parse(event.data);
   if (result.message_type == "game_state") {
     console.log(result);
-    store.dispatch(receiveGameState(result));
+    receiveGameStateFrame(result, result.game_state.logs !== undefined);
+  } else if (result.message_type == "game_state_delta") {
+    const state = store.getState();
+    if (!state.gameState || state.gameStateId != result.base_count) {
+      console.log("ERROR! delta against unknown game state", result);
+      return;
+    }
+    const { delta, base_count, ...frame } = result;
+    receiveGameStateFrame(
+      {
+        ...frame,
+        message_type: "game_state",
+        game_state: applyGameStateDelta(state.gameState, delta),
+      },
+      false,
+    );
+  } else if (result.message_type == "map_static") {
+    staticMap = result;
+  } else if (result.message_type == "logs") {
+    store.dispatch(receivedLogs(result));
+  } else if (result.message_type == "action_previews") {
+    store.dispatch(
+      receivedActionPreviews({
+        count: result.count,
+        unitId: result.unit_id,
+        options: resolveOptions(result) as UnitOption[],
+        optionsDigest: result.options_digest,
+      }),
+    );
+  } else if (result.message_type == "subtree") {
+    store.dispatch(receivedSubtree(result));
   } else if (result.message_type == "error") {
     console.log("ERROR!", result);
   } else if (result.message_type == "game_result") {
+    gameOver = true;
     store.dispatch(receivedGameResult(result));
   } else {
     console.log("unknown message", result);
   }
 };
-gameConnection.onopen = () =>
+const onOpen = () => {
+  const params = new URLSearchParams(window.location.search);
+  const spectate = params.get("spectate");
+  const position = params.get("position");
   gameConnection.send(
-    JSON.stringify({
-      seat_id: new URLSearchParams(window.location.search).get("seat"),
-    }),
+    JSON.stringify(
+      spectate
+        ? {
+            spectate: {
+              game_id: Number(spectate),
+              position: position === null ? null : Number(position),
+            },
+          }
+        : {
+            seat_id: params.get("seat"),
+            delta_frames: true,
+            static_map: true,
+            binary_frames: true,
+            last_seen_count: store.getState().gameState
+              ? store.getState().gameStateId
+              : null,
+            viewport: store.getState().gameState ? frameViewport : null,
+          },
+    ),
+  );
+  // Requests sent on a lost connection are never answered, so are sent again.
+  setActionPreviewsRequestSender((message) =>
+    gameConnection.send(JSON.stringify(message)),
   );
+  setSubtreeRequestSender((message) =>
+    gameConnection.send(JSON.stringify(message)),
+  );
+  setViewportSender((message) => gameConnection.send(JSON.stringify(message)));
+};
+
+const connect = () => {
+  gameConnection = new WebSocket(`ws://${window.location.hostname}:8765/ws`);
+  // Game state frames are sent binary encoded.
+  gameConnection.binaryType = "arraybuffer";
+  gameConnection.onmessage = onMessage;
+  gameConnection.onopen = onOpen;
+  gameConnection.onclose = () => {
+    if (!gameOver) {
+      setTimeout(connect, 1000);
+    }
+  };
+};
+connect();
 
 const makeDecision: TakeAction = (payload) => {
   const state = store.getState();
@@ -58,12 +204,13 @@ const makeDecision: TakeAction = (payload) => {
             index: state.delayedActivation.targetIndex,
           },
         },
-        premove: Object.keys(payload).length
-          ? {
-              for_options: state.delayedActivation.options,
-              payload: payload,
-            }
-          : null,
+        premove:
+          Object.keys(payload).length && state.delayedActivation.optionsDigest
+            ? {
+                options_digest: state.delayedActivation.optionsDigest,
+                payload: payload,
+              }
+            : null,
       }
     : { count: state.gameStateId, payload };
   console.log("sending", message);
@@ -255,6 +402,12 @@ async function main() {
     animations = animations.filter((animation) => animation.play(elapsed));
     map.position = worldTranslation;
     map.scale = worldScale;
+    reportViewport(
+      worldTranslation,
+      worldScale,
+      app.screen.width,
+      app.screen.height,
+    );
   });
 }
 
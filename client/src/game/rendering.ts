@@ -79,6 +79,9 @@ let maxX = window.innerWidth;
 let maxY = window.innerHeight;
 let center = { x: maxX / 2, y: maxY / 2 };
 
+// Position of the origin hex in the map container.
+export const getMapOrigin = (): RC => center;
+
 let previouslyHovered: string | null = null;
 
 // TODO not here
@@ -456,10 +459,16 @@ export const renderMap = (
   } = {};
 
   const getUnitPositions = (gameState: GameState) => {
-    const values: { [key: string]: { cc: CC; unit: Unit } } = {};
+    const values: {
+      [key: string]: { cc: CC; unit: Unit; summary: boolean };
+    } = {};
     for (const hexData of gameState.map.hexes) {
       if (hexData.unit) {
-        values[hexData.unit.id] = { cc: hexData.cc, unit: hexData.unit };
+        values[hexData.unit.id] = {
+          cc: hexData.cc,
+          unit: hexData.unit,
+          summary: !!hexData.summary,
+        };
       }
     }
     return values;
@@ -473,15 +482,20 @@ export const renderMap = (
     }
 
     for (const hexData of gameState.map.hexes) {
+      const previousHex = previousHexes[ccToKey(hexData.cc)];
+      // Summaries have no statuses, which isn't a change.
       hexStatusChanges[ccToKey(hexData.cc)] = {
-        from: previousHexes[ccToKey(hexData.cc)].statuses,
+        from:
+          previousHex.summary || hexData.summary
+            ? hexData.statuses
+            : previousHex.statuses,
         to: hexData.statuses,
       };
     }
 
     const currentUnits = getUnitPositions(gameState);
     const previousUnits = getUnitPositions(state.previousGameState);
-    for (const { cc, unit } of Object.values(currentUnits)) {
+    for (const { cc, unit, summary } of Object.values(currentUnits)) {
       if (
         unit.id in previousUnits &&
         !unit.is_ghost &&
@@ -494,7 +508,12 @@ export const renderMap = (
         if (unit.exhausted != prevUnit.exhausted) {
           unitRotations[unit.id] = true;
         }
-        statusChanges[unit.id] = { from: prevUnit.statuses, to: unit.statuses };
+        if (!summary && !previousUnits[unit.id].summary) {
+          statusChanges[unit.id] = {
+            from: prevUnit.statuses,
+            to: unit.statuses,
+          };
+        }
       }
       if (
         unit.id in previousUnits &&
@@ -4,7 +4,11 @@ import {
   PayloadAction,
   Tuple,
 } from "@reduxjs/toolkit";
-import { GameState } from "../../interfaces/gameState.ts";
+import {
+  GameState,
+  TreeNode,
+  UnitOption,
+} from "../../interfaces/gameState.ts";
 import { GameObjectDetails } from "../../interfaces/gameObjectDetails.ts";
 import {
   ActionFilter,
@@ -16,8 +20,11 @@ import { deepEquals } from "../utils/equals.ts";
 import {
   GameResultMessage,
   GameStateMessage,
+  LogsMessage,
+  SubtreeMessage,
 } from "../../interfaces/messages.ts";
 import { getAdditionalDetails } from "../../details/additional.ts";
+import { getSubtreeKey } from "../actions/subtrees.ts";
 
 const mainSlice = createSlice({
   name: "application",
@@ -31,6 +38,7 @@ const mainSlice = createSlice({
     detailed: null,
     menuData: null,
     delayedActivation: null,
+    subtrees: {},
     highlightedCCs: null,
     showCoordinates: false,
     additionalDetailsIndex: null,
@@ -48,6 +56,8 @@ const mainSlice = createSlice({
     detailed: HoveredDetails | null;
     menuData: MenuData | null;
     delayedActivation: DelayedActivation | null;
+    // Subtrees of lazy trees in the current decision, by subtree key.
+    subtrees: { [key: string]: TreeNode };
     highlightedCCs: string[] | null;
     showCoordinates: boolean;
     additionalDetailsIndex: number | null;
@@ -68,10 +78,66 @@ const mainSlice = createSlice({
       state.gameStateId = action.payload.count;
       state.menuData = null;
       state.delayedActivation = null;
+      state.subtrees = {};
       state.actionFilter = null;
       state.highlightedCCs = null;
       state.shouldRerender = true;
     },
+    receivedActionPreviews: (
+      state,
+      action: PayloadAction<{
+        count: number;
+        unitId: string;
+        options: UnitOption[];
+        optionsDigest: string;
+      }>,
+    ) => {
+      const decision = state.gameState?.decision;
+      if (
+        action.payload.count != state.gameStateId ||
+        decision?.type != "SelectOptionDecisionPoint"
+      ) {
+        return;
+      }
+      const { unitId, options, optionsDigest } = action.payload;
+      for (const option of decision.payload.options) {
+        if (option.type == "ActivateUnitOption") {
+          option.values.actions_preview = {
+            ...option.values.actions_preview,
+            [unitId]: options,
+          };
+          option.values.actions_preview_digests = {
+            ...option.values.actions_preview_digests,
+            [unitId]: optionsDigest,
+          };
+        }
+      }
+      if (state.delayedActivation?.unit.id == unitId) {
+        state.delayedActivation.options = options;
+        state.delayedActivation.optionsDigest = optionsDigest;
+      }
+      state.shouldRerender = true;
+    },
+    receivedSubtree: (state, action: PayloadAction<SubtreeMessage>) => {
+      if (action.payload.count != state.gameStateId) {
+        return;
+      }
+      const { unit_id, option_index, path, node } = action.payload;
+      state.subtrees[getSubtreeKey(unit_id, option_index, path)] = node;
+      state.shouldRerender = true;
+    },
+    receivedLogs: (state, action: PayloadAction<LogsMessage>) => {
+      if (
+        state.gameState &&
+        action.payload.start <= state.gameState.logs.length
+      ) {
+        state.gameState.logs.splice(
+          action.payload.start,
+          action.payload.logs.length,
+          ...action.payload.logs,
+        );
+      }
+    },
     receivedGameResult: (state, action: PayloadAction<GameResultMessage>) => {
       state.gameResult = action.payload;
     },
@@ -170,6 +236,9 @@ const mainSlice = createSlice({
 
 export const {
   receiveGameState,
+  receivedActionPreviews,
+  receivedSubtree,
+  receivedLogs,
   receivedGameResult,
   renderedGameState,
   loadedImage,
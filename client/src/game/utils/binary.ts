@@ -0,0 +1,134 @@
+// Decoder for the binary frame format of game/encoding.py.
+
+const VERSION = 1;
+
+const TAG_NONE = 0;
+const TAG_FALSE = 1;
+const TAG_TRUE = 2;
+const TAG_INT = 3;
+const TAG_FLOAT = 4;
+const TAG_STRING = 5;
+const TAG_LIST = 6;
+const TAG_OBJECT = 7;
+const TAG_CC = 8;
+
+const SMALL_INT_TAG_OFFSET = 128;
+const SMALL_INT_MIN = -64;
+const CC_MIN = -8;
+
+const textDecoder = new TextDecoder();
+
+class Decoder {
+  private view: DataView;
+  private bytes: Uint8Array;
+  private position: number = 0;
+  private strings: string[] = [];
+  private shapes: string[][] = [];
+
+  constructor(buffer: ArrayBuffer) {
+    this.view = new DataView(buffer);
+    this.bytes = new Uint8Array(buffer);
+  }
+
+  private readByte(): number {
+    if (this.position >= this.bytes.length) {
+      throw new Error("unexpected end of data");
+    }
+    return this.bytes[this.position++];
+  }
+
+  private readVarint(): number {
+    let value = 0;
+    let multiplier = 1;
+    while (true) {
+      const byte = this.readByte();
+      value += (byte & 0x7f) * multiplier;
+      if (!(byte & 0x80)) {
+        return value;
+      }
+      multiplier *= 128;
+    }
+  }
+
+  private readInt(): number {
+    const value = this.readVarint();
+    return value % 2 ? -(value + 1) / 2 : value / 2;
+  }
+
+  private readFloat(): number {
+    const value = this.view.getFloat64(this.position, true);
+    this.position += 8;
+    return value;
+  }
+
+  private decode(): any {
+    const tag = this.readByte();
+    if (tag >= SMALL_INT_TAG_OFFSET) {
+      return tag - SMALL_INT_TAG_OFFSET + SMALL_INT_MIN;
+    }
+    switch (tag) {
+      case TAG_NONE:
+        return null;
+      case TAG_FALSE:
+        return false;
+      case TAG_TRUE:
+        return true;
+      case TAG_INT:
+        return this.readInt();
+      case TAG_FLOAT:
+        return this.readFloat();
+      case TAG_STRING:
+        return this.strings[this.readVarint()];
+      case TAG_LIST: {
+        const length = this.readVarint();
+        const items = [];
+        for (let i = 0; i < length; i++) {
+          items.push(this.decode());
+        }
+        return items;
+      }
+      case TAG_OBJECT: {
+        const object: { [key: string]: any } = {};
+        for (const key of this.shapes[this.readVarint()]) {
+          object[key] = this.decode();
+        }
+        return object;
+      }
+      case TAG_CC: {
+        const byte = this.readByte();
+        return { r: (byte >> 4) + CC_MIN, h: (byte & 0x0f) + CC_MIN };
+      }
+    }
+    throw new Error(`unknown tag ${tag}`);
+  }
+
+  decodeFrame(): any {
+    const version = this.readByte();
+    if (version != VERSION) {
+      throw new Error(`unknown version ${version}`);
+    }
+    const stringCount = this.readVarint();
+    for (let i = 0; i < stringCount; i++) {
+      const length = this.readVarint();
+      this.strings.push(
+        textDecoder.decode(
+          this.bytes.subarray(this.position, this.position + length),
+        ),
+      );
+      this.position += length;
+    }
+    const shapeCount = this.readVarint();
+    for (let i = 0; i < shapeCount; i++) {
+      const keyCount = this.readVarint();
+      const keys = [];
+      for (let j = 0; j < keyCount; j++) {
+        keys.push(this.strings[this.readVarint()]);
+      }
+      this.shapes.push(keys);
+    }
+    return this.decode();
+  }
+}
+
+export const decodeBinaryFrame = (buffer: ArrayBuffer): any =>
+  new Decoder(buffer).decodeFrame();
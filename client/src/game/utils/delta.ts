@@ -0,0 +1,21 @@
+import { GameState } from "../../interfaces/gameState.ts";
+import { GameStateDelta } from "../../interfaces/messages.ts";
+
+export const applyGameStateDelta = (
+  previous: GameState,
+  delta: GameStateDelta,
+): GameState => {
+  const { hexes: changedHexes, ...changed } = delta;
+  const hexes = [...previous.map.hexes];
+  for (const [idx, hex] of changedHexes) {
+    // Only summaries are marked as such, so the mark is dropped from hexes
+    // updated to full detail.
+    const { summary, ...previousHex } = hexes[idx];
+    hexes[idx] = { ...previousHex, ...hex };
+  }
+  return {
+    ...previous,
+    ...changed,
+    map: { ...previous.map, hexes },
+  };
+};
@@ -0,0 +1,21 @@
+import { GameState, LogLine } from "../../interfaces/gameState.ts";
+
+// Appends the new log lines of a game state to the previously received lines.
+// If lines are missing in between, the previous lines are kept as is, and the
+// missing range is returned, so it can be requested from the server.
+export const mergeLogs = (
+  previousLogs: LogLine[],
+  gameState: GameState,
+): { logs: LogLine[]; missing: [number, number] | null } => {
+  const start = gameState.log_cursor - gameState.new_logs.length;
+  if (previousLogs.length < start) {
+    return {
+      logs: previousLogs,
+      missing: [previousLogs.length, gameState.log_cursor],
+    };
+  }
+  return {
+    logs: [...previousLogs.slice(0, start), ...gameState.new_logs],
+    missing: null,
+  };
+};
@@ -0,0 +1,59 @@
+import {
+  Decision,
+  InternedOption,
+  InternedSelectOptionPayload,
+  Option,
+  UnitOption,
+} from "../../interfaces/gameState.ts";
+
+// Resolves the shared target profile and action preview tables of serialized
+// options, the inverse of OptionInterner in game/core.py.
+export const resolveOptions = (
+  payload: InternedSelectOptionPayload,
+): Option[] => {
+  const resolve = (option: InternedOption): Option =>
+    ({
+      ...option,
+      target_profile: payload.target_profiles[option.target_profile],
+    }) as Option;
+  const previews = payload.previews.map(resolve) as UnitOption[];
+  return payload.options.map((option) => {
+    const resolved = resolve(option);
+    if (
+      resolved.type == "ActivateUnitOption" &&
+      option.values.actions_preview !== null
+    ) {
+      resolved.values = {
+        ...resolved.values,
+        actions_preview: Object.fromEntries(
+          Object.entries(
+            option.values.actions_preview as { [key: string]: number[] },
+          ).map(([unitId, indexes]) => [
+            unitId,
+            indexes.map((idx) => previews[idx]),
+          ]),
+        ),
+      };
+    }
+    return resolved;
+  });
+};
+
+// Decisions which are already resolved are returned as is.
+export const resolveDecision = (decision: Decision | null): Decision | null => {
+  if (
+    !decision ||
+    decision.type != "SelectOptionDecisionPoint" ||
+    !("target_profiles" in decision.payload)
+  ) {
+    return decision;
+  }
+  const payload = decision.payload as unknown as InternedSelectOptionPayload;
+  return {
+    ...decision,
+    payload: {
+      options: resolveOptions(payload),
+      options_digest: payload.options_digest,
+    },
+  };
+};
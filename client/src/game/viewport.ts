@@ -0,0 +1,46 @@
+// Reports the part of the map the player is looking at to the server, which
+// sends full detail for hexes in and around it, and summaries for the rest.
+
+import { RC } from "../interfaces/geometry.ts";
+import { hexWidth, rcToCC } from "../geometry.ts";
+import { getMapOrigin } from "./rendering.ts";
+
+// Largest radius the server accepts.
+const MAX_RADIUS = 64;
+
+let sendViewport: ((message: object) => void) | null = null;
+let lastReported: string | null = null;
+
+export const setViewportSender = (send: (message: object) => void) => {
+  sendViewport = send;
+  lastReported = null;
+};
+
+export const reportViewport = (
+  translation: RC,
+  scale: number,
+  width: number,
+  height: number,
+) => {
+  if (!sendViewport) {
+    return;
+  }
+  const origin = getMapOrigin();
+  const message = {
+    message_type: "viewport",
+    center: rcToCC({
+      x: (width / 2 - translation.x) / scale - origin.x,
+      y: (height / 2 - translation.y) / scale - origin.y,
+    }),
+    radius: Math.min(
+      Math.ceil(Math.hypot(width, height) / 2 / scale / hexWidth),
+      MAX_RADIUS,
+    ),
+  };
+  // Only sent when the hex at the center or the radius changes.
+  const key = JSON.stringify(message);
+  if (key != lastReported) {
+    lastReported = key;
+    sendViewport(message);
+  }
+};
@@ -44,6 +44,9 @@ export interface Hex {
   last_visible_round: number | null;
   unit: Unit | null;
   statuses: Status[];
+  // Set for hexes outside the area of interest of the client, which are sent
+  // without statuses.
+  summary?: boolean;
 }
 
 export interface Map {
@@ -126,10 +129,18 @@ export interface Cone extends TargetProfileBase {
   values: { from_hex: CC; to_hexes: CC[]; arm_lengths: number[] };
 }
 
+// Subtrees of lazy trees are sent as the path of option indexes leading to
+// them, and requested separately.
+export interface TreeNodeHandle {
+  handle: number[];
+  // Digest of the subtree, which tells trees with different subtrees apart.
+  digest: string;
+}
+
 export interface TreeNode {
   options: [
     { type: "unit"; id: string } | { type: "hex"; cc: CC },
-    TreeNode | null,
+    TreeNode | TreeNodeHandle | null,
   ][];
   label: string;
 }
@@ -184,7 +195,11 @@ export type UnitOption = SkipOption | MoveOption | EffortOption;
 export interface ActivateUnitOption extends OptionBase {
   type: "ActivateUnitOption";
   values: {
-    actions_preview: { [key: string]: UnitOption[] };
+    // Null if previews are computed lazily, in which case they are requested
+    // for each unit separately.
+    actions_preview: { [key: string]: UnitOption[] } | null;
+    // Digests of the previews, which premoves refer to.
+    actions_preview_digests: { [key: string]: string } | null;
   };
 }
 
@@ -192,7 +207,22 @@ export type Option = UnitOption | ActivateUnitOption;
 
 export interface SelectOptionDecisionPoint extends BaseDecision {
   type: "SelectOptionDecisionPoint";
-  payload: { options: Option[] };
+  payload: { options: Option[]; options_digest: string };
+}
+
+// Options as sent by the server, with target profiles and action previews
+// referring to shared tables by index. Resolved when a frame is received.
+export interface InternedOption {
+  type: string;
+  values: { [key: string]: any };
+  target_profile: number;
+}
+
+export interface InternedSelectOptionPayload {
+  options: InternedOption[];
+  target_profiles: TargetProfile[];
+  previews: InternedOption[];
+  options_digest: string;
 }
 
 export interface DeploymentSpec {
@@ -310,6 +340,8 @@ export interface GameState {
   event_log: string[];
   decision: Decision | null;
   active_unit_context: ActiveUnitContext | null;
+  // Only sent in full by the test server, otherwise accumulated from new_logs.
   logs: LogLine[];
   new_logs: LogLine[];
+  log_cursor: number;
 }
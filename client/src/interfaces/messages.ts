@@ -1,4 +1,11 @@
-import { GameState } from "./gameState.ts";
+import {
+  GameState,
+  Hex,
+  InternedSelectOptionPayload,
+  LogLine,
+  TreeNode,
+} from "./gameState.ts";
+import { CC } from "./geometry.ts";
 
 export interface BaseMessage {
   message_type: string;
@@ -8,12 +15,64 @@ export interface ErrorMessage extends BaseMessage {
   message_type: "error";
 }
 
+// Part of the map a frame was made for. Hexes outside it are summarized.
+export interface Viewport {
+  center: CC;
+  radius: number;
+}
+
 export interface GameStateMessage extends BaseMessage {
   message_type: "game_state";
   count: number;
   game_state: GameState;
   remaining_time?: number;
   grace?: number;
+  viewport?: Viewport;
+}
+
+export interface GameStateDelta
+  extends Partial<Omit<GameState, "map" | "logs">> {
+  hexes: [number, Hex][];
+}
+
+export interface GameStateDeltaMessage extends BaseMessage {
+  message_type: "game_state_delta";
+  count: number;
+  base_count: number;
+  delta: GameStateDelta;
+  remaining_time?: number;
+  grace?: number;
+  viewport?: Viewport;
+}
+
+export type StaticHex = Pick<Hex, "cc" | "is_objective">;
+
+export interface MapStaticMessage extends BaseMessage {
+  message_type: "map_static";
+  hexes: StaticHex[];
+}
+
+export interface LogsMessage extends BaseMessage {
+  message_type: "logs";
+  start: number;
+  logs: LogLine[];
+}
+
+export interface ActionPreviewsMessage
+  extends BaseMessage,
+    InternedSelectOptionPayload {
+  message_type: "action_previews";
+  count: number;
+  unit_id: string;
+}
+
+export interface SubtreeMessage extends BaseMessage {
+  message_type: "subtree";
+  count: number;
+  option_index: number;
+  unit_id: string | null;
+  path: number[];
+  node: TreeNode;
 }
 
 export interface GameResultMessage extends BaseMessage {
@@ -22,4 +81,12 @@ export interface GameResultMessage extends BaseMessage {
   reason: string;
 }
 
-export type Message = ErrorMessage | GameStateMessage | GameResultMessage;
+export type Message =
+  | ErrorMessage
+  | GameStateMessage
+  | GameStateDeltaMessage
+  | LogsMessage
+  | ActionPreviewsMessage
+  | SubtreeMessage
+  | MapStaticMessage
+  | GameResultMessage;
@@ -3,6 +3,7 @@ from __future__ import annotations
 import dataclasses
 import functools
 import inspect
+import itertools
 import re
 import threading
 from abc import ABC, ABCMeta, abstractmethod
@@ -46,23 +47,60 @@ class TriggerLoopError(GameException): ...
 #  Still needs to support key-only routing as well.
 
 
+class EffectIndex(ABC):
+    """
+    Secondary index for state modifiers that can only ever modify some subset of
+    objects, so they are only checked against objects in that subset.
+    """
+
+    @abstractmethod
+    def add(self, effect: StateModifierEffect) -> None: ...
+
+    @abstractmethod
+    def remove(self, effect: StateModifierEffect) -> None: ...
+
+    @abstractmethod
+    def get_effects_for(
+        self, obj: object, target: Any
+    ) -> Iterable[StateModifierEffect]: ...
+
+
 class EffectSet:
     def __init__(self, effects: Iterable[Effect] | None = None):
         # TODO ordered set?
         self.effects: MutableMapping[str, MutableMapping[Any, dict[Effect, None]]] = (
             defaultdict(lambda: defaultdict(dict))
         )
+        self.indexes: dict[type[EffectIndex], EffectIndex] = {}
+        # Effects with the same priority apply in the order they were registered,
+        # whether they are indexed or not.
+        self.registration_order: dict[Effect, int] = {}
+        self._registration_counter = itertools.count()
+        # Incremented whenever the set of effects changes.
+        self.version = 0
         if effects is not None:
             self.register_effects(*effects)
 
     def register_effect(self, effect: F) -> F:
-        self.effects[effect.effect_type][effect.target][effect] = None
+        self.version += 1
+        self.registration_order[effect] = next(self._registration_counter)
+        if (index_type := getattr(effect, "index", None)) is not None:
+            if index_type not in self.indexes:
+                self.indexes[index_type] = index_type()
+            self.indexes[index_type].add(effect)
+        else:
+            self.effects[effect.effect_type][effect.target][effect] = None
         for target, resolver in effect.hooks.items():
             self.effects[HookEffect.effect_type][target][effect] = None
         return effect
 
     def deregister_effect(self, effect: F) -> F:
-        del self.effects[effect.effect_type][effect.target][effect]
+        self.version += 1
+        del self.registration_order[effect]
+        if (index_type := getattr(effect, "index", None)) is not None:
+            self.indexes[index_type].remove(effect)
+        else:
+            del self.effects[effect.effect_type][effect.target][effect]
         for target, resolver in effect.hooks.items():
             del self.effects[HookEffect.effect_type][target][effect]
         return effect
@@ -78,6 +116,13 @@ class EffectSet:
     def get_effects(self, effect_type: type[F] | F, target: Any) -> Iterable[F]:
         return self.effects[effect_type.effect_type][target].keys()
 
+    def get_state_modifiers(
+        self, obj: object, target: Any
+    ) -> Iterator[StateModifierEffect]:
+        yield from self.effects[StateModifierEffect.effect_type][target].keys()
+        for index in self.indexes.values():
+            yield from index.get_effects_for(obj, target)
+
 
 class EventSystem:
     MAX_TRIGGER_RECURSION: ClassVar[int] = 128
@@ -114,6 +159,10 @@ class EventSystem:
     def has_pending_triggers(self) -> bool:
         return bool(self._pending_triggers)
 
+    @property
+    def effects_version(self) -> int:
+        return self._effect_set.version
+
     def register_effect(self, effect: F) -> F:
         self._effect_set.register_effect(effect)
         return effect
@@ -128,15 +177,20 @@ class EventSystem:
     def deregister_effects(self, *effects: Effect) -> None:
         self._effect_set.deregister_effects(*effects)
 
+    def get_state_modifiers(
+        self, obj: object, key: Any
+    ) -> Iterator[StateModifierEffect]:
+        return self._effect_set.get_state_modifiers(obj, key)
+
     def determine_modifiable(self, obj: object, key: Any, request: Any, value: V) -> V:
         for attribute_modifier in sorted(
             (
                 _modifier
-                for _modifier in self._effect_set.get_effects(StateModifierEffect, key)
+                for _modifier in self._effect_set.get_state_modifiers(obj, key)
                 if (obj, key) not in self._evaluated_state_modifiers
                 and _modifier.should_modify(obj, request, value)
             ),
-            key=lambda e: e.priority,
+            key=lambda e: (e.priority, self._effect_set.registration_order[e]),
         ):
             self._evaluated_state_modifiers.add((obj, key))
             value = attribute_modifier.modify(obj, request, value)
@@ -279,6 +333,10 @@ class ScopedEventSystem(EventSystem):
     def has_pending_triggers(self) -> bool:
         return self._es.has_pending_triggers()
 
+    @property
+    def effects_version(self) -> int:
+        return self._es.effects_version
+
     def register_effect(self, effect: F) -> F:
         # TODO fix same return
         self._es.register_effects(effect)
@@ -294,6 +352,11 @@ class ScopedEventSystem(EventSystem):
     def deregister_effects(self, *effects: Effect) -> None:
         self._es.deregister_effects(*effects)
 
+    def get_state_modifiers(
+        self, obj: object, key: Any
+    ) -> Iterator[StateModifierEffect]:
+        return self._es.get_state_modifiers(obj, key)
+
     def determine_modifiable(self, obj: object, key: Any, request: Any, value: V) -> V:
         return self._es.determine_modifiable(obj, key, request, value)
 
@@ -562,6 +625,9 @@ class _StateModifierMeta(_EffectMeta):
 
 class StateModifierEffect(Effect, Generic[T, C, V], ABC, metaclass=_StateModifierMeta):
     effect_type = "state_modifier"
+    # Modifiers with an index are registered with it instead of being checked
+    # against every object.
+    index: ClassVar[type[EffectIndex] | None] = None
 
     def should_modify(self, obj: T, request: C, value: V) -> bool:
         return True
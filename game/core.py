@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import contextlib
 import dataclasses
+import hashlib
+import itertools
 import json
 import re
 import threading
@@ -12,7 +14,9 @@ from typing import (
     Any,
     Callable,
     ClassVar,
+    Collection,
     Generic,
+    Hashable,
     Iterable,
     Iterator,
     Literal,
@@ -27,6 +31,8 @@ from bidict import bidict
 from pydantic import BaseModel, ValidationError
 
 from events.eventsystem import (
+    ES,
+    Event,
     EventResolution,
     Modifiable,
     ModifiableAttribute,
@@ -36,8 +42,14 @@ from game.has_effects import HasEffectChildren, HasEffects
 from game.identification import IDMap
 from game.info.registered import Registered, UnknownIdentifierError, get_registered_meta
 from game.map.coordinates import CC, Corner, CornerPosition, line_of_sight_obstructed
-from game.map.geometry import hex_circle
+from game.map.geometry import (
+    ORIGIN,
+    corner_offsets,
+    hex_circle_offsets,
+    translate_and_clip,
+)
 from game.schemas import (
+    ActionPreviewsRequestSchema,
     DecisionResponseSchema,
     DecisionValidationError,
     DeployArmyDecisionPointSchema,
@@ -47,6 +59,7 @@ from game.schemas import (
     SelectArmyDecisionPointSchema,
     SelectOptionAtHexDecisionPointSchema,
     SelectOptionDecisionPointSchema,
+    SubtreeRequestSchema,
 )
 from game.values import (
     ControllerTargetOption,
@@ -73,7 +86,7 @@ JSON: TypeAlias = Mapping[str, Any]
 @dataclasses.dataclass
 class SerializationContext:
     player: Player
-    last_hex_states: dict[CC : dict[str, Any]] | None
+    last_seen: LastSeenHexes | None
     visible_unit_ids: set[str]
     visible_blueprint_ids: set[str]
 
@@ -129,6 +142,15 @@ class TargetProfile(ABC, Generic[G_target_result]):
     def parse_response(self, v: Mapping[str, Any]) -> G_target_result:
         return self.parse_response_schema(self.response_schema.model_validate(v))
 
+    def serialize_subtree(
+        self, context: SerializationContext, path: Sequence[int]
+    ) -> JSON:
+        """
+        For target profiles that are sent to clients in parts, serializes the part
+        at path.
+        """
+        raise DecisionValidationError("no subtrees")
+
 
 class NoneResult(TargetResult):
     def to_log_element(self) -> LogElement | None:
@@ -148,21 +170,108 @@ class NoTarget(TargetProfile[NoneResult]):
         return NoneResult()
 
 
+class OptionInterner:
+    """
+    Collects the target profiles and action previews of a decision payload into
+    tables, so that identical ones, like the move targets of units standing next to
+    each other, are only sent once per frame, and options refer to them by index.
+    """
+
+    def __init__(self):
+        self.target_profiles: list[JSON] = []
+        self.previews: list[JSON] = []
+        self._target_profile_keys: list[str] = []
+        self._target_profile_indexes: dict[str, int] = {}
+        self._preview_indexes: dict[str, int] = {}
+
+    def intern_target_profile(self, target_profile: JSON) -> int:
+        key = json.dumps(target_profile)
+        if (idx := self._target_profile_indexes.get(key)) is None:
+            idx = self._target_profile_indexes[key] = len(self.target_profiles)
+            self.target_profiles.append(target_profile)
+            self._target_profile_keys.append(key)
+        return idx
+
+    def intern_preview(self, option: JSON) -> int:
+        key = json.dumps(option)
+        if (idx := self._preview_indexes.get(key)) is None:
+            idx = self._preview_indexes[key] = len(self.previews)
+            self.previews.append(option)
+        return idx
+
+    def get_digest(self, options: list[JSON]) -> str:
+        """
+        Digest of serialized options, which doesn't depend on where their target
+        profiles ended up in the table, so premoves can be matched against the
+        options of later decisions by digest alone.
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        for option in options:
+            digest.update(json.dumps([option["type"], option["values"]]).encode())
+            digest.update(self._target_profile_keys[option["target_profile"]].encode())
+        return digest.hexdigest()
+
+
+def resolve_interned_options(payload: Mapping[str, Any]) -> list[JSON]:
+    """
+    Inverse of serializing options with an OptionInterner, the same as clients do.
+    """
+    target_profiles = payload["target_profiles"]
+
+    def resolve(option: Mapping[str, Any]) -> JSON:
+        return {**option, "target_profile": target_profiles[option["target_profile"]]}
+
+    previews = [resolve(option) for option in payload["previews"]]
+    options = []
+    for option in payload["options"]:
+        resolved = resolve(option)
+        if (
+            option["type"] == ActivateUnitOption.__name__
+            and option["values"]["actions_preview"] is not None
+        ):
+            resolved["values"] = {
+                **option["values"],
+                "actions_preview": {
+                    unit_id: [previews[idx] for idx in indexes]
+                    for unit_id, indexes in option["values"]["actions_preview"].items()
+                },
+            }
+        options.append(resolved)
+    return options
+
+
 @dataclasses.dataclass(kw_only=True)
 class Option(ABC, Generic[G_target_result]):
     target_profile: TargetProfile[G_target_result]
 
     @abstractmethod
-    def serialize_values(self, context: SerializationContext) -> JSON: ...
+    def serialize_values(
+        self, context: SerializationContext, interner: OptionInterner
+    ) -> JSON: ...
 
-    def serialize(self, context: SerializationContext) -> JSON:
+    def serialize(
+        self, context: SerializationContext, interner: OptionInterner
+    ) -> JSON:
         return {
             "type": type(self).__name__,
-            "values": self.serialize_values(context),
-            "target_profile": self.target_profile.serialize(context),
+            "values": self.serialize_values(context, interner),
+            "target_profile": interner.intern_target_profile(
+                self.target_profile.serialize(context)
+            ),
         }
 
 
+def serialize_options(options: Iterable[Option], context: SerializationContext) -> JSON:
+    interner = OptionInterner()
+    serialized = [option.serialize(context, interner) for option in options]
+    return {
+        "options": serialized,
+        "target_profiles": interner.target_profiles,
+        "previews": interner.previews,
+        "options_digest": interner.get_digest(serialized),
+    }
+
+
 @dataclasses.dataclass
 class OptionDecision(Generic[G_target_result]):
     option: Option[G_target_result]
@@ -180,7 +289,7 @@ class SelectOptionDecisionPoint(DecisionPoint[OptionDecision]):
         return self.explanation
 
     def serialize_payload(self, context: SerializationContext) -> JSON:
-        return {"options": [option.serialize(context) for option in self.options]}
+        return serialize_options(self.options, context)
 
     def parse_response_schema(
         self, v: SelectOptionDecisionPointSchema
@@ -306,7 +415,9 @@ class SelectOptionAtHexDecisionPoint(DecisionPoint[str]):
 
 
 class MoveOption(Option[G_target_result]):
-    def serialize_values(self, context: SerializationContext) -> JSON:
+    def serialize_values(
+        self, context: SerializationContext, interner: OptionInterner
+    ) -> JSON:
         return {}
 
 
@@ -314,31 +425,91 @@ class MoveOption(Option[G_target_result]):
 class EffortOption(Option[G_target_result]):
     facet: EffortFacet
 
-    def serialize_values(self, context: SerializationContext) -> JSON:
+    def serialize_values(
+        self, context: SerializationContext, interner: OptionInterner
+    ) -> JSON:
         return {"facet": self.facet.serialize_type()}
 
 
+class LazyActionPreviews(Mapping["Unit", list[Option]]):
+    """
+    The legal options of units about to be activated, which are only computed for
+    the units clients ask for, and then kept for as long as the decision is open.
+    """
+
+    def __init__(self, units: Iterable[Unit]):
+        self._units = list(units)
+        self._previews: dict[Unit, list[Option]] = {}
+
+    def __getitem__(self, unit: Unit) -> list[Option]:
+        if (options := self._previews.get(unit)) is None:
+            if unit not in self._units:
+                raise KeyError(unit)
+            options = self._previews[unit] = unit.get_legal_options(
+                ActiveUnitContext(unit, 1)
+            )
+        return options
+
+    def __iter__(self) -> Iterator[Unit]:
+        return iter(self._units)
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def can_skip(self, unit: Unit) -> bool:
+        """
+        Units can always skip at the start of their activation, unless a modifier
+        of their legal options applies to them, so only then are their options
+        computed to find out. Modifiers of legal options decide whether they apply
+        by the unit and the context, not by the options.
+        """
+        if unit not in self._previews:
+            context = ActiveUnitContext(unit, 1)
+            skip_only = [SkipOption(target_profile=NoTarget())]
+            if not any(
+                modifier.should_modify(unit, context, skip_only)
+                for modifier in ES.get_state_modifiers(
+                    unit, Unit.get_legal_options.__target__
+                )
+            ):
+                return True
+        return any(isinstance(option, SkipOption) for option in self[unit])
+
+
 @dataclasses.dataclass
 class ActivateUnitOption(Option[G_target_result]):
-    actions_previews: dict[Unit, list[Option]]
-
-    def serialize_values(self, context: SerializationContext) -> JSON:
-        return {
-            "actions_preview": {
-                context.player.id_map.get_id_for(unit): [
-                    option.serialize(context) for option in options
-                ]
-                for unit, options in self.actions_previews.items()
-            }
-        }
+    actions_previews: Mapping[Unit, list[Option]]
+
+    def serialize_values(
+        self, context: SerializationContext, interner: OptionInterner
+    ) -> JSON:
+        # Lazy previews are requested by clients separately, for the units they
+        # are interested in.
+        if isinstance(self.actions_previews, LazyActionPreviews):
+            return {"actions_preview": None, "actions_preview_digests": None}
+        previews = {}
+        digests = {}
+        for unit, options in self.actions_previews.items():
+            unit_id = context.player.id_map.get_id_for(unit)
+            serialized = [option.serialize(context, interner) for option in options]
+            previews[unit_id] = [
+                interner.intern_preview(option) for option in serialized
+            ]
+            digests[unit_id] = interner.get_digest(serialized)
+        return {"actions_preview": previews, "actions_preview_digests": digests}
 
 
 class SkipOption(Option[NoneResult]):
-    def serialize_values(self, context: SerializationContext) -> JSON:
+    def serialize_values(
+        self, context: SerializationContext, interner: OptionInterner
+    ) -> JSON:
         return {}
 
 
 class HasStatuses(HasEffects, Generic[G_Status, G_StatusSignature]):
+    # Incremented whenever a status is added to or removed from anything.
+    statuses_version: ClassVar[int] = 0
+
     def __init__(self, parent: HasEffectChildren | None = None):
         super().__init__(parent=parent)
         self.statuses: list[G_Status] = []
@@ -356,6 +527,7 @@ class HasStatuses(HasEffects, Generic[G_Status, G_StatusSignature]):
 
         status = signature.realize(self)
         self.statuses.append(status)
+        HasStatuses.statuses_version += 1
         status.create_effects()
         status.on_apply()
         return status
@@ -376,6 +548,7 @@ class HasStatuses(HasEffects, Generic[G_Status, G_StatusSignature]):
             self.statuses.remove(status)
         except ValueError:
             pass
+        HasStatuses.statuses_version += 1
         status.deregister()
 
 
@@ -1520,18 +1693,34 @@ class Terrain(HasEffects, Registered, ABC, metaclass=get_registered_meta()):
 
 class Hex(Modifiable, HasStatuses["HexStatus", "HexStatusSignature"], Serializable):
     def __init__(
-        self, position: CC, terrain: Terrain, is_objective: bool, map_: HexMap
+        self,
+        position: CC,
+        terrain: Terrain,
+        is_objective: bool,
+        map_: HexMap,
+        index: int = 0,
     ):
         super().__init__()
         self.position = position
+        # Dense index of this hex in its map, for array backed lookups.
+        self.index = index
+        # TODO name?
+        self.map = map_
         self.terrain = terrain
         self.is_objective = is_objective
 
         self.original_terrain_type = type(terrain)
 
         self.captured_by: Player | None = None
-        # TODO name?
-        self.map = map_
+
+    @property
+    def terrain(self) -> Terrain:
+        return self._terrain
+
+    @terrain.setter
+    def terrain(self, terrain: Terrain) -> None:
+        self._terrain = terrain
+        self.map.terrain_version += 1
 
     @modifiable
     def is_passable_to(self, unit: Unit) -> bool:
@@ -1565,20 +1754,32 @@ class Hex(Modifiable, HasStatuses["HexStatus", "HexStatusSignature"], Serializab
     def get_move_out_penalty_for(self, unit: Unit) -> int:
         return self.terrain.get_move_out_penalty_for(unit)
 
+    @property
+    def blocked_vision_obstruction(self) -> VisionObstruction:
+        return (
+            VisionObstruction.FULL
+            if self.terrain.is_high_ground
+            else VisionObstruction.FOR_LOW_GROUND
+        )
+
     @modifiable
-    def blocks_vision_for(self, player: Player) -> VisionObstruction:
+    def get_vision_obstruction(self, _: None) -> VisionObstruction:
+        """
+        The vision obstruction of this hex from its terrain, which is the same for
+        all players. Units blocking vision are added per player.
+        """
         if self.terrain.blocks_vision:
-            if self.terrain.is_high_ground:
-                return VisionObstruction.FULL
-            return VisionObstruction.FOR_LOW_GROUND
-        if (unit := self.map.unit_on(self)) and unit.blocks_vision_for(player):
-            if self.terrain.is_high_ground:
-                return VisionObstruction.FULL
-            return VisionObstruction.FOR_LOW_GROUND
+            return self.blocked_vision_obstruction
         if self.terrain.is_high_ground:
             return VisionObstruction.FOR_LOW_GROUND
         return VisionObstruction.NONE
 
+    def blocks_vision_for(self, player: Player) -> VisionObstruction:
+        obstruction = self.get_vision_obstruction(None)
+        if (unit := self.map.unit_on(self)) and unit.blocks_vision_for(player):
+            return max(obstruction, self.blocked_vision_obstruction)
+        return obstruction
+
     @modifiable
     def is_visible_to(self, player: Player) -> bool:
         return GS.vision_map[player][self.position]
@@ -1597,7 +1798,7 @@ class Hex(Modifiable, HasStatuses["HexStatus", "HexStatusSignature"], Serializab
         )
 
     def serialize(self, context: SerializationContext) -> JSON:
-        old_hex = (context.last_hex_states or {}).get(self.position)
+        old_hex = context.last_seen and context.last_seen.get(self.index)
         return {
             "cc": self.position.serialize(),
             "is_objective": self.is_objective,
@@ -1747,7 +1948,15 @@ CCArg: TypeAlias = CC | Hex | Unit
 
 # TODO reasonable and consistent utils interface for this disaster
 class HexMap:
+    # Most corner range queries are for the few ranges of the units and abilities
+    # in play around hexes on the map, which fit well within this.
+    corner_range_cache_size: ClassVar[int] = 4096
+
     def __init__(self, landscape: Landscape):
+        # Incremented whenever the terrain of a hex changes.
+        self.terrain_version = 0
+        # Incremented whenever a unit is placed, moved or removed.
+        self.units_version = 0
         # TODO all these should be private
         self.hexes = {
             position: Hex(
@@ -1755,23 +1964,46 @@ class HexMap:
                 terrain=hex_spec.terrain_type(),
                 is_objective=hex_spec.is_objective,
                 map_=self,
+                index=index,
             )
-            for position, hex_spec in landscape.terrain_map.items()
+            for index, (position, hex_spec) in enumerate(landscape.terrain_map.items())
         }
+        self.hex_list: list[Hex] = list(self.hexes.values())
         for _hex in self.hexes.values():
             _hex.terrain.create_effects(_hex)
+        # All corners on the map with three hexes around them, mapped to the
+        # indexes of those hexes.
+        self._corners: dict[Corner, tuple[int, ...]] = {}
+        for _hex in self.hex_list:
+            for position in CornerPosition:
+                corner = Corner(_hex.position, position)
+                adjacent = corner.get_adjacent_positions()
+                if all(cc in self.hexes for cc in adjacent):
+                    self._corners[corner] = tuple(
+                        self.hexes[cc].index for cc in adjacent
+                    )
+        self._corner_range_cache: dict[tuple[CC, int, int], tuple[Corner, ...]] = {}
         self.unit_positions: bidict[Unit, Hex] = bidict()
         # TODO better plan for handling this?
         self.last_known_positions: dict[Unit, Hex] = {}
 
+        # Spatial index of units on the map, kept in sync with unit_positions by
+        # move_unit_to and remove_unit. Units per controller are kept in dicts
+        # as ordered sets, so iteration order is spawn order, like unit_positions.
+        self._occupants: list[Unit | None] = [None] * len(self.hex_list)
+        self._controlled_units: defaultdict[Player, dict[Unit, None]] = defaultdict(
+            dict
+        )
+        self._units: tuple[Unit, ...] | None = ()
+
     @property
-    def units(self) -> list[Unit]:
-        return list(self.unit_positions.keys())
+    def units(self) -> Sequence[Unit]:
+        if self._units is None:
+            self._units = tuple(self.unit_positions.keys())
+        return self._units
 
     def units_controlled_by(self, player: Player) -> Iterator[Unit]:
-        for unit in self.units:
-            if unit.controller == player:
-                yield unit
+        yield from list(self._controlled_units[player])
 
     def hex_off(self, unit: Unit) -> Hex:
         return self.unit_positions.get(unit) or self.last_known_positions[unit]
@@ -1795,17 +2027,28 @@ class HexMap:
 
     def move_unit_to(self, unit: Unit, to: CCArg) -> bool:
         _hex = self._to_hex(to)
-        if self.unit_positions.inverse.get(_hex) is not None:
+        if self._occupants[_hex.index] is not None:
             return False
+        if (from_ := self.unit_positions.get(unit)) is not None:
+            self._occupants[from_.index] = None
+        else:
+            self._controlled_units[unit.controller][unit] = None
+            self._units = None
+        self._occupants[_hex.index] = unit
         self.unit_positions[unit] = _hex
+        self.units_version += 1
         return True
 
     def remove_unit(self, unit: Unit) -> None:
-        self.last_known_positions[unit] = self.unit_positions[unit]
+        self.last_known_positions[unit] = _hex = self.unit_positions[unit]
         del self.unit_positions[unit]
+        self._occupants[_hex.index] = None
+        del self._controlled_units[unit.controller][unit]
+        self._units = None
+        self.units_version += 1
 
     def unit_on(self, on: CCArg) -> Unit | None:
-        return self.unit_positions.inverse.get(self._to_hex(on))
+        return self._occupants[self._to_hex(on).index]
 
     def units_on(self, on: Iterable[CCArg]) -> Iterator[Unit]:
         for o in on:
@@ -1824,41 +2067,85 @@ class HexMap:
         self, off: CCArg, controlled_by: Player | None = None
     ) -> Iterator[Unit]:
         for _hex in self.get_neighbors_off(off):
-            if unit := self.unit_positions.inverse.get(_hex):
+            if unit := self._occupants[_hex.index]:
                 if controlled_by is None or controlled_by == unit.controller:
                     yield unit
 
     def get_hexes_within_range_off(
         self, off: CCArg, distance: int, min_distance: int | None = None
     ) -> Iterator[Hex]:
-        for cc in hex_circle(distance, center=(center := self._to_cc(off))):
-            if min_distance is None or cc.distance_to(center) >= min_distance:
-                if cc in self.hexes:
-                    yield self.hexes[cc]
+        return translate_and_clip(
+            hex_circle_offsets(distance, min_distance or 0),
+            self._to_cc(off),
+            self.hexes,
+        )
 
     def get_corners_within_range_off(
         self, off: CCArg, distance: int, min_distance: int | None = None
     ) -> Iterator[Corner]:
-        for cc in hex_circle(distance, center=(center := self._to_cc(off))):
-            for position in CornerPosition:
-                corner = Corner(cc, position)
-                if all(
-                    cc in self.hexes
-                    and cc.distance_to(center) <= distance
-                    and (min_distance is None or cc.distance_to(center) >= min_distance)
-                    for cc in corner.get_adjacent_positions()
-                ):
-                    yield corner
+        key = (center := self._to_cc(off), distance, min_distance or 0)
+        if (corners := self._corner_range_cache.get(key)) is None:
+            if len(self._corner_range_cache) >= self.corner_range_cache_size:
+                # Evicts the oldest query.
+                del self._corner_range_cache[next(iter(self._corner_range_cache))]
+            corners = self._corner_range_cache[key] = tuple(
+                corner
+                for offset in corner_offsets(distance, min_distance or 0)
+                if (corner := Corner(offset.cc + center, offset.position))
+                in self._corners
+            )
+        return iter(corners)
 
-    def get_units_within_range_off(self, off: CCArg, distance: int) -> Iterator[Unit]:
-        for _hex in self.get_hexes_within_range_off(off, distance):
-            if unit := self.unit_positions.inverse.get(_hex):
-                yield unit
+    def get_hexes_around_corner(self, corner: Corner) -> list[Hex]:
+        if (indexes := self._corners.get(corner)) is None:
+            return list(self.get_hexes_of_positions(corner.get_adjacent_positions()))
+        return [self.hex_list[index] for index in indexes]
+
+    def get_units_within_range_off(
+        self,
+        off: CCArg,
+        distance: int,
+        controlled_by: Player | Collection[Player] | None = None,
+    ) -> Iterator[Unit]:
+        if isinstance(controlled_by, Player):
+            controlled_by = (controlled_by,)
+        center = self._to_cc(off)
+        offsets = hex_circle_offsets(distance)
+        candidate_count = (
+            len(self.unit_positions)
+            if controlled_by is None
+            else sum(len(self._controlled_units[p]) for p in controlled_by)
+        )
+        # Iterate whichever is smaller, the units that could be in range, or the
+        # hexes in range. Units are yielded in the same order either way.
+        if candidate_count < len(offsets):
+            yield from sorted(
+                (
+                    unit
+                    for unit in (
+                        self.unit_positions.keys()
+                        if controlled_by is None
+                        else itertools.chain.from_iterable(
+                            self._controlled_units[p] for p in controlled_by
+                        )
+                    )
+                    if self.unit_positions[unit].position.distance_to(center)
+                    <= distance
+                ),
+                key=lambda unit: self.unit_positions[unit].position,
+            )
+        else:
+            for _hex in translate_and_clip(offsets, center, self.hexes):
+                if (unit := self._occupants[_hex.index]) and (
+                    controlled_by is None or unit.controller in controlled_by
+                ):
+                    yield unit
 
     def get_hexes_of_positions(self, positions: Iterable[CC]) -> Iterator[Hex]:
-        for position in positions:
-            if position in self.hexes:
-                yield self.hexes[position]
+        return translate_and_clip(positions, ORIGIN, self.hexes)
+
+    def get_hexes_of_offsets(self, offsets: Iterable[CC], off: CCArg) -> Iterator[Hex]:
+        return translate_and_clip(offsets, self._to_cc(off), self.hexes)
 
     def serialize(self, context: SerializationContext) -> JSON:
         return {"hexes": [_hex.serialize(context) for _hex in self.hexes.values()]}
@@ -1875,16 +2162,20 @@ def find_units_within_range(
 ) -> list[Unit]:
     return [
         unit
-        for unit in GS.map.get_units_within_range_off(from_unit, within_range)
-        if (
-            not with_controller
-            or (
-                (unit.controller == from_unit.controller)
-                if with_controller == ControllerTargetOption.ALLIED
-                else (unit.controller != from_unit.controller)
-            )
+        for unit in GS.map.get_units_within_range_off(
+            from_unit,
+            within_range,
+            controlled_by=(
+                None
+                if not with_controller
+                else (
+                    from_unit.controller
+                    if with_controller == ControllerTargetOption.ALLIED
+                    else [p for p in GS.turn_order if p != from_unit.controller]
+                )
+            ),
         )
-        and unit.is_visible_to(from_unit.controller)
+        if unit.is_visible_to(from_unit.controller)
         and (
             not require_los
             or within_range <= 1
@@ -1963,26 +2254,67 @@ class LogLine:
     elements: LogElement
     valid_for_players: set[Player] | None = None
 
-    def is_visible_to(self, player: Player) -> bool:
+    @classmethod
+    def _is_element_visible_to(
+        cls, element: Unit | Hex, player: Player, visibility: dict[Unit | Hex, bool]
+    ) -> bool:
+        if (visible := visibility.get(element)) is None:
+            visible = visibility[element] = element.is_visible_to(player)
+        return visible
+
+    def is_visible_to(
+        self, player: Player, visibility: dict[Unit | Hex, bool] | None = None
+    ) -> bool:
         if self.valid_for_players and player not in self.valid_for_players:
             return False
+        if visibility is None:
+            visibility = {}
         for element in self.elements:
             if isinstance(element, list) and not any(
-                e.is_visible_to(player) if isinstance(e, (Unit, Hex)) else True
+                (
+                    self._is_element_visible_to(e, player, visibility)
+                    if isinstance(e, (Unit, Hex))
+                    else True
+                )
                 for e in element
             ):
                 return False
-            if isinstance(element, Unit) and not element.is_visible_to(player):
-                return False
-            if isinstance(element, Hex) and not element.is_visible_to(player):
+            if isinstance(element, (Unit, Hex)) and not self._is_element_visible_to(
+                element, player, visibility
+            ):
                 return False
             if isinstance(element, Status) and element.is_hidden_for(player):
                 return False
         return True
 
+    def get_hidden_list_items_for(
+        self, player: Player, visibility: dict[Unit | Hex, bool] | None = None
+    ) -> frozenset[Unit | Hex]:
+        if visibility is None:
+            visibility = {}
+        return frozenset(
+            e
+            for element in self.elements
+            if isinstance(element, list)
+            for e in element
+            if isinstance(e, (Unit, Hex))
+            and not self._is_element_visible_to(e, player, visibility)
+        )
+
+    def get_units(self) -> Iterator[Unit]:
+        for element in self.elements:
+            if isinstance(element, list):
+                yield from (e for e in element if isinstance(e, Unit))
+            elif isinstance(element, Unit):
+                yield element
+
     @classmethod
     def _serialize_element(
-        cls, element: str | Unit | Hex, player: Player
+        cls,
+        element: str | Unit | Hex,
+        player: Player,
+        positions: Mapping[Unit, CC] | None,
+        hidden: frozenset[Unit | Hex],
     ) -> dict[str, Any]:
         if isinstance(element, Unit):
             return {
@@ -1990,7 +2322,11 @@ class LogLine:
                 "identifier": player.id_map.get_id_for(element),
                 "blueprint": element.blueprint.identifier,
                 "controller": element.controller.name,
-                "cc": GS.map.position_off(element).serialize(),
+                "cc": (
+                    GS.map.position_off(element)
+                    if positions is None
+                    else positions[element]
+                ).serialize(),
             }
         if isinstance(element, Hex):
             return {"type": "hex", "cc": element.position.serialize()}
@@ -2002,9 +2338,16 @@ class LogLine:
             return {
                 "type": "list",
                 "items": [
-                    cls._serialize_element(e, player)
+                    cls._serialize_element(e, player, positions, hidden)
                     for e in element
-                    if not (isinstance(e, (Unit, Hex)) and not e.is_visible_to(player))
+                    if not (
+                        isinstance(e, (Unit, Hex))
+                        and (
+                            e in hidden
+                            if positions is not None
+                            else not e.is_visible_to(player)
+                        )
+                    )
                 ],
             }
         if isinstance(element, Player):
@@ -2013,16 +2356,68 @@ class LogLine:
             return {"type": "blueprint", "blueprint": element.identifier}
         return {"type": "string", "message": element}
 
-    def serialize(self, player: Player) -> list[dict[str, Any]]:
-        return [self._serialize_element(element, player) for element in self.elements]
+    def serialize(
+        self,
+        player: Player,
+        positions: Mapping[Unit, CC] | None = None,
+        hidden: frozenset[Unit | Hex] = frozenset(),
+    ) -> list[dict[str, Any]]:
+        """
+        Without positions, units are serialized where they are now, and list items
+        are filtered by current visibility. Otherwise units are serialized at the
+        given positions, and the hidden list items are left out.
+        """
+        return [
+            self._serialize_element(element, player, positions, hidden)
+            for element in self.elements
+        ]
+
+
+@dataclasses.dataclass(eq=False)
+class LogRecord:
+    """
+    A log line as it was emitted, stored once for every player that sees it. What
+    depends on the state at the time it was emitted is captured then, and it is
+    rendered for players only once frames including it are built.
+    """
+
+    line: LogLine
+    positions: dict[Unit, CC]
+    has_units: bool
+    _rendered: dict[Hashable, tuple[int, list[dict[str, Any]]]] = dataclasses.field(
+        default_factory=dict
+    )
+
+    @classmethod
+    def capture(cls, line: LogLine) -> LogRecord:
+        positions = {
+            unit: GS.map.position_off(unit)
+            for unit in line.get_units()
+            # Units only in lists may never have been on the map, they are left
+            # out for every player then anyway.
+            if unit in GS.map.unit_positions or unit in GS.map.last_known_positions
+        }
+        return cls(line, positions, any(True for _ in line.get_units()))
+
+    def render_for(
+        self, player: Player, level: int, hidden: frozenset[Unit | Hex]
+    ) -> tuple[int, list[dict[str, Any]]]:
+        # Entries that are the same for several players are only rendered once.
+        key = (level, player.id_map if self.has_units else None, hidden)
+        if (entry := self._rendered.get(key)) is None:
+            entry = self._rendered[key] = (
+                level,
+                self.line.serialize(player, self.positions, hidden),
+            )
+        return entry
 
 
 class Player:
-    def __init__(self, name: str):
+    def __init__(self, name: str, id_map: IDMap | None = None):
         self.name = name
 
         self.points: int = 0
-        self.id_map = IDMap()
+        self.id_map = IDMap() if id_map is None else id_map
 
         self.recently_witnessed_kills: set[Unit] = set()
 
@@ -2077,6 +2472,19 @@ class TurnOrder:
         yield from self.all_players
 
 
+class Observer(ABC):
+    """
+    Is sent the game state as seen by the spectator player, whenever game states are
+    sent to the players while it is observing.
+    """
+
+    @abstractmethod
+    def is_observing(self) -> bool: ...
+
+    @abstractmethod
+    def observe(self, game_state: Mapping[str, Any]) -> None: ...
+
+
 class Connection(ABC):
     def __init__(self, player: Player):
         self.player = player
@@ -2084,6 +2492,7 @@ class Connection(ABC):
         self._game_state_counter: int = 0
         self._premove: PremoveSchema | None = None
         self._waiting_for_decision: DecisionPoint | None = None
+        self._last_game_state: Mapping[str, Any] | None = None
 
     def send_error(self, error_type: str, error_detail: Any = None) -> None:
         print("error from client", error_type, error_detail)
@@ -2111,6 +2520,84 @@ class Connection(ABC):
                 self._premove = response.premove
             return result
 
+    def _get_action_previews(self, unit_id: str) -> list[Option] | None:
+        for option in self._waiting_for_decision.options:
+            if not isinstance(option, ActivateUnitOption):
+                continue
+            for unit, options in option.actions_previews.items():
+                if self.player.id_map.get_id_for(unit) == unit_id:
+                    return options
+        return None
+
+    def send_action_previews(self, v: Mapping[str, Any]) -> None:
+        """
+        Answers a request for the action previews of a unit in the open decision,
+        without advancing the game.
+        """
+        try:
+            request = ActionPreviewsRequestSchema.model_validate(v)
+        except ValidationError as e:
+            self.send_error("invalid_action_previews_request", e.errors())
+            return
+        if request.count != self._game_state_counter or not isinstance(
+            self._waiting_for_decision, SelectOptionDecisionPoint
+        ):
+            self.send_error("invalid_response_count")
+            return
+        if (options := self._get_action_previews(request.unit_id)) is None:
+            self.send_error("invalid_action_previews_request", "unknown unit")
+            return
+        self.send(
+            {
+                "message_type": "action_previews",
+                "count": request.count,
+                "unit_id": request.unit_id,
+                **GS.serialize_options_for(self.player, options),
+            }
+        )
+
+    def send_subtree(self, v: Mapping[str, Any]) -> None:
+        """
+        Answers a request for a subtree of the target profile of an option in the
+        open decision, or in the action previews of a unit, without advancing the
+        game.
+        """
+        try:
+            request = SubtreeRequestSchema.model_validate(v)
+        except ValidationError as e:
+            self.send_error("invalid_subtree_request", e.errors())
+            return
+        if request.count != self._game_state_counter or not isinstance(
+            self._waiting_for_decision, SelectOptionDecisionPoint
+        ):
+            self.send_error("invalid_response_count")
+            return
+        options = (
+            self._waiting_for_decision.options
+            if request.unit_id is None
+            else self._get_action_previews(request.unit_id)
+        )
+        if options is None or request.option_index >= len(options):
+            self.send_error("invalid_subtree_request", "unknown option")
+            return
+        try:
+            node = GS.serialize_subtree_for(
+                self.player, options[request.option_index].target_profile, request.path
+            )
+        except DecisionValidationError as e:
+            self.send_error("invalid_subtree_request", e.args[0])
+            return
+        self.send(
+            {
+                "message_type": "subtree",
+                "count": request.count,
+                "option_index": request.option_index,
+                "unit_id": request.unit_id,
+                "path": request.path,
+                "node": node,
+            }
+        )
+
     @abstractmethod
     def send(self, values: Mapping[str, Any]) -> None: ...
 
@@ -2126,10 +2613,28 @@ class Connection(ABC):
     def send_game_state(
         self, game_state: Mapping[str, Any], decision_point: DecisionPoint | None = None
     ) -> None:
+        # Premoves are for the decision following the frame they were made on, and
+        # are discarded with any later frame, sent or not.
         self._premove = None
+        # Waiting players are sent a frame before every decision of other players,
+        # and those where nothing changed from their point of view are dropped.
+        # Serialized hexes are mostly reused from the serialization cache, so
+        # comparing is cheap.
+        if (
+            decision_point is None
+            and self._waiting_for_decision is None
+            and game_state == self._last_game_state
+        ):
+            return
+        self._last_game_state = game_state
         self._game_state_counter += 1
         self._waiting_for_decision = decision_point
-        self.send(self.make_game_state_frame(game_state, decision_point))
+        self.send_game_state_frame(
+            self.make_game_state_frame(game_state, decision_point)
+        )
+
+    def send_game_state_frame(self, frame: Mapping[str, Any]) -> None:
+        self.send(frame)
 
     @abstractmethod
     def wait_for_response(self) -> Iterator[G_decision_result | None]: ...
@@ -2142,8 +2647,8 @@ class Connection(ABC):
         if (
             self._premove
             and isinstance(decision_point, SelectOptionDecisionPoint)
-            and self._premove.for_options
-            == json.loads(json.dumps(game_state["decision"]["payload"]["options"]))
+            and self._premove.options_digest
+            == game_state["decision"]["payload"]["options_digest"]
         ):
             try:
                 validated_premove = decision_point.parse_response(self._premove.payload)
@@ -2164,54 +2669,226 @@ class Connection(ABC):
                 return v
 
 
+def _get_referenced_hexes(value: Any, hex_map: HexMap, depth: int = 2) -> Iterator[Hex]:
+    if isinstance(value, Hex):
+        yield value
+    elif isinstance(value, Unit):
+        if _hex := hex_map.unit_positions.get(
+            value
+        ) or hex_map.last_known_positions.get(value):
+            yield _hex
+    elif isinstance(value, (Status, Facet)):
+        yield from _get_referenced_hexes(value.parent, hex_map, depth)
+    elif depth > 0:
+        if isinstance(value, (list, tuple, set, frozenset)):
+            for item in value:
+                yield from _get_referenced_hexes(item, hex_map, depth - 1)
+        elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+            for field in dataclasses.fields(value):
+                if field.name not in ("parent", "children"):
+                    yield from _get_referenced_hexes(
+                        getattr(value, field.name), hex_map, depth - 1
+                    )
+
+
+class LastSeenHexes:
+    """
+    What a player last saw of each hex, for ghosts and the last known state of
+    hexes out of sight. Hexes visible in the previous frame are read from it,
+    everything else is kept in arrays indexed by hex index, which are only updated
+    for hexes going out of sight, and ghosts that are gone.
+    """
+
+    def __init__(self, size: int):
+        self._frame_hexes: Sequence[JSON] = ()
+        self._visible: list[bool] = [False] * size
+        # Changes whenever which hexes are visible may have changed.
+        self._visibility_key: Hashable | None = None
+
+        self.rounds: list[int | None] = [None] * size
+        self.terrains: list[str | None] = [None] * size
+        self.captured_by: list[str | None] = [None] * size
+        # Serialized units and statuses, shared with the frame they were seen in.
+        self.ghosts: list[JSON | None] = [None] * size
+        self.statuses: list[list[JSON]] = [[]] * size
+        self._ghost_indexes: set[int] = set()
+
+    def get(self, index: int) -> JSON | None:
+        if self._visible[index]:
+            return self._frame_hexes[index]
+        if (last_visible_round := self.rounds[index]) is None:
+            return None
+        return {
+            "last_visible_round": last_visible_round,
+            "terrain": self.terrains[index],
+            "captured_by": self.captured_by[index],
+            "unit": self.ghosts[index],
+            "statuses": self.statuses[index],
+        }
+
+    def update(self, hexes: Sequence[JSON], visibility_key: Hashable) -> None:
+        """
+        Updates from the hexes of a frame serialized with this, after it has been
+        serialized. Hexes are only checked for going out of sight if the
+        visibility key has changed since the previous frame.
+        """
+        if visibility_key != self._visibility_key:
+            self._visibility_key = visibility_key
+            for index, serialized in enumerate(hexes):
+                if serialized["visible"] == self._visible[index]:
+                    continue
+                self._visible[index] = serialized["visible"]
+                if serialized["visible"]:
+                    continue
+                # Hexes going out of sight are serialized from what was seen in
+                # the previous frame, so are kept as this frame has them.
+                self.rounds[index] = serialized["last_visible_round"]
+                self.terrains[index] = serialized["terrain"]
+                self.captured_by[index] = serialized["captured_by"]
+                self.statuses[index] = serialized["statuses"]
+                if (ghost := serialized["unit"]) is not None:
+                    self._ghost_indexes.add(index)
+                self.ghosts[index] = ghost
+        # Ghosts of units that have been seen elsewhere since are forgotten.
+        for index in list(self._ghost_indexes):
+            if self._visible[index]:
+                self._ghost_indexes.discard(index)
+            elif hexes[index]["unit"] is None:
+                self.ghosts[index] = None
+                self._ghost_indexes.discard(index)
+        self._frame_hexes = hexes
+
+
 class GameState:
     instance: GameState | None = None
+    # Check that cached hex serializations match what would be serialized
+    # without the cache. Slow, for tests and debugging.
+    verify_serialization_cache: ClassVar[bool] = False
 
     def __init__(
         self,
         player_count: int,
         connection_factory: Callable[[Player], Connection],
         scenario: Scenario,
+        shared_ids: bool = False,
+        lazy_action_previews: bool = False,
     ):
+        # With shared ids all players use the same id namespace, which only makes
+        # sense when they are allowed to see everything, but allows players with the
+        # same view of the map to share its serialization.
+        self.shared_ids = shared_ids
+        # Only compute the action previews of units when choosing which unit to
+        # activate when clients ask for them.
+        self.lazy_action_previews = lazy_action_previews
+        shared_id_map = IDMap() if shared_ids else None
         # TODO handle names
         self.turn_order = TurnOrder(
-            [Player(f"player {i + 1}") for i in range(player_count)]
+            [
+                Player(f"player {i + 1}", id_map=shared_id_map)
+                for i in range(player_count)
+            ]
         )
+        # Not part of the game, but sees everything, for the observer.
+        self.spectator = Player("spectator", id_map=shared_id_map)
+        self.observer: Observer | None = None
         self.connections = {
             player: connection_factory(player) for player in self.turn_order
         }
         self.map = HexMap(scenario.landscape)
-        self.active_unit_context: ActiveUnitContext | None = None
+        self._active_unit_context: ActiveUnitContext | None = None
+        # Incremented whenever a unit is activated or deactivated.
+        self._activation_version = 0
+
+        # Serialized visible hexes per player, which are reused until an event
+        # touches the hex or its neighbors, the players vision of it changes, or
+        # something global changes (the round, any effect being registered or
+        # deregistered, or an event not related to any specific hex). This relies
+        # on registered state modifiers only changing their outcome for a hex
+        # through events touching it or its neighbors. Modifiers reaching further,
+        # like auras with a larger radius, have to be registered again when what
+        # they depend on changes. verify_serialization_cache checks this.
+        self._hex_serialization_cache: dict[Player, dict[Hex, JSON]] = {
+            player: {} for player in self._viewers
+        }
+        self._hex_serialization_cache_key: tuple[int, int] | None = None
+        ES.register_event_callback(self._invalidate_hex_serialization_cache_for)
+
+        # Incremented whenever the vision map of any player changes.
+        self._vision_version = 0
+        # Whether each player can see every hex, and the hex statuses hidden from
+        # them, which are reused until vision, effects or statuses change.
+        self._shared_view_cache: dict[
+            Player, tuple[Hashable, frozenset[Status] | None]
+        ] = {}
+
+        # Visible unit and blueprint ids per player, which are reused until the
+        # vision, effects, statuses, unit positions, active unit or witnessed kills
+        # change, or an id is pruned.
+        self._visibility_cache: dict[
+            Player, tuple[Hashable, tuple[set[str], set[str]]]
+        ] = {}
+
         self.activation_queued_units: set[Unit] = set()
         self.target_points = scenario.to_points
         self.round_counter = 0
 
-        self.previous_hex_states: dict[Player, dict[CC, dict[str, Any]] | None] = {
-            player: None for player in self.turn_order
+        self.last_seen_hexes: dict[Player, LastSeenHexes] = {
+            player: LastSeenHexes(len(self.map.hex_list)) for player in self._viewers
         }
 
         self.vision_obstruction_map: dict[Player, dict[CC, VisionObstruction]] = {}
-        self.vision_map: dict[Player, dict[CC, bool]] = {}
+        self._shared_obstruction_map: dict[CC, VisionObstruction] = {}
+        self._shared_obstruction_key: Hashable | None = None
+        self.vision_map: dict[Player, dict[CC, bool]] = {
+            self.spectator: {position: True for position in self.map.hexes}
+        }
 
         self._player_log_levels: dict[Player, int] = {
-            player: 0 for player in self.turn_order
+            player: 0 for player in self._viewers
         }
+        # Log entries per player not yet in any frame, as the level of the entry,
+        # the shared record of the line and the list items hidden for the player,
+        # which are rendered when frames including them are built.
         self._pending_player_logs: dict[
-            Player, list[tuple[int, list[dict[str, Any]]]]
-        ] = {player: [] for player in self.turn_order}
+            Player, list[tuple[int, LogRecord, frozenset[Unit | Hex]]]
+        ] = {player: [] for player in self._viewers}
+        # Rendered log entries per player, which are only ever appended to.
         self._player_logs: dict[Player, list[tuple[int, list[dict[str, Any]]]]] = {
-            player: [] for player in self.turn_order
+            player: [] for player in self._viewers
         }
 
+    @property
+    def active_unit_context(self) -> ActiveUnitContext | None:
+        return self._active_unit_context
+
+    @active_unit_context.setter
+    def active_unit_context(self, v: ActiveUnitContext | None) -> None:
+        self._active_unit_context = v
+        self._activation_version += 1
+
+    @property
+    def _viewers(self) -> list[Player]:
+        # The spectator is kept up to date with logs from the start of the game, so
+        # it has them if observing starts late.
+        return [*self.turn_order.original_order, self.spectator]
+
     @contextlib.contextmanager
     def log(self, *line_options: LogLine) -> Iterator[None]:
         incremented_players = []
-        for player in self.turn_order:
-            for line in line_options:
-                if line.is_visible_to(player):
+        records: dict[int, LogRecord] = {}
+        for player in self._viewers:
+            visibility: dict[Unit | Hex, bool] = {}
+            for idx, line in enumerate(line_options):
+                if line.is_visible_to(player, visibility):
+                    if (record := records.get(idx)) is None:
+                        record = records[idx] = LogRecord.capture(line)
                     incremented_players.append(player)
                     self._pending_player_logs[player].append(
-                        (self._player_log_levels[player], line.serialize(player))
+                        (
+                            self._player_log_levels[player],
+                            record,
+                            line.get_hidden_list_items_for(player, visibility),
+                        )
                     )
                     self._player_log_levels[player] += 1
                     break
@@ -2219,19 +2896,110 @@ class GameState:
         for player in incremented_players:
             self._player_log_levels[player] -= 1
 
+    def _render_logs_for(
+        self,
+        player: Player,
+        entries: Iterable[tuple[int, LogRecord, frozenset[Unit | Hex]]],
+    ) -> list[tuple[int, list[dict[str, Any]]]]:
+        return [
+            record.render_for(player, level, hidden)
+            for level, record, hidden in entries
+        ]
+
+    def get_logs_for(
+        self, player: Player, start: int, stop: int
+    ) -> list[tuple[int, list[dict[str, Any]]]]:
+        """
+        Log entries already sent to player, which were rendered on the game thread
+        when they were, so this can be called from any thread.
+        """
+        return self._player_logs[player][start:stop]
+
+    def _clear_hex_serialization_cache(self) -> None:
+        for cache in self._hex_serialization_cache.values():
+            cache.clear()
+
+    def _invalidate_hex_serialization_cache_for(
+        self, event: Event, is_before: bool
+    ) -> None:
+        hexes = set(_get_referenced_hexes(event, self.map, depth=3))
+        if not hexes:
+            self._clear_hex_serialization_cache()
+            return
+        # Neighbors are included since units affect adjacent units through auras,
+        # stealth and so on.
+        for _hex in list(hexes):
+            hexes.update(self.map.get_neighbors_off(_hex))
+        for cache in self._hex_serialization_cache.values():
+            for _hex in hexes:
+                cache.pop(_hex, None)
+
+    def _serialize_map_for(self, context: SerializationContext) -> JSON:
+        if (
+            key := (self.round_counter, ES.effects_version)
+        ) != self._hex_serialization_cache_key:
+            self._clear_hex_serialization_cache()
+            self._hex_serialization_cache_key = key
+
+        cache = self._hex_serialization_cache[context.player]
+        hexes = []
+        for _hex in self.map.hexes.values():
+            if (serialized := cache.get(_hex)) is None:
+                serialized = _hex.serialize(context)
+                # Hidden hexes and ghosts depend on what the player has seen
+                # previously, and are cheap to serialize anyway.
+                if serialized["visible"] and not (
+                    serialized["unit"] and serialized["unit"]["is_ghost"]
+                ):
+                    cache[_hex] = serialized
+            elif serialized["unit"]:
+                # Keeps the id of the unit alive in the players id map.
+                context.player.id_map.get_id_for(self.map.unit_on(_hex))
+            hexes.append(serialized)
+
+        if self.verify_serialization_cache:
+            for cached, serialized in zip(hexes, self.map.serialize(context)["hexes"]):
+                if cached != serialized:
+                    raise ValueError(
+                        f"stale serialization cache for {context.player.name}:"
+                        f" {cached} != {serialized}"
+                    )
+
+        return {"hexes": hexes}
+
     def update_vision(self) -> None:
         unit_vision_map: dict[player, list[Unit]] = defaultdict(list)
         for unit in self.map.unit_positions.keys():
             for player in unit.provides_vision_for(None):
                 unit_vision_map[player].append(unit)
 
-        for player in self.turn_order:
-            self.vision_obstruction_map[player] = {
-                position: _hex.blocks_vision_for(player)
+        # Obstruction from terrain is the same for all players, and is only
+        # recomputed once terrain or effects have changed. It is then overridden per
+        # player for units blocking vision on hexes that aren't already blocked, which
+        # only ever raises the obstruction.
+        if (
+            key := (ES.effects_version, self.map.terrain_version)
+        ) != self._shared_obstruction_key:
+            self._shared_obstruction_key = key
+            self._shared_obstruction_map = {
+                position: _hex.get_vision_obstruction(None)
                 for position, _hex in self.map.hexes.items()
             }
+        shared_obstruction_map = self._shared_obstruction_map
+        contested = [
+            (unit, _hex)
+            for unit, _hex in self.map.unit_positions.items()
+            if shared_obstruction_map[_hex.position] < _hex.blocked_vision_obstruction
+        ]
+        for player in self.turn_order:
+            obstruction_map = dict(shared_obstruction_map)
+            for unit, _hex in contested:
+                if unit.blocks_vision_for(player):
+                    obstruction_map[_hex.position] = _hex.blocked_vision_obstruction
+            self.vision_obstruction_map[player] = obstruction_map
 
         for player in self.turn_order:
+            previous_vision_map = self.vision_map.get(player, {})
             self.vision_map[player] = {
                 position: (
                     (unit := self.map.unit_on(_hex)) and unit.controller == player
@@ -2239,13 +3007,106 @@ class GameState:
                 or any(unit.can_see(_hex) for unit in unit_vision_map[player])
                 for position, _hex in self.map.hexes.items()
             }
+            cache = self._hex_serialization_cache[player]
+            for position, visible in self.vision_map[player].items():
+                if previous_vision_map.get(position) != visible:
+                    cache.pop(self.map.hexes[position], None)
+                    self._vision_version += 1
+
+    def _get_shared_view_key(self, context: SerializationContext) -> Hashable | None:
+        """
+        Players with the same key serialize the map identically. Only players that
+        can see every hex and unit have a key, since otherwise the serialization
+        depends on their history of what they have seen (ghosts and hidden hexes),
+        and what remains is which statuses are hidden for them.
+        """
+        if not self.shared_ids:
+            return None
+        player = context.player
+        version = (
+            self._vision_version,
+            ES.effects_version,
+            HasStatuses.statuses_version,
+        )
+        cached = self._shared_view_cache.get(player)
+        if cached is not None and cached[0] == version:
+            hidden_hex_statuses = cached[1]
+        else:
+            hidden_hex_statuses = (
+                frozenset(
+                    status
+                    for _hex in self.map.hex_list
+                    for status in _hex.statuses
+                    if status.is_hidden_for(player)
+                )
+                if all(_hex.is_visible_to(player) for _hex in self.map.hex_list)
+                else None
+            )
+            self._shared_view_cache[player] = (version, hidden_hex_statuses)
+        if hidden_hex_statuses is None or not all(
+            player.id_map.get_id_for(unit) in context.visible_unit_ids
+            for unit in self.map.units
+        ):
+            return None
+        return hidden_hex_statuses | frozenset(
+            status
+            for unit in self.map.units
+            for status in unit.statuses
+            if status.is_hidden_for(player)
+        )
+
+    def _serialize_for_players(
+        self,
+        decision_points: Mapping[Player, DecisionPoint | None],
+        flush_logs: bool = True,
+    ) -> dict[Player, Mapping[str, Any]]:
+        serialized_maps: dict[Hashable, JSON] = {}
+        serialized_game_states = {}
+        for player in self.turn_order:
+            context = self._get_context_for(player)
+            if (view_key := self._get_shared_view_key(context)) is not None:
+                if view_key not in serialized_maps:
+                    serialized_maps[view_key] = self._serialize_map_for(context)
+            serialized_game_states[player] = self.serialize_for(
+                context,
+                decision_points.get(player),
+                serialized_map=(
+                    None if view_key is None else serialized_maps[view_key]
+                ),
+                flush_logs=flush_logs,
+            )
+        if self.shared_ids:
+            # Pruned once all players have been serialized, so ids only used by
+            # some players are kept.
+            self.turn_order.original_order[0].id_map.prune()
+        return serialized_game_states
 
     def serialize_for(
-        self, context: SerializationContext, decision_point: DecisionPoint | None
+        self,
+        context: SerializationContext,
+        decision_point: DecisionPoint | None,
+        serialized_map: JSON | None = None,
+        flush_logs: bool = True,
     ) -> Mapping[str, Any]:
-        new_logs = self._pending_player_logs[context.player]
-        self._player_logs[context.player].extend(new_logs)
-        self._pending_player_logs[context.player] = []
+        """
+        Without flush_logs, pending log entries are kept for the next frame, and
+        aren't rendered, for frames that are never sent.
+        """
+        if serialized_map is not None and self.verify_serialization_cache:
+            if serialized_map != (own_serialized_map := self.map.serialize(context)):
+                raise ValueError(
+                    f"shared map serialization is different for {context.player.name}:"
+                    f" {serialized_map} != {own_serialized_map}"
+                )
+        if serialized_map is None:
+            serialized_map = self._serialize_map_for(context)
+        new_logs = []
+        if flush_logs:
+            new_logs = self._render_logs_for(
+                context.player, self._pending_player_logs[context.player]
+            )
+            self._pending_player_logs[context.player] = []
+            self._player_logs[context.player].extend(new_logs)
         serialized_game_state = {
             "player": context.player.name,
             "target_points": self.target_points,
@@ -2253,7 +3114,7 @@ class GameState:
                 player.serialize() for player in self.turn_order.original_order
             ],
             "round": self.round_counter,
-            "map": self.map.serialize(context),
+            "map": serialized_map,
             "decision": decision_point.serialize(context) if decision_point else None,
             "active_unit_context": (
                 self.active_unit_context.serialize(context)
@@ -2261,68 +3122,123 @@ class GameState:
                 and self.active_unit_context.unit.is_visible_to(context.player)
                 else None
             ),
-            "logs": self._player_logs[context.player],
             "new_logs": new_logs,
+            # Number of log entries the player has seen after this, so clients
+            # can request anything they have missed with get_logs_for.
+            "log_cursor": len(self._player_logs[context.player]),
         }
-        # TODO yikes
-        self.previous_hex_states[context.player] = {
-            CC(**hex_values["cc"]): hex_values
-            for hex_values in serialized_game_state["map"]["hexes"]
-        }
+        self.last_seen_hexes[context.player].update(
+            serialized_map["hexes"], (self._vision_version, ES.effects_version)
+        )
         # TODO lmao
-        context.player.id_map.prune()
+        if not self.shared_ids:
+            context.player.id_map.prune()
         context.player.clear_witnessed_kills()
         return serialized_game_state
 
-    def _get_context_for(self, player: Player) -> SerializationContext:
+    def _get_visibility_for(self, player: Player) -> tuple[set[str], set[str]]:
+        # Everything unit visibility depends on: the vision map, effects and
+        # statuses modifying it, where units are, and which unit is active, for
+        # stealth that depends on it.
+        key = (
+            self._vision_version,
+            ES.effects_version,
+            HasStatuses.statuses_version,
+            self.map.units_version,
+            self.map.terrain_version,
+            self._activation_version,
+            self.round_counter,
+            frozenset(player.recently_witnessed_kills),
+            player.id_map.version,
+        )
+        cached = self._visibility_cache.get(player)
+        if cached and cached[0] == key and not self.verify_serialization_cache:
+            return cached[1]
+
         visible_units = {
             unit for unit in self.map.units if unit.is_visible_to(player)
         } | player.recently_witnessed_kills
-        return SerializationContext(
-            player,
-            self.previous_hex_states[player],
-            visible_unit_ids={player.id_map.get_id_for(unit) for unit in visible_units},
-            visible_blueprint_ids={
+        visibility = (
+            {player.id_map.get_id_for(unit) for unit in visible_units},
+            {
                 unit.blueprint.identifier
                 for unit in visible_units
                 if unit.blueprint.price is not None and unit.controller != player
             },
         )
 
+        if self.verify_serialization_cache and cached and cached[0] == key:
+            if cached[1] != visibility:
+                raise ValueError(
+                    f"stale visibility cache for {player.name}:"
+                    f" {cached[1]} != {visibility}"
+                )
+            return cached[1]
+
+        self._visibility_cache[player] = (key, visibility)
+        return visibility
+
+    def _get_context_for(self, player: Player) -> SerializationContext:
+        visible_unit_ids, visible_blueprint_ids = self._get_visibility_for(player)
+        return SerializationContext(
+            player,
+            self.last_seen_hexes[player],
+            visible_unit_ids=visible_unit_ids,
+            visible_blueprint_ids=visible_blueprint_ids,
+        )
+
+    def serialize_options_for(self, player: Player, options: list[Option]) -> JSON:
+        return serialize_options(options, self._get_context_for(player))
+
+    def serialize_subtree_for(
+        self, player: Player, target_profile: TargetProfile, path: Sequence[int]
+    ) -> JSON:
+        return target_profile.serialize_subtree(self._get_context_for(player), path)
+
+    def serialize_for_spectator(self) -> Mapping[str, Any]:
+        # The spectator sees everything, so there are no ghosts to remember.
+        return self.serialize_for(
+            dataclasses.replace(self._get_context_for(self.spectator), last_seen=None),
+            None,
+        )
+
+    def _notify_observer(self) -> None:
+        if self.observer and self.observer.is_observing():
+            self.observer.observe(self.serialize_for_spectator())
+
     def update_ghosts(self) -> None:
-        for player in self.turn_order:
-            self.serialize_for(self._get_context_for(player), None)
+        self._serialize_for_players({}, flush_logs=False)
 
     def send_to_players(self) -> None:
-        for _player in self.turn_order:
-            self.connections[_player].send_game_state(
-                self.serialize_for(self._get_context_for(_player), None), None
-            )
+        for _player, serialized_game_state in self._serialize_for_players({}).items():
+            self.connections[_player].send_game_state(serialized_game_state, None)
+        self._notify_observer()
 
     def make_decision(
         self, player: Player, decision_point: DecisionPoint[G_decision_result]
     ) -> G_decision_result:
+        serialized_game_states = self._serialize_for_players({player: decision_point})
         for _player in self.turn_order:
             if _player != player:
                 self.connections[_player].send_game_state(
-                    self.serialize_for(self._get_context_for(_player), None), None
+                    serialized_game_states[_player], None
                 )
+        self._notify_observer()
         # TODO very dumb we are specifying decision point twice.
         return self.connections[player].get_response(
-            self.serialize_for(self._get_context_for(player), decision_point),
-            decision_point,
+            serialized_game_states[player], decision_point
         )
 
     def make_parallel_decision(
         self, decision_points: dict[Player, DecisionPoint[G_decision_result]]
     ) -> dict[Player, G_decision_result]:
-        for player in self.turn_order:
+        for player, serialized_game_state in self._serialize_for_players(
+            decision_points
+        ).items():
             self.connections[player].send_game_state(
-                self.serialize_for(
-                    self._get_context_for(player), decision_points.get(player)
-                ),
-                decision_points.get(player),
+                serialized_game_state, decision_points.get(player)
             )
+        self._notify_observer()
 
         waiters = {
             player: self.connections[player].wait_for_response()
@@ -2363,6 +3279,10 @@ class ScopedGameState:
     def connections(self) -> dict[Player, Connection]:
         return self._gs.connections
 
+    @property
+    def spectator(self) -> Player:
+        return self._gs.spectator
+
     @property
     def map(self) -> HexMap:
         return self._gs.map
@@ -2392,8 +3312,12 @@ class ScopedGameState:
         self._gs.round_counter = v
 
     @property
-    def previous_hex_states(self) -> dict[Player, dict[CC, dict[str, Any]]]:
-        return self._gs.previous_hex_states
+    def lazy_action_previews(self) -> bool:
+        return self._gs.lazy_action_previews
+
+    @property
+    def last_seen_hexes(self) -> dict[Player, LastSeenHexes]:
+        return self._gs.last_seen_hexes
 
     @property
     def vision_obstruction_map(self) -> dict[Player, dict[CC, VisionObstruction]]:
@@ -2409,13 +3333,35 @@ class ScopedGameState:
         with self._gs.log(*line_options):
             yield None
 
+    def get_logs_for(
+        self, player: Player, start: int, stop: int
+    ) -> list[tuple[int, list[dict[str, Any]]]]:
+        return self._gs.get_logs_for(player, start, stop)
+
     def update_vision(self) -> None:
         self._gs.update_vision()
 
     def serialize_for(
-        self, context: SerializationContext, decision_point: DecisionPoint | None
+        self,
+        context: SerializationContext,
+        decision_point: DecisionPoint | None,
+        serialized_map: JSON | None = None,
+        flush_logs: bool = True,
     ) -> Mapping[str, Any]:
-        return self._gs.serialize_for(context, decision_point)
+        return self._gs.serialize_for(
+            context, decision_point, serialized_map, flush_logs
+        )
+
+    def serialize_options_for(self, player: Player, options: list[Option]) -> JSON:
+        return self._gs.serialize_options_for(player, options)
+
+    def serialize_subtree_for(
+        self, player: Player, target_profile: TargetProfile, path: Sequence[int]
+    ) -> JSON:
+        return self._gs.serialize_subtree_for(player, target_profile, path)
+
+    def serialize_for_spectator(self) -> Mapping[str, Any]:
+        return self._gs.serialize_for_spectator()
 
     def update_ghosts(self) -> None:
         self._gs.update_ghosts()
@@ -0,0 +1,97 @@
+import itertools
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from typing import Any, ClassVar, Iterator, TypeVar
+
+from events.eventsystem import EffectIndex, StateModifierEffect
+from game.core import GS, Hex, Unit
+from game.map.geometry import hex_circle_offsets
+
+
+C = TypeVar("C")
+V = TypeVar("V")
+
+
+class AuraIndex(EffectIndex):
+    """
+    Indexes auras by the unit or hex they are centered on, so a query only has to
+    consider auras centered within range of the queried unit. Since unit centers
+    are resolved through the map, auras move along with their units.
+    """
+
+    def __init__(self):
+        self._auras: defaultdict[
+            Any, defaultdict[Unit | Hex, dict[AuraModifier, None]]
+        ] = defaultdict(lambda: defaultdict(dict))
+        self._radii: defaultdict[Any, Counter[int]] = defaultdict(Counter)
+        self._centers: dict[AuraModifier, Unit | Hex] = {}
+
+    def add(self, effect: "AuraModifier") -> None:
+        self._centers[effect] = effect.center
+        self._auras[effect.target][effect.center][effect] = None
+        self._radii[effect.target][effect.radius] += 1
+
+    def remove(self, effect: "AuraModifier") -> None:
+        center = self._centers.pop(effect)
+        auras = self._auras[effect.target]
+        del auras[center][effect]
+        if not auras[center]:
+            del auras[center]
+        radii = self._radii[effect.target]
+        radii[effect.radius] -= 1
+        if not radii[effect.radius]:
+            del radii[effect.radius]
+
+    def _get_candidate_centers(
+        self, position: Any, target: Any, radius: int
+    ) -> Iterator[Unit | Hex]:
+        centers = self._auras[target]
+        # With few auras around it is cheaper to check each of them, than to
+        # look at every hex within range.
+        if len(centers) < len(hex_circle_offsets(radius)):
+            yield from centers
+        else:
+            for center in itertools.chain(
+                GS.map.get_units_within_range_off(position, radius),
+                GS.map.get_hexes_within_range_off(position, radius),
+            ):
+                if center in centers:
+                    yield center
+
+    def get_effects_for(self, obj: object, target: Any) -> Iterator["AuraModifier"]:
+        if not self._auras.get(target) or not isinstance(obj, Unit):
+            return
+        if not (
+            _hex := GS.map.unit_positions.get(obj)
+            or GS.map.last_known_positions.get(obj)
+        ):
+            return
+        position = _hex.position
+        for center in list(
+            self._get_candidate_centers(position, target, max(self._radii[target]))
+        ):
+            if isinstance(center, Hex):
+                center_position = center.position
+            elif center_hex := GS.map.unit_positions.get(center):
+                center_position = center_hex.position
+            else:
+                continue
+            distance = position.distance_to(center_position)
+            for aura in self._auras[target][center]:
+                if aura.min_radius <= distance <= aura.radius:
+                    yield aura
+
+
+class AuraModifier(StateModifierEffect[Unit, C, V], ABC):
+    """
+    Modifies units within radius of its center. Range is handled by the
+    index, so should_modify only has to check any additional conditions.
+    """
+
+    index: ClassVar[type[EffectIndex]] = AuraIndex
+    radius: ClassVar[int] = 1
+    min_radius: ClassVar[int] = 0
+
+    @property
+    @abstractmethod
+    def center(self) -> Unit | Hex: ...
@@ -27,6 +27,7 @@ from game.core import (
     Unit,
     UnitStatusLink,
 )
+from game.effects.auras import AuraModifier
 from game.events import MoveUnit, TurnUpkeep
 from game.map.coordinates import CC
 from game.values import DamageType, Resistance, Size, VisionObstruction
@@ -266,18 +267,19 @@ class NotMovedStealthModifier(StateModifierEffect[Unit, Player, bool]):
 
 
 @dataclasses.dataclass(eq=False)
-class ForestStealthModifier(StateModifierEffect[Unit, Player, bool]):
+class ForestStealthModifier(AuraModifier[Player, bool]):
     priority: ClassVar[int] = IsHiddenLayer.STEALTH
     target: ClassVar[object] = Unit.is_hidden_for
+    radius: ClassVar[int] = 0
 
     hex: Hex
 
+    @property
+    def center(self) -> Hex:
+        return self.hex
+
     def should_modify(self, obj: Unit, request: Player, value: bool) -> bool:
-        return (
-            GS.map.hex_off(obj) == self.hex
-            and obj.size.g() == Size.SMALL
-            and stealth_hidden_for(obj, request)
-        )
+        return obj.size.g() == Size.SMALL and stealth_hidden_for(obj, request)
 
     def modify(self, obj: Unit, request: Player, value: bool) -> bool:
         return True
@@ -303,21 +305,34 @@ class StealthOnTerrainModifier(StateModifierEffect[Unit, Player, bool]):
 
 
 @dataclasses.dataclass(eq=False)
-class FightFlightFreezeModifier(
-    StateModifierEffect[Unit, ActiveUnitContext, list[Option]]
-):
+class SpectatorRevealedModifier(StateModifierEffect[Unit, Player, bool]):
+    priority: ClassVar[int] = 100
+    target: ClassVar[object] = Unit.is_hidden_for
+
+    spectator: Player
+
+    def should_modify(self, obj: Unit, request: Player, value: bool) -> bool:
+        return request == self.spectator
+
+    def modify(self, obj: Unit, request: Player, value: bool) -> bool:
+        return False
+
+
+@dataclasses.dataclass(eq=False)
+class FightFlightFreezeModifier(AuraModifier[ActiveUnitContext, list[Option]]):
     priority: ClassVar[int] = LegalOptions.RESTRICTIVE
     target: ClassVar[object] = Unit.get_legal_options
 
     unit: Unit
 
+    @property
+    def center(self) -> Unit:
+        return self.unit
+
     def should_modify(
         self, obj: Unit, request: ActiveUnitContext, value: list[Option]
     ) -> bool:
-        return (
-            obj.controller != self.unit.controller
-            and GS.map.distance_between(self.unit, obj) <= 1
-        )
+        return obj.controller != self.unit.controller
 
     def modify(
         self, obj: Unit, request: ActiveUnitContext, value: list[Option]
@@ -379,17 +394,18 @@ class MustDoEffortTypeModifier(
 
 
 @dataclasses.dataclass(eq=False)
-class TelepathicSpyModifier(StateModifierEffect[Unit, None, set[Player]]):
+class TelepathicSpyModifier(AuraModifier[None, set[Player]]):
     priority: ClassVar[int] = 1
     target: ClassVar[object] = Unit.provides_vision_for
 
     unit: Unit
 
+    @property
+    def center(self) -> Unit:
+        return self.unit
+
     def should_modify(self, obj: Unit, request: None, value: set[Player]) -> bool:
-        return (
-            obj.controller != self.unit.controller
-            and GS.map.distance_between(self.unit, obj) <= 1
-        )
+        return obj.controller != self.unit.controller
 
     def modify(self, obj: Unit, request: None, value: set[Player]) -> set[Player]:
         return value | {self.unit.controller}
@@ -512,18 +528,20 @@ class DugInModifier(StateModifierEffect[Unit, TerrainProtectionRequest, int]):
 
 
 @dataclasses.dataclass(eq=False)
-class IncreaseSpeedAuraModifier(StateModifierEffect[Unit, None, int]):
+class IncreaseSpeedAuraModifier(AuraModifier[None, int]):
     priority: ClassVar[int] = SpeedLayer.FLAT
     target: ClassVar[object] = Unit.speed
+    min_radius: ClassVar[int] = 1
 
     unit: Unit
     amount: int
 
+    @property
+    def center(self) -> Unit:
+        return self.unit
+
     def should_modify(self, obj: Unit, request: None, value: int) -> bool:
-        return (
-            obj.controller == self.unit.controller
-            and GS.map.distance_between(obj, self.unit) == 1
-        )
+        return obj.controller == self.unit.controller
 
     def modify(self, obj: Unit, request: None, value: int) -> int:
         return value + self.amount
@@ -606,44 +624,59 @@ class UnitSetSpeedModifier(StateModifierEffect[Unit, None, int]):
 
 
 @dataclasses.dataclass(eq=False)
-class HexFlatEnergyRegenModifier(StateModifierEffect[Unit, None, int]):
+class HexFlatEnergyRegenModifier(AuraModifier[None, int]):
     priority: ClassVar[int] = 1
     target: ClassVar[object] = Unit.energy_regen
+    radius: ClassVar[int] = 0
 
     space: Hex
     amount: int
 
+    @property
+    def center(self) -> Hex:
+        return self.space
+
     def should_modify(self, obj: Unit, request: None, value: int) -> bool:
-        return GS.map.hex_off(obj) == self.space
+        return True
 
     def modify(self, obj: Unit, request: None, value: int) -> int:
         return value + self.amount
 
 
 @dataclasses.dataclass(eq=False)
-class HexCappedFlatSightModifier(StateModifierEffect[Unit, None, int]):
+class HexCappedFlatSightModifier(AuraModifier[None, int]):
     priority: ClassVar[int] = SightLayer.CAPPED_FLAT
     target: ClassVar[object] = Unit.sight
+    radius: ClassVar[int] = 0
 
     space: Hex
 
+    @property
+    def center(self) -> Hex:
+        return self.space
+
     def should_modify(self, obj: Unit, request: None, value: int) -> bool:
-        return GS.map.hex_off(obj) == self.space
+        return True
 
     def modify(self, obj: Unit, request: None, value: int) -> int:
         return min(max(value - 1, 1), value)
 
 
 @dataclasses.dataclass(eq=False)
-class HexFlatSightModifier(StateModifierEffect[Unit, None, int]):
+class HexFlatSightModifier(AuraModifier[None, int]):
     priority: ClassVar[int] = SightLayer.FLAT
     target: ClassVar[object] = Unit.sight
+    radius: ClassVar[int] = 0
 
     space: Hex
     amount: int
 
+    @property
+    def center(self) -> Hex:
+        return self.space
+
     def should_modify(self, obj: Unit, request: None, value: int) -> bool:
-        return GS.map.hex_off(obj) == self.space
+        return True
 
     def modify(self, obj: Unit, request: None, value: int) -> int:
         return value + self.amount
@@ -652,7 +685,7 @@ class HexFlatSightModifier(StateModifierEffect[Unit, None, int]):
 @dataclasses.dataclass(eq=False)
 class HexBlocksVisionModifier(StateModifierEffect[Hex, None, VisionObstruction]):
     priority: ClassVar[int] = 1
-    target: ClassVar[object] = Hex.blocks_vision_for
+    target: ClassVar[object] = Hex.get_vision_obstruction
 
     space: Hex
 
@@ -745,33 +778,40 @@ class UnitAttackPowerFlatModifier(StateModifierEffect[Unit, None, int]):
 
 
 @dataclasses.dataclass(eq=False)
-class HexAttackPowerFlatModifier(StateModifierEffect[Unit, None, int]):
+class HexAttackPowerFlatModifier(AuraModifier[None, int]):
     priority: ClassVar[int] = 1
     target: ClassVar[object] = Unit.attack_power
+    radius: ClassVar[int] = 0
 
     hex_: Hex
     amount: int | Callable[..., int]
 
+    @property
+    def center(self) -> Hex:
+        return self.hex_
+
     def should_modify(self, obj: Unit, request: None, value: int) -> bool:
-        return GS.map.hex_off(obj) == self.hex_
+        return True
 
     def modify(self, obj: Unit, request: None, value: int) -> int:
         return value + (self.amount if isinstance(self.amount, int) else self.amount())
 
 
 @dataclasses.dataclass(eq=False)
-class NegativeAttackPowerAuraModifier(StateModifierEffect[Unit, None, int]):
+class NegativeAttackPowerAuraModifier(AuraModifier[None, int]):
     priority: ClassVar[int] = 1
     target: ClassVar[object] = Unit.attack_power
+    min_radius: ClassVar[int] = 1
 
     unit: Unit
     amount: int
 
+    @property
+    def center(self) -> Unit:
+        return self.unit
+
     def should_modify(self, obj: Unit, request: None, value: int) -> bool:
-        return (
-            obj.controller != self.unit.controller
-            and GS.map.distance_between(obj, self.unit) == 1
-        )
+        return obj.controller != self.unit.controller
 
     def modify(self, obj: Unit, request: None, value: int) -> int:
         return value - self.amount
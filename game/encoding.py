@@ -0,0 +1,241 @@
+"""
+Compact binary encoding of frames, which clients can opt in to instead of JSON.
+
+A frame is laid out as a version byte, a table of every distinct string in the
+frame, a table of object shapes (the key sets of objects, as indexes in the string
+table), and then the root value. Objects are written as a shape index followed by
+just their values, so the keys of the many hexes, units and statuses in a game
+state are only written once, and repeated identifiers (terrain, blueprints,
+statuses, ids) are only written once as well.
+
+Values are prefixed by a single tag byte:
+
+- small integers in [-64, 63] are encoded in the tag itself.
+- other integers are zigzag varints.
+- coordinates (objects with just small r and h values) are packed in one byte.
+"""
+
+import struct
+from typing import Any, Callable
+
+
+VERSION = 1
+
+TAG_NONE = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_STRING = 5
+TAG_LIST = 6
+TAG_OBJECT = 7
+TAG_CC = 8
+
+SMALL_INT_TAG_OFFSET = 128
+SMALL_INT_MIN = -64
+SMALL_INT_MAX = 63
+
+CC_KEYS = ("r", "h")
+CC_MIN = -8
+CC_MAX = 7
+
+_float = struct.Struct("<d")
+
+
+class EncodingError(Exception): ...
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+        self.shapes: dict[tuple[str, ...], int] = {}
+        self.body = bytearray()
+        self.encoders: dict[type, Callable[[Any], None]] = {
+            type(None): self.encode_none,
+            bool: self.encode_bool,
+            int: self.encode_int,
+            float: self.encode_float,
+            str: self.encode_string,
+            list: self.encode_list,
+            tuple: self.encode_list,
+            dict: self.encode_object,
+        }
+
+    def encode_none(self, value: None) -> None:
+        self.body.append(TAG_NONE)
+
+    def encode_bool(self, value: bool) -> None:
+        self.body.append(TAG_TRUE if value else TAG_FALSE)
+
+    def encode_int(self, value: int) -> None:
+        if SMALL_INT_MIN <= value <= SMALL_INT_MAX:
+            self.body.append(SMALL_INT_TAG_OFFSET + value - SMALL_INT_MIN)
+        else:
+            self.body.append(TAG_INT)
+            _write_varint(self.body, _zigzag(value))
+
+    def encode_float(self, value: float) -> None:
+        self.body.append(TAG_FLOAT)
+        self.body += _float.pack(value)
+
+    def encode_string(self, value: str) -> None:
+        if (idx := self.strings.get(value)) is None:
+            idx = self.strings[value] = len(self.strings)
+        self.body.append(TAG_STRING)
+        _write_varint(self.body, idx)
+
+    def encode_list(self, value: list | tuple) -> None:
+        self.body.append(TAG_LIST)
+        _write_varint(self.body, len(value))
+        for item in value:
+            self.encode(item)
+
+    def encode_object(self, value: dict) -> None:
+        keys = tuple(value)
+        if (
+            keys == CC_KEYS
+            and type(r := value["r"]) is int
+            and type(h := value["h"]) is int
+            and CC_MIN <= r <= CC_MAX
+            and CC_MIN <= h <= CC_MAX
+        ):
+            self.body.append(TAG_CC)
+            self.body.append((r - CC_MIN) << 4 | (h - CC_MIN))
+            return
+        if (shape := self.shapes.get(keys)) is None:
+            for key in keys:
+                if not isinstance(key, str):
+                    raise EncodingError(f"non string key {key!r}")
+                if key not in self.strings:
+                    self.strings[key] = len(self.strings)
+            shape = self.shapes[keys] = len(self.shapes)
+        self.body.append(TAG_OBJECT)
+        _write_varint(self.body, shape)
+        for item in value.values():
+            self.encode(item)
+
+    def encode(self, value: Any) -> None:
+        if (encoder := self.encoders.get(type(value))) is None:
+            # Subclasses, like enums, are encoded as their base type, the same as
+            # with JSON.
+            for base_type, encoder in self.encoders.items():
+                if isinstance(value, base_type):
+                    break
+            else:
+                raise EncodingError(f"can't encode {type(value).__name__}")
+        encoder(value)
+
+    def finish(self) -> bytes:
+        out = bytearray([VERSION])
+        _write_varint(out, len(self.strings))
+        for value in self.strings:
+            encoded = value.encode()
+            _write_varint(out, len(encoded))
+            out += encoded
+        _write_varint(out, len(self.shapes))
+        for keys in self.shapes:
+            _write_varint(out, len(keys))
+            for key in keys:
+                _write_varint(out, self.strings[key])
+        return bytes(out + self.body)
+
+
+def encode_binary(value: Any) -> bytes:
+    encoder = _Encoder()
+    encoder.encode(value)
+    return encoder.finish()
+
+
+class _Decoder:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+        self.strings: list[str] = []
+        self.shapes: list[tuple[str, ...]] = []
+        self.decoders: dict[int, Callable[[], Any]] = {
+            TAG_NONE: lambda: None,
+            TAG_FALSE: lambda: False,
+            TAG_TRUE: lambda: True,
+            TAG_INT: lambda: _unzigzag(self.read_varint()),
+            TAG_FLOAT: self.read_float,
+            TAG_STRING: lambda: self.strings[self.read_varint()],
+            TAG_LIST: lambda: [self.decode() for _ in range(self.read_varint())],
+            TAG_OBJECT: self.read_object,
+            TAG_CC: self.read_cc,
+        }
+
+    def read_byte(self) -> int:
+        try:
+            value = self.data[self.position]
+        except IndexError:
+            raise EncodingError("unexpected end of data")
+        self.position += 1
+        return value
+
+    def read_varint(self) -> int:
+        value = shift = 0
+        while True:
+            byte = self.read_byte()
+            value |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return value
+            shift += 7
+
+    def read_float(self) -> float:
+        (value,) = _float.unpack_from(self.data, self.position)
+        self.position += _float.size
+        return value
+
+    def read_object(self) -> dict[str, Any]:
+        return {key: self.decode() for key in self.shapes[self.read_varint()]}
+
+    def read_cc(self) -> dict[str, int]:
+        byte = self.read_byte()
+        return {"r": (byte >> 4) + CC_MIN, "h": (byte & 0x0F) + CC_MIN}
+
+    def decode(self) -> Any:
+        tag = self.read_byte()
+        if tag >= SMALL_INT_TAG_OFFSET:
+            return tag - SMALL_INT_TAG_OFFSET + SMALL_INT_MIN
+        if (decoder := self.decoders.get(tag)) is None:
+            raise EncodingError(f"unknown tag {tag}")
+        return decoder()
+
+    def decode_frame(self) -> Any:
+        if (version := self.read_byte()) != VERSION:
+            raise EncodingError(f"unknown version {version}")
+        for _ in range(self.read_varint()):
+            length = self.read_varint()
+            self.strings.append(
+                self.data[self.position : self.position + length].decode()
+            )
+            self.position += length
+        for _ in range(self.read_varint()):
+            self.shapes.append(
+                tuple(
+                    self.strings[self.read_varint()] for _ in range(self.read_varint())
+                )
+            )
+        value = self.decode()
+        if self.position != len(self.data):
+            raise EncodingError("trailing data")
+        return value
+
+
+def decode_binary(data: bytes) -> Any:
+    return _Decoder(data).decode_frame()
@@ -19,6 +19,7 @@ from game.core import (
     Hex,
     HexStatus,
     HexStatusSignature,
+    LazyActionPreviews,
     LogLine,
     MeleeAttackFacet,
     MoveOption,
@@ -951,10 +952,26 @@ class Round(Event[None]):
 
                 skipped_players.discard(player)
 
-                action_previews = {
-                    unit: unit.get_legal_options(ActiveUnitContext(unit, 1))
+                action_previews = (
+                    LazyActionPreviews(activateable_units)
+                    if gs.lazy_action_previews
+                    else {
+                        unit: unit.get_legal_options(ActiveUnitContext(unit, 1))
+                        for unit in activateable_units
+                    }
+                )
+                # Skipping is only legal if each unit could skip.
+                can_skip = all(
+                    (
+                        action_previews.can_skip(unit)
+                        if isinstance(action_previews, LazyActionPreviews)
+                        else any(
+                            isinstance(option, SkipOption)
+                            for option in action_previews[unit]
+                        )
+                    )
                     for unit in activateable_units
-                }
+                )
 
                 decision = GS.make_decision(
                     player,
@@ -966,14 +983,7 @@ class Round(Event[None]):
                             ),
                             *(
                                 ()
-                                if gs.activation_queued_units
-                                or not all(
-                                    any(
-                                        isinstance(option, SkipOption)
-                                        for option in options
-                                    )
-                                    for options in action_previews.values()
-                                )
+                                if gs.activation_queued_units or not can_skip
                                 else (SkipOption(target_profile=NoTarget()),)
                             ),
                         ],
@@ -0,0 +1,191 @@
+from typing import Any, Mapping, TypeAlias
+
+from game.map.coordinates import CC
+from game.schemas import ViewportSchema
+
+
+JSON: TypeAlias = Mapping[str, Any]
+
+
+# Hexes around the viewport of a client which also get full detail, so there is
+# something to show while the client pans, before the next frame.
+AREA_OF_INTEREST_MARGIN = 2
+
+
+def make_game_state_delta(previous: JSON, current: JSON) -> dict[str, Any] | None:
+    """
+    Changes required to turn a serialized game state into another. Hexes are
+    referenced by their index in the map. Returns None if the states are not
+    comparable, in which case a full state has to be sent.
+    """
+    previous_hexes = previous["map"]["hexes"]
+    current_hexes = current["map"]["hexes"]
+    if len(previous_hexes) != len(current_hexes):
+        return None
+
+    changed_hexes = []
+    for idx, (previous_hex, current_hex) in enumerate(
+        zip(previous_hexes, current_hexes)
+    ):
+        if previous_hex != current_hex:
+            if previous_hex["cc"] != current_hex["cc"]:
+                return None
+            changed_hexes.append([idx, current_hex])
+
+    return {
+        **{
+            key: value
+            for key, value in current.items()
+            if key != "map" and previous.get(key) != value
+        },
+        "hexes": changed_hexes,
+    }
+
+
+def apply_game_state_delta(previous: JSON, delta: JSON) -> dict[str, Any]:
+    hexes = list(previous["map"]["hexes"])
+    for idx, _hex in delta["hexes"]:
+        hexes[idx] = _merge_hex(hexes[idx], _hex)
+    return {
+        **previous,
+        **{key: value for key, value in delta.items() if key != "hexes"},
+        "map": {**previous["map"], "hexes": hexes},
+    }
+
+
+def make_game_state_delta_frame(
+    previous_frame: JSON, frame: JSON
+) -> dict[str, Any] | None:
+    if (
+        delta := make_game_state_delta(
+            previous_frame["game_state"], frame["game_state"]
+        )
+    ) is None:
+        return None
+    return {
+        **{key: value for key, value in frame.items() if key != "game_state"},
+        "message_type": "game_state_delta",
+        "base_count": previous_frame["count"],
+        "delta": delta,
+    }
+
+
+def summarize_hex(_hex: JSON) -> dict[str, Any]:
+    """
+    Compact version of a serialized hex, for hexes outside the area of interest of
+    a client. Statuses, which are most of a hex with a unit, are left out.
+    """
+    return {
+        **_hex,
+        "unit": _hex["unit"] and {**_hex["unit"], "statuses": []},
+        "statuses": [],
+        "summary": True,
+    }
+
+
+class HexSummaries:
+    """
+    Summaries of serialized hexes by their index, which are reused as long as the
+    serialized hex is, so unchanged hexes stay identical between frames.
+    """
+
+    def __init__(self):
+        self._summaries: dict[int, tuple[JSON, JSON]] = {}
+
+    def get(self, idx: int, _hex: JSON) -> JSON:
+        if (cached := self._summaries.get(idx)) is None or cached[0] is not _hex:
+            cached = self._summaries[idx] = (_hex, summarize_hex(_hex))
+        return cached[1]
+
+
+def apply_viewport(
+    frame: JSON, viewport: ViewportSchema | None, summaries: HexSummaries
+) -> JSON:
+    """
+    Summarizes the hexes of a game state frame outside the area of interest around
+    the viewport of a client. The frame is marked with the viewport, which clients
+    send back when resuming from it, so deltas can be made against what they have.
+    """
+    if viewport is None:
+        return frame
+    center = CC(viewport.center.r, viewport.center.h)
+    radius = viewport.radius + AREA_OF_INTEREST_MARGIN
+    game_state = frame["game_state"]
+    return {
+        **frame,
+        "game_state": {
+            **game_state,
+            "map": {
+                **game_state["map"],
+                "hexes": [
+                    (
+                        _hex
+                        if CC(**_hex["cc"]).distance_to(center) <= radius
+                        else summaries.get(idx, _hex)
+                    )
+                    for idx, _hex in enumerate(game_state["map"]["hexes"])
+                ],
+            },
+        },
+        "viewport": viewport.model_dump(),
+    }
+
+
+def _merge_hex(previous: JSON, _hex: JSON) -> dict[str, Any]:
+    # Only summaries are marked as such, so the mark is dropped from hexes
+    # updated to full detail.
+    return {
+        **{key: value for key, value in previous.items() if key != "summary"},
+        **_hex,
+    }
+
+
+# Values of serialized hexes which never change, and so can be sent once per game
+# separately from the rest of the game state. Terrain can change, and what a player
+# knows of it depends on what they have seen, so it stays with the game state.
+STATIC_HEX_KEYS = ("cc", "is_objective")
+
+
+def make_static_map(game_state: JSON) -> dict[str, Any]:
+    return {
+        "hexes": [
+            {key: _hex[key] for key in STATIC_HEX_KEYS}
+            for _hex in game_state["map"]["hexes"]
+        ]
+    }
+
+
+def _strip_static_hex_values(_hex: JSON) -> dict[str, Any]:
+    return {key: value for key, value in _hex.items() if key not in STATIC_HEX_KEYS}
+
+
+def strip_static_map(frame: JSON) -> dict[str, Any]:
+    """
+    Removes the static map values from a game state or delta frame. Hexes are
+    then only identified by their index in the static map.
+    """
+    if frame["message_type"] == "game_state_delta":
+        return {
+            **frame,
+            "delta": {
+                **frame["delta"],
+                "hexes": [
+                    [idx, _strip_static_hex_values(_hex)]
+                    for idx, _hex in frame["delta"]["hexes"]
+                ],
+            },
+        }
+    game_state = frame["game_state"]
+    return {
+        **frame,
+        "game_state": {
+            **game_state,
+            "map": {
+                **game_state["map"],
+                "hexes": [
+                    _strip_static_hex_values(_hex)
+                    for _hex in game_state["map"]["hexes"]
+                ],
+            },
+        },
+    }
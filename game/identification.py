@@ -1,30 +1,80 @@
-from typing import Any
-from uuid import uuid4
-
-from bidict import bidict
+import hashlib
+import itertools
+import secrets
+import weakref
+from typing import Any, Callable
 
 
 class IDMap:
+    """
+    Maps game objects to the short string ids a player knows them by.
+
+    Ids are a keyed hash of a counter, with a random salt per map, so they are short,
+    and ids seen by one player say nothing about the ids of another.
+
+    Pruning is generational: ids not accessed since the previous prune are expired,
+    and only those entries are touched. Objects are only weakly referenced, entries
+    for objects that have been collected are dropped, so their id() being reused
+    can't hand out a stale id.
+    """
+
+    ID_BYTES = 5
+
     def __init__(self):
-        self._ids: bidict[int, str] = bidict()
-        self._objects: dict[int, object] = {}
+        self._salt = secrets.token_bytes(16)
+        self._counter = itertools.count()
+        self._ids: dict[int, str] = {}
+        self._keys: dict[str, int] = {}
+        self._objects: dict[int, Callable[[], object | None]] = {}
         self._accessed: set[int] = set()
+        self._expiring: set[int] = set()
+        # Incremented whenever an id is forgotten, so anything holding on to ids can
+        # tell whether they are still valid.
+        self.version = 0
+
+    def _mint_id(self) -> str:
+        while True:
+            id_ = hashlib.blake2b(
+                next(self._counter).to_bytes(8, "little"),
+                key=self._salt,
+                digest_size=self.ID_BYTES,
+            ).hexdigest()
+            if id_ not in self._keys:
+                return id_
+
+    def _forget(self, key: int) -> None:
+        if (id_ := self._ids.pop(key, None)) is not None:
+            del self._keys[id_]
+            self.version += 1
+        self._objects.pop(key, None)
+        self._accessed.discard(key)
+        self._expiring.discard(key)
 
     def has_id(self, id_: str) -> bool:
-        return id_ in self._ids.inverse
+        return id_ in self._keys
 
     def get_id_for(self, obj: Any) -> str:
-        _id = id(obj)
-        if _id not in self._ids:
-            self._ids[_id] = str(uuid4())
-            # TODO this is just for debugging
-            self._objects[_id] = obj
-        self._accessed.add(_id)
-        return self._ids[_id]
+        key = id(obj)
+        if (id_ := self._ids.get(key)) is None:
+            id_ = self._ids[key] = self._mint_id()
+            self._keys[id_] = key
+            try:
+                self._objects[key] = weakref.ref(
+                    obj, lambda _, key=key: self._forget(key)
+                )
+            except TypeError:
+                # Objects that can't be weakly referenced are kept alive while they
+                # have an id, so their id() isn't reused.
+                self._objects[key] = lambda obj=obj: obj
+        else:
+            self._expiring.discard(key)
+        self._accessed.add(key)
+        return id_
 
     def get_object_for(self, id_: str) -> object:
-        return self._objects[self._ids.inverse[id_]]
+        return self._objects[self._keys[id_]]()
 
     def prune(self) -> None:
-        self._ids = bidict({k: v for k, v in self._ids.items() if k in self._accessed})
-        self._accessed = set()
+        for key in list(self._expiring):
+            self._forget(key)
+        self._expiring, self._accessed = self._accessed, self._expiring
@@ -1,21 +1,33 @@
+import functools
 import itertools
+from typing import Iterable, Iterator, Mapping, TypeVar
 
-from game.map.coordinates import CC
+from game.map.coordinates import CC, Corner, CornerPosition
 
 
-def hex_circle(radius: int = 1, center: CC = CC(0, 0)) -> list[CC]:
-    return [
-        CC(r, h) + center
+G = TypeVar("G")
+
+ORIGIN = CC(0, 0)
+
+
+# Shapes are generated once per size as immutable offset templates around the
+# origin, and then translated to wherever they are needed.
+
+
+@functools.cache
+def hex_circle_offsets(radius: int, min_radius: int = 0) -> tuple[CC, ...]:
+    return tuple(
+        cc
         for r in range(-radius, radius + 1)
-        for h in range(-radius, radius + 1)
-        if -radius <= -(r + h) <= radius
-    ]
+        for h in range(max(-radius, -radius - r), min(radius, radius - r) + 1)
+        if (cc := CC(r, h)).length >= min_radius
+    )
 
 
-def hex_ring(radius: int, center: CC = CC(0, 0)) -> list[CC]:
-    return [
-        cc + center
-        for cc in itertools.chain(
+@functools.cache
+def hex_ring_offsets(radius: int) -> tuple[CC, ...]:
+    return tuple(
+        itertools.chain(
             (CC(-radius, i) for i in range(radius + 1)),
             (CC(i, radius) for i in range(-radius + 1, 1)),
             (CC(i + 1, radius - 1 - i) for i in range(radius - 1)),
@@ -23,17 +35,66 @@ def hex_ring(radius: int, center: CC = CC(0, 0)) -> list[CC]:
             (CC(i, -radius) for i in reversed(range(radius))),
             (CC(-(i + 1), -(radius - 1 - i)) for i in range(radius - 1)),
         )
-    ]
+    )
+
+
+@functools.cache
+def _hex_ring_indexes(radius: int) -> Mapping[CC, int]:
+    indexes = {}
+    for idx, cc in enumerate(hex_ring_offsets(radius)):
+        indexes.setdefault(cc, idx)
+    return indexes
+
+
+@functools.cache
+def hex_arc_offsets(radius: int, arm_length: int, stroke_center: CC) -> tuple[CC, ...]:
+    ring = hex_ring_offsets(radius)
+    try:
+        idx = _hex_ring_indexes(radius)[stroke_center]
+    except KeyError:
+        raise ValueError("Invalid stroke center")
+    return tuple(
+        ring[(idx + offset) % len(ring)]
+        for offset in range(-arm_length, arm_length + 1)
+    )
+
+
+@functools.cache
+def corner_offsets(radius: int, min_radius: int = 0) -> tuple[Corner, ...]:
+    return tuple(
+        corner
+        for corner in (
+            Corner(cc, position)
+            for cc in hex_circle_offsets(radius)
+            for position in CornerPosition
+        )
+        if all(
+            min_radius <= adjacent.length <= radius
+            for adjacent in corner.get_adjacent_positions()
+        )
+    )
+
+
+def hex_circle(radius: int = 1, center: CC = ORIGIN) -> list[CC]:
+    return [cc + center for cc in hex_circle_offsets(radius)]
+
+
+def hex_ring(radius: int, center: CC = ORIGIN) -> list[CC]:
+    return [cc + center for cc in hex_ring_offsets(radius)]
 
 
 def hex_arc(
-    radius: int, arm_length: int, stroke_center: CC, arc_center: CC = CC(0, 0)
+    radius: int, arm_length: int, stroke_center: CC, arc_center: CC = ORIGIN
 ) -> list[CC]:
-    hexes = hex_ring(radius, center=arc_center)
-    for idx, cc in enumerate(hexes):
-        if cc == stroke_center:
-            return [
-                hexes[(idx + offset) % len(hexes)]
-                for offset in range(-arm_length, arm_length + 1)
-            ]
-    raise ValueError("Invalid stroke center")
+    return [
+        cc + arc_center
+        for cc in hex_arc_offsets(radius, arm_length, stroke_center - arc_center)
+    ]
+
+
+def translate_and_clip(
+    offsets: Iterable[CC], center: CC, within: Mapping[CC, G]
+) -> Iterator[G]:
+    for offset in offsets:
+        if (value := within.get(offset + center)) is not None:
+            yield value
@@ -1,6 +1,6 @@
 from typing import Annotated, Any
 
-from pydantic import AfterValidator, BaseModel
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, model_validator
 
 
 def no_duplicates(value: list[int]) -> list[int]:
@@ -12,7 +12,8 @@ class DecisionValidationError(Exception): ...
 
 
 class PremoveSchema(BaseModel):
-    for_options: list[dict[str, Any]]
+    # Digest of the options the premove was made for, as sent with them.
+    options_digest: str
     payload: dict[str, Any]
 
 
@@ -22,14 +23,70 @@ class DecisionResponseSchema(BaseModel):
     premove: PremoveSchema | None = None
 
 
-class EmptySchema(BaseModel): ...
+class SpectateSchema(BaseModel):
+    game_id: int
+    # Position of the seat whose view is spectated, or everything if None.
+    position: int | None = None
 
 
 class CCSchema(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     r: int
     h: int
 
 
+class ViewportSchema(BaseModel):
+    # Frozen, so frames can be cached by the viewport they are made for.
+    model_config = ConfigDict(frozen=True)
+
+    center: CCSchema
+    # Distance in hexes from the center to the edges of the viewport.
+    radius: Annotated[int, Field(ge=0, le=64)]
+
+
+class HandshakeSchema(BaseModel):
+    seat_id: str | None = None
+    spectate: SpectateSchema | None = None
+    delta_frames: bool = False
+    static_map: bool = False
+    # Game state frames are sent in the format of game.encoding instead of JSON.
+    binary_frames: bool = False
+    # Count of the last game state frame the client has, when resuming a session.
+    last_seen_count: int | None = None
+    # Viewport that frame was made for, which applies until the client reports
+    # another one.
+    viewport: ViewportSchema | None = None
+
+    @model_validator(mode="after")
+    def seat_or_spectate(self) -> "HandshakeSchema":
+        assert (self.seat_id is None) != (
+            self.spectate is None
+        ), "exactly one of seat_id and spectate is required"
+        return self
+
+
+class ActionPreviewsRequestSchema(BaseModel):
+    count: int
+    unit_id: str
+
+
+class SubtreeRequestSchema(BaseModel):
+    count: int
+    option_index: Annotated[int, Field(ge=0)]
+    # For options in the action previews of a unit.
+    unit_id: str | None = None
+    path: list[Annotated[int, Field(ge=0)]]
+
+
+class LogRangeRequestSchema(BaseModel):
+    start: Annotated[int, Field(ge=0)]
+    stop: Annotated[int, Field(ge=0)]
+
+
+class EmptySchema(BaseModel): ...
+
+
 class SelectOptionDecisionPointSchema(BaseModel):
     index: int
     target: dict[str, Any]
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import dataclasses
+import hashlib
 import itertools
-from typing import ClassVar
+import json
+from typing import Callable, ClassVar, Iterable, Sequence
 
 from pydantic import BaseModel
 
@@ -16,7 +18,7 @@ from game.core import (
     Unit,
 )
 from game.map.coordinates import CC, Corner
-from game.map.geometry import hex_arc, hex_ring
+from game.map.geometry import hex_arc_offsets, hex_ring_offsets
 from game.schemas import (
     DecisionValidationError,
     IndexesSchema,
@@ -112,13 +114,13 @@ class ConsecutiveAdjacentHexes(TargetProfile[ObjectListResult[Hex]]):
             raise DecisionValidationError("invalid cc")
         return ObjectListResult(
             list(
-                GS.map.get_hexes_of_positions(
-                    hex_arc(
+                GS.map.get_hexes_of_offsets(
+                    hex_arc_offsets(
                         radius=1,
                         arm_length=self.arm_length,
-                        stroke_center=cc,
-                        arc_center=self.adjacent_to.position,
-                    )
+                        stroke_center=cc - self.adjacent_to.position,
+                    ),
+                    self.adjacent_to,
                 )
             )
         )
@@ -164,9 +166,7 @@ class TriHex(TargetProfile[ObjectListResult[Hex]]):
             corner = self.corners[v.index]
         except IndexError:
             raise DecisionValidationError("invalid index")
-        return ObjectListResult(
-            list(GS.map.get_hexes_of_positions(corner.get_adjacent_positions()))
-        )
+        return ObjectListResult(GS.map.get_hexes_around_corner(corner))
 
 
 @dataclasses.dataclass
@@ -188,7 +188,7 @@ class HexRing(TargetProfile[ObjectListResult[Hex]]):
         except IndexError:
             raise DecisionValidationError("invalid index")
         return ObjectListResult(
-            list(GS.map.get_hexes_of_positions(hex_ring(self.radius, center.position)))
+            list(GS.map.get_hexes_of_offsets(hex_ring_offsets(self.radius), center))
         )
 
 
@@ -245,18 +245,18 @@ class Cone(TargetProfile[ObjectListResult[Hex]]):
         difference = selected_cc - self.from_hex.position
         return ObjectListResult(
             list(
-                GS.map.get_hexes_of_positions(
+                GS.map.get_hexes_of_offsets(
                     itertools.chain(
                         *(
-                            hex_arc(
+                            hex_arc_offsets(
                                 idx + 1,
                                 arm_length=arm_length,
-                                stroke_center=selected_cc + difference * idx,
-                                arc_center=self.from_hex.position,
+                                stroke_center=difference * (idx + 1),
                             )
                             for idx, arm_length in enumerate(self.arm_lengths)
                         )
-                    )
+                    ),
+                    self.from_hex,
                 )
             )
         )
@@ -264,7 +264,12 @@ class Cone(TargetProfile[ObjectListResult[Hex]]):
 
 @dataclasses.dataclass
 class TreeNode:
-    options: list[tuple[Unit | Hex, TreeNode | None]]
+    """
+    Subtrees can be given as callables producing them, which are only called once
+    the subtree is needed, and then kept in place of the callable.
+    """
+
+    options: list[tuple[Unit | Hex, TreeNode | Callable[[], TreeNode] | None]]
     label: str
 
     @classmethod
@@ -275,40 +280,149 @@ class TreeNode:
             return {"type": "unit", "id": context.player.id_map.get_id_for(option)}
         return {"type": "hex", "cc": option.position.serialize()}
 
-    def serialize(self, context: SerializationContext) -> JSON:
+    @classmethod
+    def of_leaves(cls, options: Iterable[Unit | Hex], label: str) -> TreeNode:
+        return cls([(option, None) for option in options], label)
+
+    def get_subtree(self, idx: int) -> TreeNode | None:
+        if idx < 0:
+            raise IndexError(idx)
+        game_object, sub_tree = self.options[idx]
+        if sub_tree is not None and not isinstance(sub_tree, TreeNode):
+            sub_tree = sub_tree()
+            self.options[idx] = (game_object, sub_tree)
+        return sub_tree
+
+    def expanded(self) -> tuple[str, list[tuple[Unit | Hex, tuple | None]]]:
+        """
+        The whole tree below this node, for comparing trees. Subtrees that haven't
+        been expanded yet are built without being kept.
+        """
+        return (
+            self.label,
+            [
+                (
+                    game_object,
+                    (
+                        None
+                        if sub_tree is None
+                        else (
+                            sub_tree if isinstance(sub_tree, TreeNode) else sub_tree()
+                        ).expanded()
+                    ),
+                )
+                for game_object, sub_tree in self.options
+            ],
+        )
+
+    def get_digest(self, context: SerializationContext) -> str:
+        return hashlib.blake2b(
+            json.dumps(self.serialize(context)).encode(), digest_size=8
+        ).hexdigest()
+
+    def serialize(
+        self, context: SerializationContext, lazy_path: list[int] | None = None
+    ) -> JSON:
+        """
+        With a lazy path, subtrees aren't serialized, but replaced by a handle,
+        which is the path of option indexes leading to them, and a digest of the
+        subtree, so serializations of trees with different subtrees differ, and
+        premoves are only matched against the same tree.
+        """
         return {
             "label": self.label,
             "options": [
                 (
                     self.serialize_option(game_object, context),
-                    sub_tree.serialize(context) if sub_tree else None,
+                    (
+                        None
+                        if sub_tree is None
+                        else (
+                            {
+                                "handle": [*lazy_path, idx],
+                                "digest": self.get_subtree(idx).get_digest(context),
+                            }
+                            if lazy_path is not None
+                            else self.get_subtree(idx).serialize(context)
+                        )
+                    ),
                 )
-                for game_object, sub_tree in self.options
+                for idx, (game_object, sub_tree) in enumerate(self.options)
             ],
         }
 
 
 @dataclasses.dataclass
 class Tree(TargetProfile[ObjectListResult[Unit | Hex]]):
+    """
+    Lazy trees only send the first level of options to clients, which request
+    subtrees as they are selected. Subtrees are still built on the server, to
+    digest them.
+    """
+
     response_schema: ClassVar[type[BaseModel]] = OrderedIndexesSchema
+    # Check that subtrees expanded later are the same as if they had been built
+    # with the tree. Builds every subtree up front, for tests and debugging.
+    verify_subtrees: ClassVar[bool] = False
 
     root_node: TreeNode
+    lazy: bool = False
+    _expanded: tuple | None = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        if self.verify_subtrees:
+            self._expanded = self.root_node.expanded()
+
+    def _verify_subtree(self, path: Sequence[int], node: TreeNode) -> None:
+        if self._expanded is None:
+            return
+        expected = self._expanded
+        for idx in path:
+            expected = expected[1][idx][1]
+        if (expanded := node.expanded()) != expected:
+            raise ValueError(
+                f"subtree at {list(path)} changed after the tree was built:"
+                f" {expanded} != {expected}"
+            )
 
     def serialize_values(self, context: SerializationContext) -> JSON:
-        return {"root_node": self.root_node.serialize(context)}
+        return {
+            "root_node": self.root_node.serialize(context, [] if self.lazy else None)
+        }
+
+    def serialize_subtree(
+        self, context: SerializationContext, path: Sequence[int]
+    ) -> JSON:
+        current = self.root_node
+        for idx in path:
+            try:
+                current = current.get_subtree(idx)
+            except IndexError:
+                raise DecisionValidationError("invalid index")
+            if current is None:
+                raise DecisionValidationError("no subtree")
+        self._verify_subtree(path, current)
+        return current.serialize(context, list(path))
 
     def parse_response_schema(
         self, v: OrderedIndexesSchema
     ) -> ObjectListResult[Unit | Hex]:
+        # Only the subtrees along the selected path are expanded.
         selected = []
         current = self.root_node
-        for idx in v.indexes:
+        for depth, idx in enumerate(v.indexes):
+            if current is None:
+                raise DecisionValidationError("too many indexes")
             try:
-                obj, node = current.options[idx]
+                sub_tree = current.get_subtree(idx)
             except IndexError:
                 raise DecisionValidationError("invalid index")
-            selected.append(obj)
-            current = node
+            if sub_tree is not None:
+                self._verify_subtree(v.indexes[: depth + 1], sub_tree)
+            selected.append(current.options[idx][0])
+            current = sub_tree
         if current:
             raise DecisionValidationError("not enough indexes")
         return ObjectListResult(selected)
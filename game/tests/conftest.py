@@ -4,6 +4,8 @@ from typing import Any, Callable
 import pytest
 
 from events.eventsystem import ES, Event, EventSystem
+from game.core import GameState
+from game.target_profiles import Tree
 
 
 class TestScope:
@@ -38,6 +40,8 @@ class EventLogger:
 def setup_context(request: Any) -> None:
     TestScope.log_events = request.config.getoption("log_events")
     TestScope.log_game_states = request.config.getoption("log_game_states")
+    GameState.verify_serialization_cache = True
+    Tree.verify_subtrees = True
 
 
 @pytest.fixture(autouse=True)
@@ -0,0 +1,112 @@
+import json
+import math
+from enum import Enum, IntEnum
+from typing import Any
+
+import pytest
+
+from game.core import GS, DeploymentSpec, GameState, Scenario
+from game.encoding import EncodingError, decode_binary, encode_binary
+from game.map.coordinates import CC
+from game.tests.test_events import MockConnection, UnitSpawner, generate_hex_landscape
+from game.tests.units import TEST_CHICKEN, TEST_LIGHT_ARCHER
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        True,
+        False,
+        0,
+        -64,
+        63,
+        -65,
+        64,
+        2**70,
+        -(2**70),
+        0.5,
+        -1e300,
+        "",
+        "hex",
+        "ünïcode ⬡",
+        [],
+        {},
+        [1, [2, [3, None]], "a", "a"],
+        {"r": 0, "h": 0},
+        {"r": -8, "h": 7},
+        {"r": 8, "h": 0},
+        {"r": 1.5, "h": 0},
+        {"h": 1, "r": 2},
+        {"r": 1, "h": 2, "extra": 3},
+        [{"a": 1, "b": "x"}, {"a": 2, "b": "x"}, {"b": 3, "a": 4}],
+        {"nested": {"nested": {"nested": []}}},
+    ],
+)
+def test_round_trip(value: Any) -> None:
+    decoded = decode_binary(encode_binary(value))
+    assert decoded == value
+    assert json.dumps(decoded) == json.dumps(value)
+
+
+def test_round_trip_special_floats() -> None:
+    assert decode_binary(encode_binary(math.inf)) == math.inf
+    assert math.isnan(decode_binary(encode_binary(math.nan)))
+
+
+def test_tuples_decode_as_lists() -> None:
+    assert decode_binary(encode_binary((1, ("a",)))) == [1, ["a"]]
+
+
+def test_subclasses_encode_as_base_type() -> None:
+    class Number(IntEnum):
+        ONE = 1
+
+    class Name(str, Enum):
+        HEX = "hex"
+
+    assert decode_binary(encode_binary([Number.ONE, Name.HEX])) == [1, "hex"]
+
+
+@pytest.mark.parametrize("value", [object(), {1: "a"}, {"a": {1, 2}}, b"bytes"])
+def test_unencodable(value: Any) -> None:
+    with pytest.raises(EncodingError):
+        encode_binary(value)
+
+
+@pytest.mark.parametrize(
+    "data", [b"", b"\x02\x00\x00\x00", b"\x01\x00\x00", b"\x01\x00\x00\x00\x00"]
+)
+def test_invalid_data(data: bytes) -> None:
+    with pytest.raises(EncodingError):
+        decode_binary(data)
+
+
+def test_game_state_round_trip() -> None:
+    game_state = GameState(
+        2,
+        MockConnection,
+        Scenario(
+            landscape=generate_hex_landscape(4),
+            units=[],
+            deployment_spec=DeploymentSpec(0, 0, 0, 0),
+            to_points=24,
+        ),
+    )
+    GS.bind(game_state)
+    player1, player2 = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(1, 0))
+    game_state.update_vision()
+    frame = {
+        "message_type": "game_state",
+        "count": 1,
+        "game_state": game_state.serialize_for(
+            game_state._get_context_for(player1), None
+        ),
+    }
+
+    encoded = encode_binary(frame)
+    assert decode_binary(encoded) == json.loads(json.dumps(frame))
+    assert len(encoded) < len(json.dumps(frame)) / 3
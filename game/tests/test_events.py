@@ -1,4 +1,5 @@
 import dataclasses
+import functools
 from abc import ABC, abstractmethod
 from typing import (
     Any,
@@ -20,6 +21,7 @@ from events.eventsystem import ES, StateModifierEffect
 from game.core import (
     GS,
     ActivateUnitOption,
+    ActiveUnitContext,
     Connection,
     DecisionPoint,
     DeploymentSpec,
@@ -30,20 +32,39 @@ from game.core import (
     HexMap,
     HexSpec,
     Landscape,
+    LazyActionPreviews,
     MeleeAttackFacet,
     MoveOption,
+    NoTarget,
+    OneOfUnits,
+    Option,
     Player,
     RangedAttackFacet,
     Scenario,
+    SelectOptionDecisionPoint,
     SkipOption,
     Terrain,
     Unit,
     UnitBlueprint,
+    resolve_interned_options,
+)
+from game.effects.auras import AuraModifier
+from game.effects.modifiers import (
+    FightFlightFreezeModifier,
+    HexBlocksVisionModifier,
+    HexFlatSightModifier,
+    IncreaseSpeedAuraModifier,
+    NegativeAttackPowerAuraModifier,
+    SpeedLayer,
+    TelepathicSpyModifier,
+    UnitSpeedModifier,
 )
 from game.events import Hit, Round, SpawnUnit, Turn
 from game.map.coordinates import CC
 from game.map.geometry import hex_circle
-from game.map.terrain import Plains, Water
+from game.map.terrain import Forest, Plains, Water
+from game.schemas import DecisionValidationError
+from game.target_profiles import Tree, TreeNode
 from game.tests.conftest import TestScope
 from game.tests.test_terrain import InstantDamageMagma
 from game.tests.units import (
@@ -53,7 +74,7 @@ from game.tests.units import (
     TEST_MARSHMALLOW_TITAN,
 )
 from game.units.blueprince import LUMBERING_PILLAR
-from game.values import Size
+from game.values import Size, VisionObstruction
 
 
 JSON_DICT: TypeAlias = Mapping[str, Any]
@@ -277,7 +298,9 @@ class OptionSelector(DecisionSelector):
     def should_select(self, option: Mapping[str, Any]) -> bool: ...
 
     def __call__(self, values: Mapping[str, Any], player: Player) -> Mapping[str, Any]:
-        for idx, option in enumerate(values["decision"]["payload"]["options"]):
+        for idx, option in enumerate(
+            resolve_interned_options(values["decision"]["payload"])
+        ):
             if self.should_select(option):
                 return {
                     "index": idx,
@@ -632,6 +655,221 @@ def test_round(unit_spawner, player1_connection: MockConnection) -> None:
     assert chicken.exhausted is True
 
 
+@dataclasses.dataclass(eq=False)
+class DoubleSpeedAuraModifier(AuraModifier[None, int]):
+    priority: ClassVar[int] = SpeedLayer.FLAT
+    target: ClassVar[object] = Unit.speed
+
+    unit: Unit
+
+    @property
+    def center(self) -> Unit:
+        return self.unit
+
+    def should_modify(self, obj: Unit, request: None, value: int) -> bool:
+        return True
+
+    def modify(self, obj: Unit, request: None, value: int) -> int:
+        return value * 2
+
+
+def test_indexed_modifiers_apply_in_registration_order(
+    unit_spawner: UnitSpawner,
+) -> None:
+    chicken = unit_spawner.spawn(TEST_CHICKEN, coordinate=CC(0, 0))
+    base_speed = chicken.speed.g()
+
+    flat = ES.register_effect(UnitSpeedModifier(chicken, 1))
+    ES.register_effect(DoubleSpeedAuraModifier(chicken))
+    assert chicken.speed.g() == (base_speed + 1) * 2
+
+    ES.deregister_effects(flat)
+    ES.register_effect(flat)
+    assert chicken.speed.g() == base_speed * 2 + 1
+
+
+def test_lazy_action_previews(
+    game_state: GameState,
+    unit_spawner: UnitSpawner,
+    player1: Player,
+    player1_connection: MockConnection,
+) -> None:
+    game_state.lazy_action_previews = True
+    chicken = unit_spawner.spawn(TEST_CHICKEN, coordinate=CC(0, 0))
+    chicken_id = player1.id_map.get_id_for(chicken)
+
+    def check_no_previews(values: JSON_DICT, player: Player) -> None:
+        activate_option = values["decision"]["payload"]["options"][0]
+        assert activate_option["values"] == {
+            "actions_preview": None,
+            "actions_preview_digests": None,
+        }
+
+    player1_connection.queue_responses((SkipOptionSelector(), check_no_previews))
+    ES.resolve(Round())
+    assert not player1_connection.queued_responses
+
+    previews = LazyActionPreviews([chicken])
+    player1_connection.send_game_state(
+        {},
+        SelectOptionDecisionPoint(
+            [
+                ActivateUnitOption(
+                    target_profile=OneOfUnits([chicken]), actions_previews=previews
+                ),
+                SkipOption(target_profile=NoTarget()),
+            ],
+            explanation="activate unit",
+        ),
+    )
+    count = player1_connection.history[-1]["count"]
+    player1_connection.send_action_previews({"count": count, "unit_id": chicken_id})
+    message = player1_connection.history[-1]
+    assert (message["message_type"], message["unit_id"]) == (
+        "action_previews",
+        chicken_id,
+    )
+    assert [option["type"] for option in resolve_interned_options(message)] == [
+        MoveOption.__name__,
+        SkipOption.__name__,
+    ]
+    assert previews[chicken] is previews[chicken]
+
+    player1_connection.send_action_previews({"count": count - 1, "unit_id": chicken_id})
+    assert player1_connection.history[-1]["error_type"] == "invalid_response_count"
+    player1_connection.send_action_previews({"count": count, "unit_id": "unknown"})
+    assert player1_connection.history[-1]["error_type"] == (
+        "invalid_action_previews_request"
+    )
+
+
+def test_lazy_action_previews_can_skip(unit_spawner: UnitSpawner) -> None:
+    chicken = unit_spawner.spawn(TEST_CHICKEN, coordinate=CC(0, 0))
+
+    # Units without modifiers of their legal options can skip without computing
+    # their options.
+    previews = LazyActionPreviews([chicken])
+    assert previews.can_skip(chicken)
+    assert not previews._previews
+
+    @dataclasses.dataclass(eq=False)
+    class NoSkipping(StateModifierEffect[Unit, ActiveUnitContext, list[Option]]):
+        priority: ClassVar[int] = 1
+        target: ClassVar[object] = Unit.get_legal_options
+
+        unit: Unit
+
+        def should_modify(
+            self, obj: Unit, request: ActiveUnitContext, value: list[Option]
+        ) -> bool:
+            return obj == self.unit
+
+        def modify(
+            self, obj: Unit, request: ActiveUnitContext, value: list[Option]
+        ) -> list[Option]:
+            return [option for option in value if not isinstance(option, SkipOption)]
+
+    ES.register_effect(NoSkipping(chicken))
+    previews = LazyActionPreviews([chicken])
+    assert not previews.can_skip(chicken)
+    assert chicken in previews._previews
+
+
+def test_lazy_tree(
+    player1: Player, player1_connection: MockConnection, monkeypatch: Any
+) -> None:
+    # Verification builds every subtree with the tree.
+    monkeypatch.setattr(Tree, "verify_subtrees", False)
+    hexes = [GS.map.hexes[CC(1, 0)], GS.map.hexes[CC(0, 1)], GS.map.hexes[CC(-1, 0)]]
+    expanded = []
+
+    def expand(first: Hex) -> TreeNode:
+        expanded.append(first)
+        return TreeNode([(_hex, None) for _hex in hexes if _hex != first], "second")
+
+    tree = Tree(
+        TreeNode([(_hex, functools.partial(expand, _hex)) for _hex in hexes], "first"),
+        lazy=True,
+    )
+    options = [SkipOption(target_profile=tree)]
+    player1_connection.send_game_state(
+        {}, SelectOptionDecisionPoint(options, explanation="select hexes")
+    )
+    count = player1_connection.history[-1]["count"]
+    payload = GS.serialize_options_for(player1, options)
+    (option,) = resolve_interned_options(payload)
+    assert [
+        child["handle"]
+        for _, child in option["target_profile"]["values"]["root_node"]["options"]
+    ] == [[idx] for idx in range(3)]
+    # Subtrees are built once, for their digests.
+    assert expanded == hexes
+
+    # Trees with different subtrees have different digests, so premoves are only
+    # matched against the tree they were made for.
+    other_options = [
+        SkipOption(
+            target_profile=Tree(
+                TreeNode(
+                    [(_hex, TreeNode.of_leaves(hexes, "second")) for _hex in hexes],
+                    "first",
+                ),
+                lazy=True,
+            )
+        )
+    ]
+    assert (
+        GS.serialize_options_for(player1, other_options)["options_digest"]
+        != payload["options_digest"]
+        == GS.serialize_options_for(player1, options)["options_digest"]
+    )
+
+    player1_connection.send_subtree({"count": count, "option_index": 0, "path": [1]})
+    message = player1_connection.history[-1]
+    assert (message["message_type"], message["path"]) == ("subtree", [1])
+    assert message["node"]["label"] == "second"
+    assert [option["cc"] for option, _ in message["node"]["options"]] == [
+        hexes[0].position.serialize(),
+        hexes[2].position.serialize(),
+    ]
+
+    player1_connection.send_subtree({"count": count, "option_index": 0, "path": [1, 0]})
+    assert player1_connection.history[-1]["error_type"] == "invalid_subtree_request"
+    player1_connection.send_subtree({"count": count, "option_index": 0, "path": [3]})
+    assert player1_connection.history[-1]["error_type"] == "invalid_subtree_request"
+    player1_connection.send_subtree(
+        {"count": count - 1, "option_index": 0, "path": [1]}
+    )
+    assert player1_connection.history[-1]["error_type"] == "invalid_response_count"
+
+    assert list(tree.parse_response({"indexes": [2, 0]})) == [hexes[2], hexes[0]]
+    assert expanded == hexes
+    for indexes in ([0], [0, 0, 0], [0, 2], [-1, 0]):
+        with pytest.raises(DecisionValidationError):
+            tree.parse_response({"indexes": indexes})
+
+
+def test_lazy_tree_subtrees_are_verified() -> None:
+    hexes = [GS.map.hexes[CC(1, 0)], GS.map.hexes[CC(0, 1)], GS.map.hexes[CC(-1, 0)]]
+    available = list(hexes)
+
+    def expand(first: Hex) -> TreeNode:
+        return TreeNode.of_leaves(
+            [_hex for _hex in available if _hex != first], "second"
+        )
+
+    tree = Tree(
+        TreeNode([(_hex, functools.partial(expand, _hex)) for _hex in hexes], "first"),
+        lazy=True,
+    )
+    assert list(tree.parse_response({"indexes": [0, 0]})) == [hexes[0], hexes[1]]
+
+    # Subtrees expanded after what they are built from changed are caught.
+    available.remove(hexes[0])
+    with pytest.raises(ValueError):
+        tree.parse_response({"indexes": [1, 0]})
+
+
 def test_vision_blocked(
     unit_spawner, player1_connection: MockConnection, player2: Player
 ) -> None:
@@ -688,6 +926,71 @@ def test_vision_blocked(
     _check(hex_circle(1))
 
 
+def test_vision_obstruction_map(unit_spawner: UnitSpawner, player2: Player) -> None:
+    unit_spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    unit_spawner.spawn(TEST_LIGHT_ARCHER, controller=player2, coordinate=CC(1, 0))
+    unit_spawner.spawn(TEST_MARSHMALLOW_TITAN, controller=player2, coordinate=CC(0, 1))
+    unit_spawner.spawn(TEST_CHICKEN, coordinate=CC(-1, 0))
+    GS.update_vision()
+
+    for player in GS.turn_order:
+        assert GS.vision_obstruction_map[player] == {
+            position: _hex.blocks_vision_for(player)
+            for position, _hex in GS.map.hexes.items()
+        }
+    assert (
+        GS.vision_obstruction_map[player2][CC(0, 0)]
+        != GS.vision_obstruction_map[unit_spawner.default_controller][CC(0, 0)]
+    )
+
+
+def test_vision_obstruction_changes(
+    unit_spawner: UnitSpawner, player1: Player, player2: Player
+) -> None:
+    titan = unit_spawner.spawn(
+        TEST_MARSHMALLOW_TITAN, controller=player2, coordinate=CC(0, 1)
+    )
+    GS.update_vision()
+    assert GS.vision_obstruction_map[player1][CC(0, 1)] != VisionObstruction.NONE
+
+    @dataclasses.dataclass(eq=False)
+    class SeeThrough(StateModifierEffect[Unit, Player, bool]):
+        priority: ClassVar[int] = 1
+        target: ClassVar[object] = Unit.blocks_vision_for
+
+        unit: Unit
+
+        def should_modify(self, obj: Unit, request: Player, value: bool) -> bool:
+            return obj == self.unit
+
+        def modify(self, obj: Unit, request: Player, value: bool) -> bool:
+            return False
+
+    # Modifiers can make large units stop blocking vision.
+    ES.register_effect(SeeThrough(titan))
+    GS.update_vision()
+    assert GS.vision_obstruction_map[player1][CC(0, 1)] == VisionObstruction.NONE
+
+    # Terrain changes are picked up, even without effects changing.
+    GS.map.hexes[CC(0, 1)].terrain = Forest()
+    GS.update_vision()
+    assert GS.vision_obstruction_map[player1][CC(0, 1)] != VisionObstruction.NONE
+
+
+def test_blocked_hex_with_large_unit(
+    unit_spawner: UnitSpawner, player1: Player, player2: Player
+) -> None:
+    unit_spawner.spawn(TEST_MARSHMALLOW_TITAN, controller=player2, coordinate=CC(0, 1))
+    _hex = GS.map.hexes[CC(0, 1)]
+    ES.register_effect(HexBlocksVisionModifier(_hex))
+    GS.update_vision()
+
+    # Units blocking vision don't lower the obstruction of the hex they stand on.
+    for player in (player1, player2):
+        assert GS.vision_obstruction_map[player][CC(0, 1)] == VisionObstruction.FULL
+        assert _hex.blocks_vision_for(player) == VisionObstruction.FULL
+
+
 def test_impassable_terrain(
     unit_spawner, player1_connection: MockConnection, player2: Player
 ) -> None:
@@ -727,3 +1030,65 @@ def test_unit_dies_mid_turn(
     )
     ES.resolve(Round())
     assert not archer.on_map()
+
+
+def test_auras(unit_spawner: UnitSpawner, player2: Player) -> None:
+    leader = unit_spawner.spawn(TEST_CHICKEN, coordinate=CC(0, 0))
+    ally = unit_spawner.spawn(TEST_CHICKEN, coordinate=CC(1, -1))
+    enemy = unit_spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(0, 1))
+    base_speed = ally.speed.g()
+
+    ES.register_effect(IncreaseSpeedAuraModifier(leader, 1))
+    ES.register_effect(NegativeAttackPowerAuraModifier(leader, 1))
+    ES.register_effect(HexFlatSightModifier(GS.map.hexes[CC(0, 1)], 2))
+    ES.register_effect(HexFlatSightModifier(GS.map.hexes[CC(1, -1)], 1))
+
+    assert ally.speed.g() == base_speed + 1
+    assert leader.speed.g() == enemy.speed.g() == base_speed
+    assert enemy.attack_power.g() == ally.attack_power.g() - 1
+    assert enemy.sight.g() == ally.sight.g() + 1 == leader.sight.g() + 2
+
+    GS.map.move_unit_to(leader, CC(-2, 2))
+    assert ally.speed.g() == base_speed
+    assert enemy.attack_power.g() == ally.attack_power.g()
+
+    GS.map.move_unit_to(ally, CC(-1, 1))
+    assert ally.speed.g() == base_speed + 1
+
+
+def test_adjacent_enemy_auras(
+    unit_spawner: UnitSpawner, player1: Player, player2: Player
+) -> None:
+    spy = unit_spawner.spawn(TEST_CHICKEN, coordinate=CC(0, 0))
+    ally = unit_spawner.spawn(TEST_CHICKEN, coordinate=CC(1, -1))
+    enemy = unit_spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(0, 1))
+    far_enemy = unit_spawner.spawn(
+        TEST_CHICKEN, controller=player2, coordinate=CC(-1, -1)
+    )
+
+    ES.register_effect(TelepathicSpyModifier(spy))
+    ES.register_effect(FightFlightFreezeModifier(spy))
+
+    def move_destinations(unit: Unit) -> set[Hex]:
+        return {
+            _hex
+            for option in unit.get_legal_options(ActiveUnitContext(unit, 1))
+            if isinstance(option, MoveOption)
+            for _hex in option.target_profile.hexes
+        }
+
+    assert enemy.provides_vision_for(None) == {player1, player2}
+    assert far_enemy.provides_vision_for(None) == {player2}
+    assert ally.provides_vision_for(None) == {player1}
+    assert all(
+        GS.map.distance_between(spy, _hex) > 1 for _hex in move_destinations(enemy)
+    )
+    assert any(
+        GS.map.distance_between(spy, _hex) == 1 for _hex in move_destinations(far_enemy)
+    )
+
+    GS.map.move_unit_to(spy, CC(-2, 2))
+    assert enemy.provides_vision_for(None) == {player2}
+    assert any(
+        GS.map.distance_between(spy, _hex) == 1 for _hex in move_destinations(enemy)
+    )
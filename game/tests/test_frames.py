@@ -0,0 +1,456 @@
+import json
+from typing import Iterator
+
+import pytest
+
+from events.eventsystem import ES
+from game.core import (
+    GS,
+    ActivateUnitOption,
+    DamageSignature,
+    DeploymentSpec,
+    GameState,
+    LogLine,
+    MoveOption,
+    NoTarget,
+    OneOfHexes,
+    OneOfUnits,
+    Scenario,
+    SelectOptionDecisionPoint,
+    SkipOption,
+    resolve_interned_options,
+)
+from game.effects.modifiers import SpectatorRevealedModifier, UnitSpeedModifier
+from game.events import Damage, MoveUnit
+from game.frames import (
+    HexSummaries,
+    apply_game_state_delta,
+    apply_viewport,
+    make_game_state_delta,
+    make_game_state_delta_frame,
+    make_static_map,
+    strip_static_map,
+    summarize_hex,
+)
+from game.map.coordinates import CC
+from game.schemas import CCSchema, PremoveSchema, ViewportSchema
+from game.tests.test_events import MockConnection, UnitSpawner, generate_hex_landscape
+from game.tests.units import TEST_CHICKEN, TEST_LIGHT_ARCHER
+
+
+@pytest.fixture
+def game_state() -> Iterator[GameState]:
+    gs = GameState(
+        2,
+        MockConnection,
+        Scenario(
+            landscape=generate_hex_landscape(4),
+            units=[],
+            deployment_spec=DeploymentSpec(0, 0, 0, 0),
+            to_points=24,
+        ),
+    )
+    GS.bind(gs)
+    yield gs
+
+
+def _serialize(gs: GameState) -> dict:
+    player = gs.turn_order.original_order[0]
+    gs.update_vision()
+    return gs.serialize_for(gs._get_context_for(player), None)
+
+
+def test_game_state_delta(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    archer = spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    chicken = spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(1, 0))
+
+    previous = _serialize(game_state)
+    assert make_game_state_delta(previous, previous) == {"hexes": []}
+
+    ES.resolve(MoveUnit(archer, game_state.map.hexes[CC(-1, 0)]))
+    chicken.damage += 1
+    current = _serialize(game_state)
+
+    delta = make_game_state_delta(previous, current)
+    assert "player" not in delta and "round" not in delta
+    changed = {game_state.map.hex_list[idx].position for idx, _ in delta["hexes"]}
+    # Moving the archer also changes what is visible.
+    assert {CC(0, 0), CC(-1, 0), CC(1, 0)} <= changed
+    assert len(changed) < len(game_state.map.hexes)
+    assert delta["log_cursor"] == previous["log_cursor"] + len(delta["new_logs"])
+    assert apply_game_state_delta(previous, delta) == current
+
+
+def test_game_state_delta_frame(game_state: GameState) -> None:
+    game_state_frame = {"message_type": "game_state", "count": 3, "grace": 1}
+    previous = _serialize(game_state)
+    game_state.round_counter += 1
+    current = _serialize(game_state)
+
+    frame = make_game_state_delta_frame(
+        game_state_frame | {"game_state": previous},
+        game_state_frame | {"count": 4, "game_state": current},
+    )
+    assert frame == {
+        "message_type": "game_state_delta",
+        "count": 4,
+        "base_count": 3,
+        "grace": 1,
+        "delta": make_game_state_delta(previous, current),
+    }
+
+    previous["map"] = {"hexes": previous["map"]["hexes"][1:]}
+    assert make_game_state_delta(previous, current) is None
+
+
+def test_logs(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    with game_state.log(LogLine(["shared"])):
+        pass
+    with game_state.log(LogLine(["private"], valid_for_players={player1})):
+        pass
+
+    state = _serialize(game_state)
+    assert [line for _, line in state["new_logs"]] == [
+        [{"type": "string", "message": "shared"}],
+        [{"type": "string", "message": "private"}],
+    ]
+    assert state["log_cursor"] == 2
+    assert game_state.get_logs_for(player1, 1, 2) == state["new_logs"][1:]
+
+    game_state.serialize_for(game_state._get_context_for(player2), None)
+    assert game_state.get_logs_for(player2, 0, 2) == state["new_logs"][:1]
+    assert (
+        game_state.get_logs_for(player2, 0, 1)[0]
+        is game_state.get_logs_for(player1, 0, 1)[0]
+    )
+
+
+def test_logs_render_lazily(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    chicken = spawner.spawn(TEST_CHICKEN, coordinate=CC(0, 0))
+    game_state.update_vision()
+    with game_state.log(LogLine([chicken, "moves"])):
+        pass
+    ES.resolve(MoveUnit(chicken, game_state.map.hexes[CC(1, 0)]))
+
+    game_state.update_ghosts()
+    assert game_state.get_logs_for(player1, 0, 1) == []
+
+    state = _serialize(game_state)
+    level, line = state["new_logs"][0]
+    assert level == 0
+    assert line[0]["cc"] == CC(0, 0).serialize()
+    assert game_state.get_logs_for(player1, 0, 1)[0] is state["new_logs"][0]
+
+
+def test_static_map(game_state: GameState) -> None:
+    previous = _serialize(game_state)
+    game_state.round_counter += 1
+    current = _serialize(game_state)
+    static_map = make_static_map(current)
+    assert static_map == make_static_map(previous)
+
+    frame = strip_static_map({"message_type": "game_state", "game_state": current})
+    hexes = frame["game_state"]["map"]["hexes"]
+    assert all("cc" not in _hex and "terrain" in _hex for _hex in hexes)
+    assert [
+        static_hex | _hex for static_hex, _hex in zip(static_map["hexes"], hexes)
+    ] == current["map"]["hexes"]
+
+    delta_frame = strip_static_map(
+        make_game_state_delta_frame(
+            {"count": 1, "game_state": previous}, {"count": 2, "game_state": current}
+        )
+    )
+    assert (
+        apply_game_state_delta(previous, delta_frame["delta"])["map"] == current["map"]
+    )
+
+
+def test_hex_serialization_cache(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    chicken = spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(2, 0))
+
+    previous = _serialize(game_state)["map"]["hexes"]
+    current = _serialize(game_state)["map"]["hexes"]
+    assert all(a is b for a, b in zip(previous, current) if a["visible"])
+
+    ES.resolve(Damage(chicken, DamageSignature(1, None)))
+    current = _serialize(game_state)["map"]["hexes"]
+    for idx, _hex in enumerate(game_state.map.hex_list):
+        if _hex.position.distance_to(CC(2, 0)) <= 1:
+            assert current[idx] is not previous[idx]
+        elif current[idx]["visible"]:
+            assert current[idx] is previous[idx]
+    chicken_idx = game_state.map.hex_list.index(game_state.map.hexes[CC(2, 0)])
+    assert current[chicken_idx]["unit"]["damage"] == 1
+
+
+def test_hex_serialization_cache_modifiers(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    chicken = spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(2, 0))
+    chicken_idx = game_state.map.hex_list.index(game_state.map.hexes[CC(2, 0)])
+    speed = _serialize(game_state)["map"]["hexes"][chicken_idx]["unit"]["speed"]
+
+    # Registering or deregistering modifiers outside of any event invalidates
+    # the cache.
+    modifier = ES.register_effect(UnitSpeedModifier(chicken, 1))
+    assert _serialize(game_state)["map"]["hexes"][chicken_idx]["unit"]["speed"] == (
+        speed + 1
+    )
+    ES.deregister_effects(modifier)
+    assert _serialize(game_state)["map"]["hexes"][chicken_idx]["unit"]["speed"] == (
+        speed
+    )
+
+    # Modifiers changing their outcome without events touching the hex aren't
+    # noticed.
+    modifier = ES.register_effect(UnitSpeedModifier(chicken, 1))
+    _serialize(game_state)
+    modifier.amount = 2
+    with pytest.raises(ValueError, match="stale serialization cache"):
+        _serialize(game_state)
+
+
+def test_viewport(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    chicken = spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(2, 0))
+    summaries = HexSummaries()
+
+    def _make_frame(viewport: ViewportSchema | None) -> dict:
+        return apply_viewport(
+            {
+                "message_type": "game_state",
+                "count": 1,
+                "game_state": _serialize(game_state),
+            },
+            viewport,
+            summaries,
+        )
+
+    full = {
+        CC(**_hex["cc"]): _hex
+        for _hex in _make_frame(None)["game_state"]["map"]["hexes"]
+    }
+    viewport = ViewportSchema(center=CCSchema(r=-4, h=0), radius=0)
+    previous = _make_frame(viewport)
+    assert previous["viewport"] == viewport.model_dump()
+    hexes = {CC(**_hex["cc"]): _hex for _hex in previous["game_state"]["map"]["hexes"]}
+    assert hexes[CC(-2, 0)] == full[CC(-2, 0)]
+    assert hexes[CC(2, 0)] == summarize_hex(full[CC(2, 0)])
+    assert hexes[CC(2, 0)]["unit"]["statuses"] == []
+    # Summaries of unchanged hexes are reused.
+    current = _make_frame(viewport)
+    assert all(
+        a is b
+        for a, b in zip(
+            previous["game_state"]["map"]["hexes"],
+            current["game_state"]["map"]["hexes"],
+        )
+        if a["visible"]
+    )
+
+    current = _make_frame(ViewportSchema(center=CCSchema(r=2, h=0), radius=0))
+    delta_frame = make_game_state_delta_frame(previous, current)
+    assert delta_frame["viewport"] == current["viewport"]
+    assert (
+        apply_game_state_delta(previous["game_state"], delta_frame["delta"])
+        == current["game_state"]
+    )
+
+    # What the player saw is remembered in full detail, not the summaries.
+    last_seen = game_state.last_seen_hexes[player1]
+    assert last_seen.get(game_state.map.hexes[CC(2, 0)].index)["unit"][
+        "id"
+    ] == player1.id_map.get_id_for(chicken)
+    assert "summary" not in last_seen.get(game_state.map.hexes[CC(-1, 0)].index)
+
+
+def test_last_seen_hexes(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    archer = spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    chicken = spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(2, 0))
+    game_state.update_vision()
+    last_seen = game_state.last_seen_hexes[player1]
+    chicken_hex = game_state.map.hexes[CC(2, 0)]
+    far_hex = game_state.map.hexes[CC(-4, 0)]
+
+    _serialize(game_state)
+    assert last_seen.get(far_hex.index) is None
+    assert last_seen.get(chicken_hex.index)["visible"]
+
+    # Hexes going out of sight are remembered, with a ghost of what was on them.
+    ES.resolve(MoveUnit(archer, game_state.map.hexes[CC(-2, 0)]))
+    game_state.update_vision()
+    _serialize(game_state)
+    assert not chicken_hex.is_visible_to(player1)
+    remembered = last_seen.get(chicken_hex.index)
+    assert remembered["unit"]["blueprint"] == TEST_CHICKEN.identifier
+    assert remembered["unit"]["is_ghost"]
+    assert remembered["last_visible_round"] == game_state.round_counter
+
+    # Frames where visibility didn't change reuse what is remembered.
+    assert last_seen.get(chicken_hex.index) == remembered
+    _serialize(game_state)
+    assert last_seen.get(chicken_hex.index) == remembered
+
+    # Ghosts are forgotten once the unit is seen elsewhere.
+    ES.resolve(MoveUnit(chicken, game_state.map.hexes[CC(-3, 0)]))
+    game_state.update_vision()
+    _serialize(game_state)
+    assert last_seen.get(chicken_hex.index)["unit"] is None
+    assert last_seen.get(chicken_hex.index)["terrain"] == remembered["terrain"]
+
+
+def test_visibility_cache(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    chicken = spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(4, 0))
+    game_state.update_vision()
+
+    context = game_state._get_context_for(player1)
+    assert player1.id_map.get_id_for(chicken) not in context.visible_unit_ids
+    assert (
+        game_state._get_context_for(player1).visible_unit_ids
+        is context.visible_unit_ids
+    )
+
+    ES.resolve(MoveUnit(chicken, game_state.map.hexes[CC(2, 0)]))
+    game_state.update_vision()
+    context = game_state._get_context_for(player1)
+    assert player1.id_map.get_id_for(chicken) in context.visible_unit_ids
+    assert context.visible_blueprint_ids == {TEST_CHICKEN.identifier}
+
+    # Events that don't change vision keep the cache.
+    context = game_state._get_context_for(player1)
+    ES.resolve(Damage(chicken, DamageSignature(1, None)))
+    assert (
+        game_state._get_context_for(player1).visible_unit_ids
+        is context.visible_unit_ids
+    )
+
+    # Changes to vision that don't bump the vision version aren't noticed.
+    game_state.vision_map[player1][CC(2, 0)] = False
+    with pytest.raises(ValueError):
+        game_state._get_context_for(player1)
+
+
+def test_interned_decision_payload(game_state: GameState) -> None:
+    player1, _ = game_state.turn_order.original_order
+    spawner = UnitSpawner(game_state.map, player1)
+    archer = spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    chicken = spawner.spawn(TEST_CHICKEN, coordinate=CC(1, 0))
+    shared_hexes = [game_state.map.hexes[cc] for cc in (CC(0, 1), CC(1, -1))]
+    decision_point = SelectOptionDecisionPoint(
+        [
+            ActivateUnitOption(
+                target_profile=OneOfUnits([archer, chicken]),
+                actions_previews={
+                    unit: [
+                        MoveOption(target_profile=OneOfHexes(list(shared_hexes))),
+                        SkipOption(target_profile=NoTarget()),
+                    ]
+                    for unit in (archer, chicken)
+                },
+            ),
+            SkipOption(target_profile=NoTarget()),
+        ],
+        explanation="activate unit",
+    )
+
+    payload = decision_point.serialize_payload(game_state._get_context_for(player1))
+    assert len(payload["target_profiles"]) == 3
+    assert len(payload["previews"]) == 2
+    archer_id, chicken_id = (
+        player1.id_map.get_id_for(unit) for unit in (archer, chicken)
+    )
+    previews = payload["options"][0]["values"]["actions_preview"]
+    assert previews[archer_id] == previews[chicken_id] == [0, 1]
+
+    # Premoves made for a units previews match the options the unit is later
+    # given, by digest.
+    digests = payload["options"][0]["values"]["actions_preview_digests"]
+    assert (
+        digests[archer_id]
+        == digests[chicken_id]
+        == game_state.serialize_options_for(
+            player1, decision_point.options[0].actions_previews[chicken]
+        )["options_digest"]
+    )
+    assert payload["options_digest"] != digests[archer_id]
+
+    options = resolve_interned_options(json.loads(json.dumps(payload)))
+    assert options[0]["target_profile"] == {
+        "type": "OneOfUnits",
+        "values": {"units": [{"id": archer_id}, {"id": chicken_id}]},
+    }
+    assert options[0]["values"]["actions_preview"][chicken_id] == [
+        {
+            "type": "MoveOption",
+            "values": {},
+            "target_profile": {
+                "type": "OneOfHexes",
+                "values": {"options": [{"r": 0, "h": 1}, {"r": 1, "h": -1}]},
+            },
+        },
+        {
+            "type": "SkipOption",
+            "values": {},
+            "target_profile": {"type": "NoTarget", "values": {}},
+        },
+    ]
+    assert options[1] == options[0]["values"]["actions_preview"][archer_id][1]
+
+
+def test_unchanged_frames_are_dropped(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    UnitSpawner(game_state.map, player1).spawn(TEST_CHICKEN, coordinate=CC(0, 0))
+    connection = game_state.connections[player2]
+
+    game_state.update_vision()
+    game_state.send_to_players()
+    game_state.send_to_players()
+    assert len(connection.history) == 1
+
+    with game_state.log(LogLine(["shared"])):
+        pass
+    game_state.send_to_players()
+    assert len(connection.history) == 2
+    assert connection.history[-1]["count"] == 2
+
+    # Premoves are discarded with later frames, even those that are dropped.
+    game_state.send_to_players()
+    connection._premove = PremoveSchema(options_digest="digest", payload={})
+    game_state.send_to_players()
+    assert len(connection.history) == 3
+    assert connection._premove is None
+
+
+def test_spectator_view(game_state: GameState) -> None:
+    player1, player2 = game_state.turn_order.original_order
+    ES.register_effects(SpectatorRevealedModifier(game_state.spectator))
+    spawner = UnitSpawner(game_state.map, player1)
+    archer = spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(-4, 0))
+    chicken = spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(4, 0))
+    with game_state.log(LogLine([chicken, "clucks"])):
+        pass
+    game_state.update_vision()
+
+    state = game_state.serialize_for_spectator()
+    assert all(_hex["visible"] for _hex in state["map"]["hexes"])
+    assert {_hex["unit"]["id"] for _hex in state["map"]["hexes"] if _hex["unit"]} == {
+        game_state.spectator.id_map.get_id_for(unit) for unit in (archer, chicken)
+    }
+    assert state["new_logs"][-1][1][-1] == {"type": "string", "message": "clucks"}
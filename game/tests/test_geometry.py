@@ -0,0 +1,100 @@
+import pytest
+
+from game.core import HexMap, HexSpec, Landscape
+from game.map.coordinates import CC, Corner, CornerPosition
+from game.map.geometry import (
+    corner_offsets,
+    hex_arc,
+    hex_circle,
+    hex_circle_offsets,
+    hex_ring,
+    translate_and_clip,
+)
+from game.map.terrain import Plains
+
+
+@pytest.mark.parametrize("radius", range(5))
+def test_circle(radius: int) -> None:
+    center = CC(2, -3)
+    circle = hex_circle(radius, center=center)
+    assert len(circle) == len(set(circle)) == 1 + 3 * radius * (radius + 1)
+    assert set(circle) == {
+        CC(r, h) + center
+        for r in range(-radius, radius + 1)
+        for h in range(-radius, radius + 1)
+        if CC(r, h).length <= radius
+    }
+
+
+@pytest.mark.parametrize("radius", range(1, 5))
+def test_ring(radius: int) -> None:
+    center = CC(-1, 4)
+    ring = hex_ring(radius, center=center)
+    assert len(ring) == len(set(ring)) == 6 * radius
+    assert all(cc.distance_to(center) == radius for cc in ring)
+    for previous, cc in zip(ring, ring[1:] + ring[:1]):
+        assert previous.distance_to(cc) == 1
+
+
+def test_min_radius() -> None:
+    assert set(hex_circle_offsets(3, 2)) == set(hex_ring(2)) | set(hex_ring(3))
+
+
+def test_arc() -> None:
+    center = CC(1, 1)
+    ring = hex_ring(2, center=center)
+    for idx, stroke_center in enumerate(ring):
+        assert hex_arc(2, 1, stroke_center, arc_center=center) == [
+            ring[(idx + offset) % len(ring)] for offset in (-1, 0, 1)
+        ]
+    with pytest.raises(ValueError):
+        hex_arc(2, 1, center, arc_center=center)
+
+
+def test_corners() -> None:
+    for corner in corner_offsets(3, 1):
+        assert all(1 <= cc.length <= 3 for cc in corner.get_adjacent_positions())
+    assert Corner(CC(0, 0), CornerPosition.TOP) not in corner_offsets(3, 1)
+    assert Corner(CC(0, 0), CornerPosition.TOP) in corner_offsets(1)
+
+
+def test_translate_and_clip() -> None:
+    within = {cc: cc for cc in hex_circle(2)}
+    assert list(translate_and_clip(hex_circle_offsets(1), CC(2, 0), within)) == [
+        cc for cc in hex_circle(1, center=CC(2, 0)) if cc in within
+    ]
+
+
+def test_map_corners() -> None:
+    hex_map = HexMap(Landscape({cc: HexSpec(Plains, False) for cc in hex_circle(3)}))
+    center = CC(1, -1)
+    corners = list(hex_map.get_corners_within_range_off(center, 2, min_distance=1))
+    assert corners == list(hex_map.get_corners_within_range_off(center, 2, 1))
+    assert corners == [
+        corner
+        for corner in (
+            Corner(cc, position)
+            for cc in hex_circle(2, center=center)
+            for position in CornerPosition
+        )
+        if all(
+            cc in hex_map.hexes and 1 <= cc.distance_to(center) <= 2
+            for cc in corner.get_adjacent_positions()
+        )
+    ]
+    for corner in corners:
+        assert [
+            _hex.position for _hex in hex_map.get_hexes_around_corner(corner)
+        ] == corner.get_adjacent_positions()
+
+
+def test_map_corner_range_cache_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(HexMap, "corner_range_cache_size", 4)
+    hex_map = HexMap(Landscape({cc: HexSpec(Plains, False) for cc in hex_circle(3)}))
+    results = {
+        center: list(hex_map.get_corners_within_range_off(center, 1))
+        for center in hex_circle(3)
+    }
+    assert len(hex_map._corner_range_cache) == 4
+    for center, corners in results.items():
+        assert list(hex_map.get_corners_within_range_off(center, 1)) == corners
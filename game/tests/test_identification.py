@@ -0,0 +1,56 @@
+import gc
+
+from game.identification import IDMap
+
+
+class Thing: ...
+
+
+def test_ids_are_short_and_stable() -> None:
+    id_map = IDMap()
+    things = [Thing() for _ in range(100)]
+    ids = [id_map.get_id_for(thing) for thing in things]
+
+    assert len(set(ids)) == len(ids)
+    assert all(len(id_) == IDMap.ID_BYTES * 2 for id_ in ids)
+    assert [id_map.get_id_for(thing) for thing in things] == ids
+    assert all(id_map.get_object_for(id_) is thing for id_, thing in zip(ids, things))
+
+
+def test_ids_differ_between_maps() -> None:
+    things = [Thing() for _ in range(10)]
+    ids = [IDMap().get_id_for(thing) for thing in things for _ in range(2)]
+    assert len(set(ids)) == len(ids)
+
+
+def test_prune_expires_ids_not_accessed_since_last_prune() -> None:
+    id_map = IDMap()
+    kept, dropped = Thing(), Thing()
+    kept_id, dropped_id = id_map.get_id_for(kept), id_map.get_id_for(dropped)
+
+    id_map.prune()
+    assert id_map.has_id(kept_id) and id_map.has_id(dropped_id)
+
+    assert id_map.get_id_for(kept) == kept_id
+    id_map.prune()
+    assert id_map.has_id(kept_id)
+    assert not id_map.has_id(dropped_id)
+
+    assert id_map.get_id_for(dropped) != dropped_id
+
+
+def test_collected_objects_are_forgotten() -> None:
+    id_map = IDMap()
+    thing = Thing()
+    id_ = id_map.get_id_for(thing)
+
+    del thing
+    gc.collect()
+    assert not id_map.has_id(id_)
+
+
+def test_objects_without_weakref_support() -> None:
+    id_map = IDMap()
+    value = (1, 2)
+    id_ = id_map.get_id_for(value)
+    assert id_map.get_object_for(id_) is value
@@ -0,0 +1,56 @@
+import random
+
+from game.core import HexMap, HexSpec, Landscape, Player, Unit
+from game.map.geometry import hex_circle
+from game.map.terrain import Plains
+from game.tests.units import TEST_CHICKEN
+
+
+def test_unit_index() -> None:
+    rng = random.Random(0)
+    hex_map = HexMap(Landscape({cc: HexSpec(Plains, False) for cc in hex_circle(4)}))
+    players = [Player("player 1"), Player("player 2")]
+    positions = list(hex_map.hexes.keys())
+
+    units = []
+    for cc in rng.sample(positions, 12):
+        unit = Unit(rng.choice(players), TEST_CHICKEN)
+        assert hex_map.move_unit_to(unit, cc)
+        units.append(unit)
+    assert not hex_map.move_unit_to(
+        Unit(players[0], TEST_CHICKEN), hex_map.hex_off(unit)
+    )
+
+    for unit in rng.sample(units, 4):
+        hex_map.remove_unit(unit)
+        units.remove(unit)
+    for unit in units:
+        if hex_map.unit_on(cc := rng.choice(positions)) is None:
+            assert hex_map.move_unit_to(unit, cc)
+
+    assert list(hex_map.units) == units
+    for player in players:
+        assert list(hex_map.units_controlled_by(player)) == [
+            unit for unit in units if unit.controller == player
+        ]
+    for cc in positions:
+        assert hex_map.unit_on(cc) == hex_map.unit_positions.inverse.get(
+            hex_map.hexes[cc]
+        )
+
+    for center in positions:
+        for distance in range(4):
+            in_range = [
+                unit
+                for _hex in hex_map.get_hexes_within_range_off(center, distance)
+                if (unit := hex_map.unit_on(_hex))
+            ]
+            assert list(hex_map.get_units_within_range_off(center, distance)) == (
+                in_range
+            )
+            for player in players:
+                assert list(
+                    hex_map.get_units_within_range_off(
+                        center, distance, controlled_by=player
+                    )
+                ) == [unit for unit in in_range if unit.controller == player]
@@ -1407,7 +1407,7 @@ class Translocate(ActivatedAbilityFacet[ObjectListResult[Unit | Hex]]):
         if units := [
             (
                 unit,
-                TreeNode([(h, None) for h in hexes], "select hex"),
+                TreeNode.of_leaves(hexes, "select hex"),
             )
             for unit in find_units_within_range(self.parent, 1)
             if (
@@ -1419,7 +1419,7 @@ class Translocate(ActivatedAbilityFacet[ObjectListResult[Unit | Hex]]):
                 )
             )
         ]:
-            return Tree(TreeNode(units, "select unit"))
+            return Tree(TreeNode(units, "select unit"), lazy=True)
 
     def perform(self, target: ObjectListResult[Hex | Unit]) -> None:
         unit, to_ = target
@@ -1442,7 +1442,7 @@ class WringEssence(ActivatedAbilityFacet[ObjectListResult[Unit | Hex]]):
         if units := [
             (
                 unit,
-                TreeNode([(h, None) for h in hexes], "select hex"),
+                TreeNode.of_leaves(hexes, "select hex"),
             )
             for unit in find_units_within_range(self.parent, 2)
             if (
@@ -1454,7 +1454,7 @@ class WringEssence(ActivatedAbilityFacet[ObjectListResult[Unit | Hex]]):
                 )
             )
         ]:
-            return Tree(TreeNode(units, "select unit"))
+            return Tree(TreeNode(units, "select unit"), lazy=True)
 
     def perform(self, target: ObjectListResult[Hex | Unit]) -> None:
         unit, to_ = target
@@ -2176,7 +2176,7 @@ class Evacuate(ActivatedAbilityFacet[ObjectListResult[Unit | Hex]]):
             units := [
                 (
                     unit,
-                    TreeNode([(h, None) for h in hexes], "select hex"),
+                    TreeNode.of_leaves(hexes, "select hex"),
                 )
                 for unit in find_units_within_range(
                     self.parent,
@@ -2187,7 +2187,7 @@ class Evacuate(ActivatedAbilityFacet[ObjectListResult[Unit | Hex]]):
                 )
             ]
         ):
-            return Tree(TreeNode(units, "select unit"))
+            return Tree(TreeNode(units, "select unit"), lazy=True)
 
     def perform(self, target: ObjectListResult[Hex | Unit]) -> None:
         unit, to_ = target
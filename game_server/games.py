@@ -1,26 +1,71 @@
 from __future__ import annotations
 
+import dataclasses
 import json
+import os
 import threading
 import time
 import traceback
+from collections import deque
 from queue import Empty, SimpleQueue
 from threading import Thread
 from typing import Any, Callable, Iterator, Mapping
 from uuid import UUID
 
+from pydantic import ValidationError
 from sqlalchemy import Exists, select
 
 from events.eventsystem import ES
-from game.core import Connection, DecisionPoint, G_decision_result, Player
+from game.core import (
+    Connection,
+    DecisionPoint,
+    G_decision_result,
+    GameState,
+    Observer,
+    Player,
+)
+from game.encoding import encode_binary
 from game.events import Play
+from game.frames import (
+    HexSummaries,
+    apply_viewport,
+    make_game_state_delta_frame,
+    make_static_map,
+    strip_static_map,
+)
+from game.schemas import (
+    HandshakeSchema,
+    LogRangeRequestSchema,
+    ViewportSchema,
+)
 from game_server.exceptions import GameClosed
 from game_server.game_types import GameType
 from game_server.setup import setup_scenario, setup_scenario_units
+from game_server.spectators import SpectatorFanOut
 from model.engine import SS
 from model.models import Game, Seat
 
 
+# Seconds spectators lag behind the game, so they can't be used to cheat. Anyone can
+# spectate, so this holds for the views of seats as well as the omniscient view,
+# which would otherwise show a player what their opponent sees.
+SPECTATOR_DELAY = float(os.environ.get("SPECTATOR_DELAY", 60))
+
+
+# Action previews of units are only sent when clients ask for them.
+LAZY_ACTION_PREVIEWS = os.environ.get("LAZY_ACTION_PREVIEWS", "1") == "1"
+
+
+# Number of recent game state frames kept per seat, which reconnecting clients can
+# resume from.
+RECENT_FRAME_COUNT = 32
+
+
+# Most game state frames delivered to the clients of a seat per second. Frames sent
+# faster than this are coalesced, and only the latest of them is delivered.
+MAX_FRAME_RATE = float(os.environ.get("MAX_FRAME_RATE", 20))
+
+
 class GameManager:
     def __init__(self):
         self._running: list[GameRunner] = []
@@ -44,6 +89,19 @@ class GameManager:
             for game in self._running:
                 game.stop()
 
+    def get_spectators(
+        self, game_id: int, position: int | None
+    ) -> SpectatorFanOut | None:
+        """
+        Spectators of the running game with game_id, seeing what the seat at position
+        sees, or everything if position is None.
+        """
+        with self._lock:
+            for game in self._running:
+                if game.game_id == game_id:
+                    return game.get_spectators(position)
+        return None
+
     def get_seat_interface(self, seat_id: UUID) -> SeatInterface:
         with self._lock:
             if seat_id in self._interface_map:
@@ -73,50 +131,215 @@ class GameManager:
 GM = GameManager()
 
 
+@dataclasses.dataclass
+class ClientState:
+    options: HandshakeSchema
+    # Count of the last game state frame sent to the client, or the one it has
+    # when resuming, which deltas are made against.
+    last_count: int | None = None
+    has_static_map: bool = False
+    # Viewport of the client, and the one the last frame sent to it was made for.
+    viewport: ViewportSchema | None = None
+    sent_viewport: ViewportSchema | None = None
+
+
 class SeatInterface(Connection):
     def __init__(self, player: Player, game_runner: GameRunner):
         super().__init__(player)
         self.game_runner = game_runner
         self._latest_game_state_frame = None
+        # Encoded variants of the latest frame, by (count of the frame it is a
+        # delta from, viewport of that frame, viewport, static_map, binary).
+        self._latest_game_state_frame_variants: dict[
+            tuple[int | None, ViewportSchema | None, ViewportSchema | None, bool, bool],
+            str | bytes,
+        ] = {}
         self._latest_game_state_frame_lock = threading.Lock()
+        self._recent_game_state_frames: deque[Mapping[str, Any]] = deque(
+            maxlen=RECENT_FRAME_COUNT
+        )
         self._lock = threading.Lock()
+        # Shared by the viewports of all clients, only used with the lock held.
+        self._hex_summaries = HexSummaries()
+        self._last_delivery_time: float = 0
+        self._delivery_timer: threading.Timer | None = None
         self.in_queue = SimpleQueue()
-        self._callbacks: list[Callable[[str], ...]] = []
+        self._clients: dict[Callable[[str], ...], ClientState] = {}
+        # Spectators watching the game from this seats view.
+        self.spectators = SpectatorFanOut(delay=SPECTATOR_DELAY)
 
         self._remaining_time: float = game_runner.game.time_bank or 0
         self._grace: float = game_runner.game.time_grace or 0
 
-    def _send_frame_to_callback(
-        self, f: Callable[[str], ...], values: Mapping[str, Any]
+    def _send_encoded_to_callback(
+        self, f: Callable[[str | bytes], ...], data: str | bytes
     ) -> None:
         try:
-            f(json.dumps(values))
+            f(data)
         except Exception:
             print(traceback.format_exc())
-            self._callbacks.remove(f)
-
-    def register_callback(self, f: Callable[[str], ...]) -> None:
+            self._clients.pop(f, None)
+
+    def _send_game_state_frame_to_callback(
+        self,
+        f: Callable[[str], ...],
+        client: ClientState,
+        frame: Mapping[str, Any],
+        variants: dict[
+            tuple[int | None, ViewportSchema | None, ViewportSchema | None, bool, bool],
+            str | bytes,
+        ],
+    ) -> None:
+        if client.options.static_map and not client.has_static_map:
+            self._send_encoded_to_callback(
+                f, self.game_runner.get_encoded_static_map(frame["game_state"])
+            )
+            client.has_static_map = True
+        # Clients which still have their last frame among the recent frames only
+        # get the changes since then, everything else gets the full frame.
+        base_frame = (
+            self._get_recent_game_state_frame(client.last_count)
+            if client.options.delta_frames and client.last_count is not None
+            else None
+        )
+        # Each variant is only built and encoded once, however many clients
+        # receive it.
+        key = (
+            base_frame and base_frame["count"],
+            base_frame and client.sent_viewport,
+            client.viewport,
+            client.options.static_map,
+            client.options.binary_frames,
+        )
+        if key not in variants:
+            # Hexes are summarized outside the viewport of the client, and deltas
+            # are made against the frame as it was summarized when it was sent.
+            variant = apply_viewport(frame, client.viewport, self._hex_summaries)
+            if base_frame is not None:
+                variant = (
+                    make_game_state_delta_frame(
+                        apply_viewport(
+                            base_frame, client.sent_viewport, self._hex_summaries
+                        ),
+                        variant,
+                    )
+                    or variant
+                )
+            if client.options.static_map:
+                variant = strip_static_map(variant)
+            variants[key] = (
+                encode_binary(variant)
+                if client.options.binary_frames
+                else json.dumps(variant)
+            )
+        self._send_encoded_to_callback(f, variants[key])
+        client.last_count = frame["count"]
+        client.sent_viewport = client.viewport
+
+    def _get_recent_game_state_frame(self, count: int) -> Mapping[str, Any] | None:
+        if self._recent_game_state_frames and 0 <= (
+            idx := count - self._recent_game_state_frames[0]["count"]
+        ) < len(self._recent_game_state_frames):
+            return self._recent_game_state_frames[idx]
+        return None
+
+    def register_callback(
+        self, f: Callable[[str], ...], options: HandshakeSchema
+    ) -> None:
         with self._lock:
-            self._callbacks.append(f)
+            self._clients[f] = client = ClientState(
+                options,
+                viewport=options.viewport,
+                sent_viewport=options.viewport,
+            )
             with self._latest_game_state_frame_lock:
-                if self._latest_game_state_frame is not None:
-                    self._send_frame_to_callback(f, self._latest_game_state_frame)
+                if (frame := self._latest_game_state_frame) is None:
+                    return
+                # Resuming clients that are up to date don't need anything, and
+                # those still covered by the recent frames only get what they
+                # have missed, if they accept deltas.
+                client.last_count = options.last_seen_count
+                if options.last_seen_count != frame["count"]:
+                    self._send_game_state_frame_to_callback(
+                        f, client, frame, self._latest_game_state_frame_variants
+                    )
 
     def is_connected(self) -> bool:
         with self._lock:
-            return bool(self._callbacks)
+            return bool(self._clients)
+
+    def _send_error_to_callback(
+        self, f: Callable[[str], ...], error_type: str, error_detail: Any
+    ) -> None:
+        f(
+            json.dumps(
+                {
+                    "message_type": "error",
+                    "error_type": error_type,
+                    "error_detail": error_detail,
+                }
+            )
+        )
+
+    def receive(self, f: Callable[[str], ...], message: Mapping[str, Any]) -> None:
+        """
+        Handles a message from the client behind callback f. Log requests and
+        viewports don't touch the game state, so they are handled directly,
+        everything else is passed on to the game thread.
+        """
+        if message.get("message_type") == "request_logs":
+            try:
+                request = LogRangeRequestSchema.model_validate(message)
+            except ValidationError as e:
+                self._send_error_to_callback(f, "invalid_log_request", e.errors())
+                return
+            f(
+                json.dumps(
+                    {
+                        "message_type": "logs",
+                        "start": request.start,
+                        "logs": self.game_runner.game_state.get_logs_for(
+                            self.player, request.start, request.stop
+                        ),
+                    }
+                )
+            )
+        elif message.get("message_type") == "viewport":
+            try:
+                viewport = ViewportSchema.model_validate(message)
+            except ValidationError as e:
+                self._send_error_to_callback(f, "invalid_viewport", e.errors())
+                return
+            self._set_viewport(f, viewport)
+        else:
+            self.in_queue.put(message)
+
+    def _set_viewport(self, f: Callable[[str], ...], viewport: ViewportSchema) -> None:
+        """
+        Viewports are per client, and only applied to frames as they are sent, so
+        the latest frame is sent again for the new viewport, without touching the
+        game state.
+        """
+        with self._lock:
+            if (client := self._clients.get(f)) is None or client.viewport == viewport:
+                return
+            client.viewport = viewport
+            with self._latest_game_state_frame_lock:
+                frame = self._latest_game_state_frame
+                variants = self._latest_game_state_frame_variants
+            # Clients still waiting for the latest frame get it with the new
+            # viewport when it is delivered.
+            if frame is not None and client.last_count == frame["count"]:
+                self._send_game_state_frame_to_callback(f, client, frame, variants)
 
     def deregister_callback(self, f: Callable[[str], ...]) -> None:
         with self._lock:
-            try:
-                self._callbacks.remove(f)
-            except (IndexError, ValueError):
-                pass
+            self._clients.pop(f, None)
 
     def make_game_state_frame(
         self, game_state: Mapping[str, Any], decision_point: DecisionPoint | None = None
     ) -> dict[str, Any]:
-        frame = {
+        return {
             "message_type": "game_state",
             "count": self._game_state_counter,
             "game_state": game_state,
@@ -126,24 +349,80 @@ class SeatInterface(Connection):
                 else {}
             ),
         }
-        with self._latest_game_state_frame_lock:
-            self._latest_game_state_frame = frame
-            return frame
+
+    def send_game_state_frame(self, frame: Mapping[str, Any]) -> None:
+        if self.spectators.has_spectators():
+            # Spectators are read only.
+            self.spectators.send_game_state(
+                {**frame["game_state"], "decision": None},
+                lambda start, stop: self.game_runner.game_state.get_logs_for(
+                    self.player, start, stop
+                ),
+            )
+        with self._lock:
+            with self._latest_game_state_frame_lock:
+                self._latest_game_state_frame = frame
+                self._latest_game_state_frame_variants = {}
+                self._recent_game_state_frames.append(frame)
+            # Latest state wins, a delivery that is already scheduled delivers
+            # this frame instead.
+            if self._delivery_timer is not None:
+                return
+            if (
+                delay := self._last_delivery_time
+                + 1 / MAX_FRAME_RATE
+                - time.monotonic()
+            ) > 0:
+                self._delivery_timer = threading.Timer(
+                    delay, self._deliver_latest_game_state_frame
+                )
+                self._delivery_timer.daemon = True
+                self._delivery_timer.start()
+                return
+        self._deliver_latest_game_state_frame()
+
+    def _deliver_latest_game_state_frame(self) -> None:
+        with self._lock:
+            self._delivery_timer = None
+            self._last_delivery_time = time.monotonic()
+            with self._latest_game_state_frame_lock:
+                frame = self._latest_game_state_frame
+                variants = self._latest_game_state_frame_variants
+            for f, client in list(self._clients.items()):
+                # Clients that resumed since the frame was sent may have it.
+                if client.last_count != frame["count"]:
+                    self._send_game_state_frame_to_callback(f, client, frame, variants)
+
+    def _flush_delayed_game_state_frame(self) -> None:
+        with self._lock:
+            if self._delivery_timer is None:
+                return
+            self._delivery_timer.cancel()
+        # If the timer has fired already, the frame is only delivered once, as
+        # clients which have it are skipped.
+        self._deliver_latest_game_state_frame()
 
     def send(self, values: Mapping[str, Any]) -> None:
+        data = json.dumps(values)
+        # A frame held back by the rate limit is delivered first, so other messages,
+        # like the game result, never overtake it.
+        self._flush_delayed_game_state_frame()
         with self._lock:
-            for f in list(self._callbacks):
-                self._send_frame_to_callback(f, values)
+            for f in list(self._clients):
+                self._send_encoded_to_callback(f, data)
 
     def wait_for_response(self) -> Iterator[G_decision_result | None]:
         start_time = time.time()
         while self.game_runner.is_running:
             try:
-                if (
-                    validated := self.validate_decision_message(
-                        self.in_queue.get(timeout=0.01)
-                    )
-                ) is not None:
+                message = self.in_queue.get(timeout=0.01)
+                # Answered from the game thread, as previews and subtrees are
+                # computed from the game state.
+                if message.get("message_type") == "request_action_previews":
+                    self.send_action_previews(message)
+                elif message.get("message_type") == "request_subtree":
+                    self.send_subtree(message)
+                elif (validated := self.validate_decision_message(message)) is not None:
                     if self.game_runner.game.time_bank is not None:
                         self._remaining_time -= max(
                             (time.time() - start_time) - self._grace, 0
@@ -168,6 +447,22 @@ class SeatInterface(Connection):
         raise GameClosed()
 
 
+class SpectatorObserver(Observer):
+    def __init__(self, game_runner: GameRunner, spectators: SpectatorFanOut):
+        self._game_runner = game_runner
+        self._spectators = spectators
+
+    def is_observing(self) -> bool:
+        return self._spectators.has_spectators()
+
+    def observe(self, game_state: Mapping[str, Any]) -> None:
+        gs = self._game_runner.game_state
+        self._spectators.send_game_state(
+            game_state,
+            lambda start, stop: gs.get_logs_for(gs.spectator, start, stop),
+        )
+
+
 class Cleaner(Thread):
     def __init__(self, game_runner: GameRunner, delay: int):
         super().__init__()
@@ -196,11 +491,17 @@ class GameRunner(Thread):
             .get_scenario()
         )
         self.game = game
+        self.game_id = game.id
         self._lock = threading.Lock()
         self._is_running = False
         self._children: list[Thread] = []
 
         self.seat_map: dict[UUID, SeatInterface] = {}
+        self.game_state: GameState | None = None
+
+        self.omniscient_spectators = SpectatorFanOut(delay=SPECTATOR_DELAY)
+        self._seat_spectators: dict[int, SpectatorFanOut] = {}
+        self._encoded_static_map: str | None = None
 
     def stop(self):
         for child in self._children:
@@ -217,6 +518,26 @@ class GameRunner(Thread):
         self._children.append(thread)
         thread.start()
 
+    def get_spectators(self, position: int | None) -> SpectatorFanOut | None:
+        if position is None:
+            return self.omniscient_spectators
+        return self._seat_spectators.get(position)
+
+    def get_encoded_static_map(self, game_state: Mapping[str, Any]) -> str:
+        """
+        The static map layer is the same for every seat and never changes, so it is
+        only built once per game.
+        """
+        with self._lock:
+            if self._encoded_static_map is None:
+                self._encoded_static_map = json.dumps(
+                    {"message_type": "map_static", **make_static_map(game_state)}
+                )
+            return self._encoded_static_map
+
+    def _get_all_spectators(self) -> list[SpectatorFanOut]:
+        return [self.omniscient_spectators, *self._seat_spectators.values()]
+
     @property
     def is_running(self) -> bool:
         with self._lock:
@@ -228,19 +549,25 @@ class GameRunner(Thread):
             self._is_running = v
 
     def send_result_message(self, winner: str, result: str) -> None:
+        message = {"message_type": "game_result", "winner": winner, "reason": result}
         for interface in self.seat_map.values():
-            interface.send(
-                {"message_type": "game_result", "winner": winner, "reason": result}
-            )
+            interface.send(message)
+        for spectators in self._get_all_spectators():
+            spectators.send(message)
 
     def run(self):
         try:
             self.is_running = True
 
-            gs = setup_scenario(
+            gs = self.game_state = setup_scenario(
                 self._scenario,
                 lambda player: SeatInterface(player, game_runner=self),
+                # Without fog of war players see the same things, so they can share
+                # ids and the serialization of the map.
+                shared_ids=not self.game.with_fow,
+                lazy_action_previews=LAZY_ACTION_PREVIEWS,
             )
+            gs.observer = SpectatorObserver(self, self.omniscient_spectators)
 
             self.seat_map: dict[UUID, SeatInterface] = {
                 seat.id: connection
@@ -248,6 +575,10 @@ class GameRunner(Thread):
                     gs.connections.items(), self.game.seats
                 )
             }
+            self._seat_spectators = {
+                seat.position: self.seat_map[seat.id].spectators
+                for seat in self.game.seats
+            }
             GM.register(self)
 
             setup_scenario_units(
@@ -269,5 +600,7 @@ class GameRunner(Thread):
         finally:
             self.is_running = False
             GM.deregister(self)
+            for spectators in self._get_all_spectators():
+                spectators.close()
 
         print("game finished")
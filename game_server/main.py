@@ -4,10 +4,12 @@ import json
 import traceback
 from uuid import UUID
 
+from pydantic import ValidationError
 from websockets import ConnectionClosed
 from websockets.sync.server import ServerConnection, serve
 
 from game.map import terrain  # noqa F401
+from game.schemas import HandshakeSchema, SpectateSchema
 from game.statuses import hex_statuses, unit_statuses  # noqa F401
 from game.units import blueprince  # noqa F401
 from game_server.games import GM
@@ -30,13 +32,15 @@ def handle_test_connection(connection: ServerConnection) -> None:
             raise
 
 
-def handle_seat_connection(connection: ServerConnection, seat_id: UUID) -> None:
-    interface = GM.get_seat_interface(seat_id)
-    interface.register_callback(connection.send)
+def handle_seat_connection(
+    connection: ServerConnection, handshake: HandshakeSchema
+) -> None:
+    interface = GM.get_seat_interface(UUID(handshake.seat_id))
+    interface.register_callback(connection.send, handshake)
 
     while interface.game_runner.is_running:
         try:
-            interface.in_queue.put(json.loads(connection.recv(timeout=1)))
+            interface.receive(connection.send, json.loads(connection.recv(timeout=1)))
         except TimeoutError:
             pass
         except ConnectionClosed:
@@ -48,15 +52,57 @@ def handle_seat_connection(connection: ServerConnection, seat_id: UUID) -> None:
     interface.game_runner.schedule_stop_check(60)
 
 
+def handle_spectator_connection(
+    connection: ServerConnection, spectate: SpectateSchema
+) -> None:
+    if not (spectators := GM.get_spectators(spectate.game_id, spectate.position)):
+        connection.send(
+            json.dumps({"message_type": "error", "error_type": "unknown_game"})
+        )
+        return
+
+    # Frames are put in the buffer by the game thread, and sent from this thread,
+    # so slow spectators don't hold up the game.
+    buffer = spectators.subscribe()
+    try:
+        while (frame := buffer.get(timeout=1)) is not None or not buffer.closed:
+            if frame is not None:
+                connection.send(frame)
+            # Spectators are read only, anything they send is discarded.
+            try:
+                while True:
+                    connection.recv(timeout=0)
+            except TimeoutError:
+                pass
+    except ConnectionClosed:
+        pass
+    finally:
+        spectators.unsubscribe(buffer)
+
+
 def handle_connection(connection: ServerConnection) -> None:
     print("connected")
 
-    seat_id = json.loads(connection.recv())["seat_id"]
-
-    if seat_id == "test":
+    try:
+        handshake = HandshakeSchema.model_validate_json(connection.recv())
+    except ValidationError as e:
+        connection.send(
+            json.dumps(
+                {
+                    "message_type": "error",
+                    "error_type": "invalid_handshake",
+                    "error_detail": e.errors(include_url=False, include_context=False),
+                }
+            )
+        )
+        return
+
+    if handshake.spectate:
+        handle_spectator_connection(connection, handshake.spectate)
+    elif handshake.seat_id == "test":
         handle_test_connection(connection)
     else:
-        handle_seat_connection(connection, UUID(seat_id))
+        handle_seat_connection(connection, handshake)
 
     print("connection closed")
 
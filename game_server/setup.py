@@ -3,21 +3,30 @@ from typing import Callable, ClassVar
 
 from events.eventsystem import ES, EventSystem, StateModifierEffect
 from game.core import GS, Connection, GameState, Hex, Player, Scenario, Unit
+from game.effects.modifiers import SpectatorRevealedModifier
 from game.events import ApplyHexStatus, DeployArmies, SpawnUnit
 
 
 def setup_scenario(
     scenario: Scenario,
     connection_factory: Callable[[Player], Connection],
+    shared_ids: bool = False,
+    lazy_action_previews: bool = False,
 ) -> GameState:
     ES.bind(EventSystem())
 
     gs = GameState(
-        player_count=2, connection_factory=connection_factory, scenario=scenario
+        player_count=2,
+        connection_factory=connection_factory,
+        scenario=scenario,
+        shared_ids=shared_ids,
+        lazy_action_previews=lazy_action_previews,
     )
 
     GS.bind(gs)
 
+    ES.register_effects(SpectatorRevealedModifier(gs.spectator))
+
     return gs
 
 
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import threading
+import time
+from typing import Any, Callable, Mapping
+
+
+class SpectatorBuffer:
+    """
+    Holds the next frame for a single spectator socket. Putting a frame never
+    blocks, if the spectator hasn't taken the previous frame yet, it is dropped.
+    """
+
+    def __init__(self):
+        self._frame: str | None = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self.dropped_frames: int = 0
+        # Number of log lines the spectator has been sent, with the frames it has
+        # taken, and with the frame it is about to take.
+        self._log_cursor: int = 0
+        self._pending_log_cursor: int = 0
+
+    @property
+    def closed(self) -> bool:
+        with self._condition:
+            return self._closed
+
+    @property
+    def log_cursor(self) -> int:
+        with self._condition:
+            return self._log_cursor
+
+    def put(self, frame: str, log_cursor: int | None = None) -> None:
+        """
+        log_cursor is the number of log lines the spectator has after taking frame,
+        or None if it doesn't carry logs.
+        """
+        with self._condition:
+            if self._frame is not None:
+                self.dropped_frames += 1
+            self._frame = frame
+            self._pending_log_cursor = (
+                self._log_cursor if log_cursor is None else log_cursor
+            )
+            self._condition.notify()
+
+    def get(self, timeout: float | None = None) -> str | None:
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._frame is not None or self._closed, timeout
+            )
+            frame, self._frame = self._frame, None
+            if frame is not None:
+                self._log_cursor = self._pending_log_cursor
+            return frame
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+
+class SpectatorFanOut:
+    """
+    Sends the frames of a single view of a game to any number of spectators.
+    Frames are held back for delay seconds before they are released, by a single
+    worker thread per fan out. Game states are encoded once for all spectators
+    that have seen the same log lines, which is usually all of them, and each
+    spectator is sent the log lines it hasn't seen yet. Only the latest max_logs
+    log lines are kept, older ones are fetched again for spectators that are
+    further behind, like those that join late.
+    """
+
+    def __init__(self, delay: float = 0, max_logs: int = 1024):
+        self._delay = delay
+        self._max_logs = max_logs
+        self._lock = threading.Lock()
+        self._buffers: set[SpectatorBuffer] = set()
+        self._sequence = itertools.count()
+        self._game_state_counter: int = 0
+        # Log lines of this view up to the latest game state, on the sending
+        # side, and the latest ones released to spectators, which start at
+        # _logs_start.
+        self._log_cursor: int = 0
+        self._logs: list[Any] = []
+        self._logs_start: int = 0
+        self._get_logs: Callable[[int, int], list[Any]] | None = None
+        self._latest_game_state: tuple[int, Mapping[str, Any]] | None = None
+        self._closed = False
+        # Heap of release times, sequence numbers and releases of pending frames.
+        self._queue: list[tuple[float, int, Callable[[], None]]] = []
+        self._queue_condition = threading.Condition()
+        self._worker: threading.Thread | None = None
+
+    def has_spectators(self) -> bool:
+        with self._lock:
+            return bool(self._buffers)
+
+    def _put_latest_game_state(
+        self, buffer: SpectatorBuffer, variants: dict[int, str]
+    ) -> None:
+        count, game_state = self._latest_game_state
+        log_cursor = buffer.log_cursor
+        end = self._logs_start + len(self._logs)
+        if log_cursor not in variants:
+            new_logs = self._logs[max(log_cursor - self._logs_start, 0) :]
+            if log_cursor < self._logs_start:
+                new_logs = self._get_logs(log_cursor, self._logs_start) + new_logs
+            variants[log_cursor] = json.dumps(
+                {
+                    "message_type": "game_state",
+                    "count": count,
+                    "game_state": {
+                        **game_state,
+                        "new_logs": new_logs,
+                        "log_cursor": end,
+                    },
+                }
+            )
+        buffer.put(variants[log_cursor], end)
+
+    def subscribe(self) -> SpectatorBuffer:
+        buffer = SpectatorBuffer()
+        with self._lock:
+            if self._latest_game_state is not None:
+                self._put_latest_game_state(buffer, {})
+            if self._closed:
+                buffer.close()
+            else:
+                self._buffers.add(buffer)
+        return buffer
+
+    def unsubscribe(self, buffer: SpectatorBuffer) -> None:
+        with self._lock:
+            self._buffers.discard(buffer)
+        buffer.close()
+
+    def _schedule(self, f: Callable[[], None]) -> None:
+        if not self._delay:
+            f()
+            return
+        with self._queue_condition:
+            heapq.heappush(
+                self._queue, (time.monotonic() + self._delay, next(self._sequence), f)
+            )
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._release_queued)
+                self._worker.daemon = True
+                self._worker.start()
+            self._queue_condition.notify()
+
+    def _release_queued(self) -> None:
+        while True:
+            with self._queue_condition:
+                while True:
+                    if not self._queue:
+                        self._queue_condition.wait()
+                        continue
+                    if (timeout := self._queue[0][0] - time.monotonic()) <= 0:
+                        break
+                    self._queue_condition.wait(timeout)
+                _, _, f = heapq.heappop(self._queue)
+            f()
+            with self._lock:
+                if self._closed:
+                    return
+
+    def _release(self, frame: str) -> None:
+        with self._lock:
+            for buffer in self._buffers:
+                buffer.put(frame)
+
+    def _release_game_state(
+        self,
+        count: int,
+        game_state: Mapping[str, Any],
+        new_logs: list[Any],
+        get_logs: Callable[[int, int], list[Any]],
+    ) -> None:
+        with self._lock:
+            self._logs.extend(new_logs)
+            if (excess := len(self._logs) - self._max_logs) > 0:
+                del self._logs[:excess]
+                self._logs_start += excess
+            self._get_logs = get_logs
+            self._latest_game_state = (count, game_state)
+            variants: dict[int, str] = {}
+            for buffer in self._buffers:
+                self._put_latest_game_state(buffer, variants)
+
+    def send(self, values: Mapping[str, Any]) -> None:
+        frame = json.dumps(values)
+        self._schedule(lambda: self._release(frame))
+
+    def send_game_state(
+        self,
+        game_state: Mapping[str, Any],
+        get_logs: Callable[[int, int], list[Any]],
+    ) -> None:
+        """
+        Sends a game state with the new log lines of its view. If log lines were
+        sent while nobody was watching, or spectators are further behind than the
+        log lines kept, the missing ones are fetched with get_logs(start, stop),
+        which must be safe to call from any thread. Called from the game thread.
+        """
+        # Spectators can miss frames, so they are always sent full game states.
+        self._game_state_counter += 1
+        new_logs = game_state["new_logs"]
+        if game_state["log_cursor"] - len(new_logs) != self._log_cursor:
+            new_logs = get_logs(self._log_cursor, game_state["log_cursor"])
+        self._log_cursor = game_state["log_cursor"]
+        count = self._game_state_counter
+        game_state = {
+            key: value
+            for key, value in game_state.items()
+            if key not in ("new_logs", "log_cursor")
+        }
+        self._schedule(
+            lambda: self._release_game_state(count, game_state, new_logs, get_logs)
+        )
+
+    def _close(self) -> None:
+        with self._lock:
+            self._closed = True
+            for buffer in self._buffers:
+                buffer.close()
+
+    def close(self) -> None:
+        """Closes the spectator buffers, after any pending frames are released."""
+        self._schedule(self._close)
@@ -10,7 +10,7 @@ from typing import Any, Iterator, Mapping
 from websockets import ServerConnection
 
 from events.eventsystem import ES, EventSystem
-from game.core import Connection, G_decision_result, Player
+from game.core import GS, Connection, DecisionPoint, G_decision_result, Player
 from game.events import Play
 from game_server.exceptions import GameClosed
 from game_server.game_types import TestGameType
@@ -52,6 +52,22 @@ class TestGameRunner(Thread):
                 def __init__(self, player: Player):
                     super().__init__(player)
 
+                def make_game_state_frame(
+                    self,
+                    game_state: Mapping[str, Any],
+                    decision_point: DecisionPoint | None = None,
+                ) -> dict[str, Any]:
+                    # Intermediate frames are skipped, so the test client can't
+                    # keep track of logs incrementally.
+                    frame = super().make_game_state_frame(game_state, decision_point)
+                    frame["game_state"] = {
+                        **game_state,
+                        "logs": GS.get_logs_for(
+                            self.player, 0, game_state["log_cursor"]
+                        ),
+                    }
+                    return frame
+
                 def send(self, values: Mapping[str, Any]) -> None:
                     if values.get("message_type") != "game_state" or values.get(
                         "game_state", {}
@@ -0,0 +1 @@
+from game.tests.conftest import event_session, setup_context  # noqa F401
@@ -0,0 +1,259 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import pytest
+from pydantic import ValidationError
+
+
+pytest.importorskip("sqlalchemy")
+
+from game.core import Player  # noqa: E402
+from game.encoding import decode_binary  # noqa: E402
+from game.schemas import HandshakeSchema  # noqa: E402
+from game_server import games  # noqa: E402
+from game_server.games import GameRunner, SeatInterface  # noqa: E402
+
+
+class _GameRunner:
+    get_encoded_static_map = GameRunner.get_encoded_static_map
+
+    def __init__(self):
+        self.game = SimpleNamespace(time_bank=None, time_grace=None)
+        self._lock = threading.Lock()
+        self._encoded_static_map = None
+
+
+class _Client:
+    def __init__(self):
+        self.received: list[str | bytes] = []
+
+    def __call__(self, data: str | bytes) -> None:
+        self.received.append(data)
+
+    @property
+    def messages(self) -> list[dict[str, Any]]:
+        return [
+            decode_binary(data) if isinstance(data, bytes) else json.loads(data)
+            for data in self.received
+        ]
+
+
+def _make_frame(count: int, unit_position: int = 0) -> dict[str, Any]:
+    return {
+        "message_type": "game_state",
+        "count": count,
+        "game_state": {
+            "round": count,
+            "map": {
+                "hexes": [
+                    {
+                        "cc": {"r": r, "h": 0},
+                        "is_objective": False,
+                        "terrain": "plains",
+                        "unit": (
+                            {"id": "a", "statuses": [{"type": "burn"}]}
+                            if r == unit_position
+                            else None
+                        ),
+                        "statuses": [],
+                    }
+                    for r in range(-4, 5)
+                ]
+            },
+        },
+    }
+
+
+@pytest.fixture
+def make_seat(monkeypatch: Any) -> Callable[..., SeatInterface]:
+    # Frames are delivered as soon as they are sent, unless a test says otherwise.
+    monkeypatch.setattr(games, "MAX_FRAME_RATE", float("inf"))
+
+    def make(recent_frame_count: int = games.RECENT_FRAME_COUNT) -> SeatInterface:
+        monkeypatch.setattr(games, "RECENT_FRAME_COUNT", recent_frame_count)
+        return SeatInterface(Player("player 1"), _GameRunner())
+
+    return make
+
+
+def _connect(seat: SeatInterface, **options: Any) -> _Client:
+    client = _Client()
+    seat.register_callback(client, HandshakeSchema(seat_id="seat", **options))
+    return client
+
+
+@pytest.mark.parametrize(
+    "handshake",
+    [{}, {"seat_id": "seat", "spectate": {"game_id": 1}}],
+)
+def test_handshake_takes_seat_or_spectates(handshake: dict[str, Any]) -> None:
+    with pytest.raises(ValidationError):
+        HandshakeSchema.model_validate(handshake)
+
+
+def test_seat_delta_frames(make_seat: Callable[..., SeatInterface]) -> None:
+    seat = make_seat()
+    full_client = _connect(seat)
+    delta_client = _connect(seat, delta_frames=True)
+    for count in range(1, 4):
+        seat.send_game_state_frame(_make_frame(count, unit_position=count))
+
+    assert [message["count"] for message in full_client.messages] == [1, 2, 3]
+    assert all(
+        message["message_type"] == "game_state" for message in full_client.messages
+    )
+    assert [
+        (message["message_type"], message.get("base_count"))
+        for message in delta_client.messages
+    ] == [("game_state", None), ("game_state_delta", 1), ("game_state_delta", 2)]
+    # Only the hexes the unit moved between are sent.
+    assert [idx for idx, _ in delta_client.messages[-1]["delta"]["hexes"]] == [6, 7]
+
+
+def test_seat_resume(make_seat: Callable[..., SeatInterface]) -> None:
+    seat = make_seat(recent_frame_count=3)
+    for count in range(1, 6):
+        seat.send_game_state_frame(_make_frame(count, unit_position=count - 4))
+
+    # Clients that are up to date get nothing.
+    assert _connect(seat, delta_frames=True, last_seen_count=5).messages == []
+
+    # Clients still covered by the recent frames only get what they have missed.
+    (message,) = _connect(seat, delta_frames=True, last_seen_count=3).messages
+    assert (message["message_type"], message["base_count"], message["count"]) == (
+        "game_state_delta",
+        3,
+        5,
+    )
+
+    # Anything else gets a full snapshot.
+    for last_seen_count in (2, 6, -1, None):
+        (message,) = _connect(
+            seat, delta_frames=True, last_seen_count=last_seen_count
+        ).messages
+        assert (message["message_type"], message["count"]) == ("game_state", 5)
+    (message,) = _connect(seat, last_seen_count=3).messages
+    assert message["message_type"] == "game_state"
+
+
+def test_seat_frames_are_encoded_once(
+    make_seat: Callable[..., SeatInterface],
+) -> None:
+    seat = make_seat()
+    json_clients = [_connect(seat, delta_frames=True) for _ in range(2)]
+    binary_clients = [
+        _connect(seat, delta_frames=True, binary_frames=True, static_map=True)
+        for _ in range(2)
+    ]
+    for count in range(1, 3):
+        seat.send_game_state_frame(_make_frame(count, unit_position=count))
+
+    # Clients with the same options get the very same encoded frames.
+    for clients in (json_clients, binary_clients):
+        first, second = (client.received for client in clients)
+        assert len(first) == len(second)
+        assert all(a is b for a, b in zip(first, second))
+
+    # The static map is sent once, before the first frame, which then leaves it
+    # out.
+    static_map, *frames = binary_clients[0].messages
+    assert static_map["message_type"] == "map_static"
+    assert static_map["hexes"][0] == {"cc": {"r": -4, "h": 0}, "is_objective": False}
+    assert all(isinstance(data, bytes) for data in binary_clients[0].received[1:])
+    assert "cc" not in frames[0]["game_state"]["map"]["hexes"][0]
+    assert frames[1]["message_type"] == "game_state_delta"
+    assert frames[1]["delta"] == {
+        key: value
+        for key, value in json_clients[0].messages[1]["delta"].items()
+        if key != "hexes"
+    } | {
+        "hexes": [
+            [
+                idx,
+                {
+                    key: value
+                    for key, value in _hex.items()
+                    if key not in ("cc", "is_objective")
+                },
+            ]
+            for idx, _hex in json_clients[0].messages[1]["delta"]["hexes"]
+        ]
+    }
+
+
+def test_seat_frame_rate_limit(
+    make_seat: Callable[..., SeatInterface], monkeypatch: Any
+) -> None:
+    seat = make_seat()
+    monkeypatch.setattr(games, "MAX_FRAME_RATE", 10)
+    client = _connect(seat)
+    for count in range(1, 4):
+        seat.send_game_state_frame(_make_frame(count))
+
+    # The first frame goes out right away, the ones sent too soon after it are
+    # coalesced into the latest of them.
+    assert [message["count"] for message in client.messages] == [1]
+    deadline = time.monotonic() + 1
+    while len(client.received) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [message["count"] for message in client.messages] == [1, 3]
+
+    # A frame held back is delivered before any other message.
+    seat.send_game_state_frame(_make_frame(4))
+    seat.send({"message_type": "game_result"})
+    assert [message["message_type"] for message in client.messages[2:]] == [
+        "game_state",
+        "game_result",
+    ]
+    assert client.messages[2]["count"] == 4
+
+
+def test_seat_viewports(make_seat: Callable[..., SeatInterface]) -> None:
+    seat = make_seat()
+    client = _connect(seat, delta_frames=True)
+    other_client = _connect(seat, delta_frames=True)
+    seat.send_game_state_frame(_make_frame(1, unit_position=-4))
+
+    # The latest frame is sent again for the new viewport, as a delta summarizing
+    # the hexes outside of it.
+    viewport = {"center": {"r": 4, "h": 0}, "radius": 0}
+    seat.receive(client, {"message_type": "viewport", **viewport})
+    message = client.messages[-1]
+    assert (message["message_type"], message["count"], message["viewport"]) == (
+        "game_state_delta",
+        1,
+        viewport,
+    )
+    assert [idx for idx, _ in message["delta"]["hexes"]] == list(range(6))
+    assert all(_hex["summary"] for _, _hex in message["delta"]["hexes"])
+    assert message["delta"]["hexes"][0][1]["unit"]["statuses"] == []
+
+    # Reporting the same viewport again doesn't resend anything.
+    seat.receive(client, {"message_type": "viewport", **viewport})
+    assert len(client.received) == 2
+
+    # Viewports are per client.
+    assert len(other_client.received) == 1
+    seat.send_game_state_frame(_make_frame(2, unit_position=-3))
+    assert [idx for idx, _ in client.messages[-1]["delta"]["hexes"]] == [0, 1]
+    assert client.messages[-1]["delta"]["hexes"][1][1]["summary"]
+    assert "viewport" not in other_client.messages[-1]
+    assert not any(
+        _hex.get("summary") for _, _hex in other_client.messages[-1]["delta"]["hexes"]
+    )
+
+    # Resuming clients send the viewport of the frame they have, so deltas are
+    # made against the hexes as they were summarized.
+    (message,) = _connect(
+        seat,
+        delta_frames=True,
+        last_seen_count=1,
+        viewport=viewport,
+    ).messages
+    assert message["delta"]["hexes"] == client.messages[-1]["delta"]["hexes"]
+
+    seat.receive(client, {"message_type": "viewport", "radius": -1})
+    assert json.loads(client.received[-1])["error_type"] == "invalid_viewport"
@@ -0,0 +1,50 @@
+import pytest
+
+from events.eventsystem import ES
+from game.core import GS, DeploymentSpec, GameState, HexStatusSignature, Scenario
+from game.events import ApplyHexStatus
+from game.map.coordinates import CC
+from game.statuses.hex_statuses import TimedDemoCharge
+from game.tests.test_events import MockConnection, UnitSpawner, generate_hex_landscape
+from game.tests.units import TEST_CHICKEN, TEST_LIGHT_ARCHER
+from game_server.setup import setup_scenario_units
+
+
+@pytest.mark.parametrize("with_fow", (False, True))
+def test_shared_view_serialization(with_fow: bool) -> None:
+    scenario = Scenario(
+        landscape=generate_hex_landscape(4),
+        units=[],
+        deployment_spec=DeploymentSpec(0, 0, 0, 0),
+        to_points=24,
+    )
+    gs = GameState(2, MockConnection, scenario, shared_ids=True)
+    GS.bind(gs)
+    player1, player2 = gs.turn_order.original_order
+    spawner = UnitSpawner(gs.map, player1)
+    archer = spawner.spawn(TEST_LIGHT_ARCHER, coordinate=CC(0, 0))
+    spawner.spawn(TEST_CHICKEN, controller=player2, coordinate=CC(4, 0))
+    setup_scenario_units(scenario, with_fow=with_fow)
+    gs.update_vision()
+
+    states = gs._serialize_for_players({})
+    if with_fow:
+        assert states[player1]["map"] is not states[player2]["map"]
+    else:
+        assert states[player1]["map"] is states[player2]["map"]
+        assert player1.id_map.get_id_for(archer) in {
+            _hex["unit"]["id"]
+            for _hex in states[player2]["map"]["hexes"]
+            if _hex["unit"]
+        }
+
+        # A status without effects only changes the view of the player it is
+        # hidden for.
+        ES.resolve(
+            ApplyHexStatus(
+                gs.map.hexes[CC(1, 0)],
+                HexStatusSignature(TimedDemoCharge, archer, duration=2),
+            )
+        )
+        states = gs._serialize_for_players({})
+        assert states[player1]["map"] is not states[player2]["map"]
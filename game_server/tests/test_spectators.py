@@ -0,0 +1,93 @@
+import json
+
+from game_server.spectators import SpectatorFanOut
+
+
+def test_spectator_fan_out_drops_frames() -> None:
+    spectators = SpectatorFanOut()
+    buffer = spectators.subscribe()
+    for round_ in range(3):
+        spectators.send_game_state(
+            {"round": round_, "new_logs": [round_], "log_cursor": round_ + 1},
+            lambda start, stop: list(range(start, stop)),
+        )
+    # Log lines of dropped frames are sent with the next frame that is taken.
+    assert json.loads(buffer.get(timeout=0)) == {
+        "message_type": "game_state",
+        "count": 3,
+        "game_state": {"round": 2, "new_logs": [0, 1, 2], "log_cursor": 3},
+    }
+    assert buffer.dropped_frames == 2
+
+    late_buffer = spectators.subscribe()
+    assert json.loads(late_buffer.get(timeout=0))["count"] == 3
+    spectators.send_game_state(
+        {"round": 3, "new_logs": [3], "log_cursor": 4},
+        lambda start, stop: list(range(start, stop)),
+    )
+    assert json.loads(buffer.get(timeout=0))["game_state"]["new_logs"] == [3]
+    spectators.close()
+    assert buffer.get(timeout=0) is None and buffer.closed
+
+
+def test_spectator_fan_out_catches_up_on_logs() -> None:
+    spectators = SpectatorFanOut()
+    requested_ranges = []
+
+    def get_logs(start: int, stop: int) -> list[int]:
+        requested_ranges.append((start, stop))
+        return list(range(start, stop))
+
+    # Log lines sent while nobody was watching are only rendered once someone is.
+    buffer = spectators.subscribe()
+    spectators.send_game_state({"new_logs": [3, 4], "log_cursor": 5}, get_logs)
+    spectators.send_game_state({"new_logs": [5], "log_cursor": 6}, get_logs)
+    assert requested_ranges == [(0, 5)]
+    assert json.loads(buffer.get(timeout=0))["game_state"]["new_logs"] == list(range(6))
+
+
+def test_spectator_fan_out_keeps_latest_logs() -> None:
+    spectators = SpectatorFanOut(max_logs=2)
+    requested_ranges = []
+
+    def get_logs(start: int, stop: int) -> list[int]:
+        requested_ranges.append((start, stop))
+        return list(range(start, stop))
+
+    buffer = spectators.subscribe()
+    for log_cursor in range(1, 5):
+        spectators.send_game_state(
+            {"new_logs": [log_cursor - 1], "log_cursor": log_cursor}, get_logs
+        )
+    assert spectators._logs == [2, 3]
+    # Spectators further behind than the log lines kept fetch the older ones.
+    assert json.loads(buffer.get(timeout=0))["game_state"]["new_logs"] == [0, 1, 2, 3]
+    assert requested_ranges[-1] == (0, 2)
+    late_buffer = spectators.subscribe()
+    assert json.loads(late_buffer.get(timeout=0))["game_state"] == {
+        "new_logs": [0, 1, 2, 3],
+        "log_cursor": 4,
+    }
+
+    spectators.send_game_state({"new_logs": [4], "log_cursor": 5}, get_logs)
+    # Spectators that are caught up only get the kept ones.
+    del requested_ranges[:]
+    assert json.loads(buffer.get(timeout=0))["game_state"]["new_logs"] == [4]
+    assert not requested_ranges
+
+
+def test_spectator_fan_out_delay() -> None:
+    spectators = SpectatorFanOut(delay=0.05)
+    buffer = spectators.subscribe()
+    for round_ in range(3):
+        spectators.send_game_state(
+            {"round": round_, "new_logs": [], "log_cursor": 0},
+            lambda start, stop: [],
+        )
+    spectators.close()
+    assert buffer.get(timeout=0) is None
+    rounds = []
+    while (frame := buffer.get(timeout=1)) is not None:
+        rounds.append(json.loads(frame)["game_state"]["round"])
+    assert rounds and rounds[-1] == 2 and rounds == sorted(rounds)
+    assert buffer.closed